@@ -1,47 +1,731 @@
 #!/usr/bin/env python3
 # aetos.py
 
+# ⚡ Solo módulos integrados al cargar: subprocess, json o pathlib (y re, que arrastran)
+# cuestan más que todo el arranque de los comandos rápidos. El resto se importa
+# dentro de cada comando.
 import sys
-import subprocess
 import os
-import json
-from pathlib import Path
+import marshal
+import time
+
+# Solo para anotaciones de tipos
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from pathlib import Path
 
 # 🔧 CONFIGURACIÓN POR DEFECTO
 DEFAULT_INDEX_URL = "https://nexus.uclv.edu.cu/repository/pypi.org/"
-CONFIG_DIR = Path.home() / ".aetos"
-CONFIG_FILE = CONFIG_DIR / "config.json"
+CONFIG_DIR_NAME = ".aetos"
+CONFIG_FILE_NAME = "config.json"
+PROJECT_CONFIG_NAME = ".aetos.toml"
+SYSTEM_CONFIG_FILE = (
+    os.path.join(os.environ.get("PROGRAMDATA", "C:\\ProgramData"), "aetos", "config.json")
+    if os.name == "nt" else "/etc/aetos/config.json"
+)
+ENV_PREFIX = "AETOS_"
+# Claves de lista: en variables de entorno se separan con comas
+LIST_CONFIG_KEYS = ("mirrors", "peers")
+# CONFIG_DIR y CONFIG_FILE (pathlib.Path) se crean en el primer acceso: ver __getattr__
+
+# Antigüedad máxima del ranking de mirrors para seguir usándolo (segundos)
+MIRROR_RANKING_MAX_AGE = 24 * 3600
+MIRROR_WATCH_INTERVAL = 300
+
+# Los vecinos de caché solo se consultan donde se puede comprobar el sha256 del índice
+PEERS_NOTE = "Los vecinos solo se consultan con aetos install --pipeline; pip va directo al índice"
+
+# Funciones que muestra el resumen de aetos --profile por proceso
+PROFILE_TOP = 10
+# Sesión de aetos --profile en curso (los pip que se lanzan también se perfilan)
+PROFILE_SESSION = None
+# Si ya se avisó de que falta tomli para leer .aetos.toml (se avisa una vez)
+TOML_WARNED = False
+
+
+def __getattr__(name: str):
+    """Crea CONFIG_DIR y CONFIG_FILE bajo demanda (PEP 562)"""
+    if name not in ("CONFIG_DIR", "CONFIG_FILE"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from pathlib import Path
+    globals().setdefault("CONFIG_DIR", Path(config_dir_path()))
+    globals().setdefault("CONFIG_FILE", Path(config_file_path()))
+    return globals()[name]
+
+
+def config_dir_path() -> str:
+    """Ruta del directorio de configuración como cadena (respeta CONFIG_DIR si se asignó)"""
+    config_dir = globals().get("CONFIG_DIR")
+    if config_dir is not None:
+        return os.fspath(config_dir)
+    return os.path.join(os.path.expanduser("~"), CONFIG_DIR_NAME)
+
 
+def config_file_path() -> str:
+    """Ruta del archivo de configuración como cadena (respeta CONFIG_FILE si se asignó)"""
+    config_file = globals().get("CONFIG_FILE")
+    if config_file is not None:
+        return os.fspath(config_file)
+    return os.path.join(config_dir_path(), CONFIG_FILE_NAME)
 
-def get_config_dir() -> Path:
+
+def get_config_dir() -> "Path":
     """Obtiene el directorio de configuración y lo crea si no existe"""
-    CONFIG_DIR.mkdir(parents=True, exist_ok=True)
-    return CONFIG_DIR
+    from pathlib import Path
+    config_dir = Path(config_dir_path())
+    config_dir.mkdir(parents=True, exist_ok=True)
+    return config_dir
 
 
-def load_config() -> dict:
-    """Carga la configuración desde el archivo o retorna la config por defecto"""
-    if not CONFIG_FILE.exists():
-        return {"index_url": DEFAULT_INDEX_URL}
+def read_snapshot(path: str, parse, snapshot: str = None):
+    """Lee un archivo de configuración a través de su instantánea precompilada
+
+    La instantánea (por defecto ``<archivo>.snapshot``, formato marshal) guarda
+    el mtime y el tamaño del archivo junto con los datos, y se regenera cuando
+    el archivo cambia: en el caso normal no hace falta importar el analizador.
+    ``parse`` recibe la ruta y retorna los datos. Lanza OSError si el archivo no
+    existe y ValueError si su contenido es inválido.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    snapshot = snapshot or path + ".snapshot"
+    try:
+        with open(snapshot, 'rb') as f:
+            cached = marshal.load(f)
+        if cached[:2] == key:
+            return cached[2]
+    except (OSError, EOFError, ValueError, TypeError, IndexError):
+        pass
+
+    data = parse(path)
+    write_snapshot(snapshot, key, data)
+    return data
+
+
+def write_snapshot(snapshot: str, key: tuple, data) -> None:
+    """Guarda una instantánea de forma atómica (si no se puede, se ignora)"""
+    try:
+        os.makedirs(os.path.dirname(snapshot), exist_ok=True)
+        tmp = f"{snapshot}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            marshal.dump(key + (data,), f)
+        os.replace(tmp, snapshot)
+    except (OSError, ValueError):
+        pass
+
+
+def parse_json_file(path: str):
+    import json
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def parse_toml_file(path: str):
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+
+def read_json_snapshot(path: str, snapshot: str = None):
+    """Lee un archivo JSON a través de su instantánea precompilada (ver ``read_snapshot``)"""
+    return read_snapshot(path, parse_json_file, snapshot)
+
+
+def find_project_config(start: str = None):
+    """``.aetos.toml`` del directorio actual o del ancestro más cercano (o None)"""
+    directory = os.path.abspath(start or os.getcwd())
+    while True:
+        candidate = os.path.join(directory, PROJECT_CONFIG_NAME)
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def snapshot_path_for(path: str) -> str:
+    """Instantánea de un archivo en el que quizá no podemos escribir (sistema, proyecto)"""
+    name = path.replace("%", "%25").replace(os.sep, "%2F").replace(":", "%3A")
+    return os.path.join(config_dir_path(), "snapshots", name + ".snapshot")
+
+
+def env_value(key: str, text: str):
+    """Valor de una variable ``AETOS_*``: booleanos, números y listas separadas por comas"""
+    if key in LIST_CONFIG_KEYS:
+        return [item.strip() for item in text.split(",") if item.strip()]
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    for number in (int, float):
+        try:
+            return number(text)
+        except ValueError:
+            pass
+    return text
+
+
+def env_config() -> dict:
+    """Capa de variables de entorno: ``AETOS_INDEX_URL`` → ``index_url``"""
+    config = {}
+    for name, text in os.environ.items():
+        if name.startswith(ENV_PREFIX) and len(name) > len(ENV_PREFIX):
+            key = name[len(ENV_PREFIX):].lower()
+            config[key] = env_value(key, text)
+    return config
+
+
+def config_layers() -> list:
+    """Capas de configuración presentes, de menor a mayor prioridad: (nombre, origen)"""
+    layers = []
+    for name, path in (("sistema", SYSTEM_CONFIG_FILE), ("usuario", config_file_path()),
+                       ("proyecto", find_project_config())):
+        if path and os.path.exists(path):
+            layers.append((name, path))
+    env_names = sorted(name for name in os.environ if name.startswith(ENV_PREFIX) and len(name) > len(ENV_PREFIX))
+    if env_names:
+        layers.append(("entorno", ", ".join(env_names)))
+    return layers
 
+
+def read_layer(name: str, path: str) -> dict:
+    """Datos de una capa; una capa ausente o inválida no aporta nada"""
     try:
-        with open(CONFIG_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {"index_url": DEFAULT_INDEX_URL}
+        if name == "usuario":
+            data = read_json_snapshot(path)
+        elif name == "sistema":
+            data = read_snapshot(path, parse_json_file, snapshot_path_for(path))
+        else:
+            data = read_snapshot(path, parse_toml_file, snapshot_path_for(path))
+    except ImportError:
+        warn_missing_toml(path)
+        return {}
+    except (ValueError, OSError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def warn_missing_toml(path: str) -> None:
+    """Avisa (una vez) de que un ``.aetos.toml`` no se aplica por falta de tomli"""
+    global TOML_WARNED
+    if not TOML_WARNED:
+        TOML_WARNED = True
+        print(f"⚠️  Se ignora {path}: en Python < 3.11 hace falta tomli (pip install tomli)")
+
+
+def load_config() -> dict:
+    """Carga la configuración combinada: sistema < usuario < proyecto < entorno
+
+    Cada archivo se lee a través de su instantánea precompilada, así que
+    invocaciones concurrentes no vuelven a analizar JSON ni TOML mientras
+    nada cambie.
+    """
+    config = {"index_url": DEFAULT_INDEX_URL}
+    for name, source in config_layers():
+        config.update(env_config() if name == "entorno" else read_layer(name, source))
+    return config
+
+
+def load_user_config() -> dict:
+    """Solo la capa de usuario (``~/.aetos/config.json``), la única que escribe aetos"""
+    return read_layer("usuario", config_file_path())
 
 
 def save_config(config: dict) -> None:
-    """Guarda la configuración en el archivo"""
+    """Guarda la capa de usuario de forma atómica bajo el bloqueo de configuración"""
+    with config_lock():
+        write_user_config(config)
+
+
+def write_user_config(config: dict) -> None:
+    """Reemplaza el archivo de usuario de una vez (hay que tener el bloqueo)"""
+    import json
     get_config_dir()
-    with open(CONFIG_FILE, 'w') as f:
-        json.dump(config, f, indent=2)
+    path = config_file_path()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(config, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+    # Deja la instantánea al día: la próxima lectura no necesita json
+    stat = os.stat(path)
+    write_snapshot(path + ".snapshot", (stat.st_mtime_ns, stat.st_size), config)
+
+
+def config_lock():
+    """Bloqueo entre procesos para las escrituras de la configuración de usuario"""
+    lock_module = import_aetos_module("aetos_lock")
+    return lock_module.FileLock(os.path.join(get_config_dir(), "config.lock"))
+
+
+def update_config(edit) -> dict:
+    """Lee, modifica con ``edit(config)`` y guarda la capa de usuario sin perder escrituras concurrentes"""
+    with config_lock():
+        config = load_user_config()
+        edit(config)
+        write_user_config(config)
+    return config
 
 
 def get_index_url() -> str:
-    """Obtiene la URL del índice actual"""
+    """Obtiene la URL del índice actual
+
+    El ranking de mirrors solo elige entre los candidatos de la configuración
+    de usuario: un ``index_url`` del proyecto o del entorno siempre manda.
+    """
     config = load_config()
-    return config.get("index_url", DEFAULT_INDEX_URL)
+    if index_url_pinned():
+        return config["index_url"]
+    return get_ranked_mirror(config) or config.get("index_url", DEFAULT_INDEX_URL)
+
+
+def index_url_pinned() -> bool:
+    """Si ``index_url`` viene de ``.aetos.toml`` o de ``AETOS_INDEX_URL``"""
+    if "index_url" in env_config():
+        return True
+    project = find_project_config()
+    return bool(project) and "index_url" in read_layer("proyecto", project)
+
+
+def get_mirror_state_file() -> "Path":
+    """Archivo donde ``aetos mirror watch`` guarda el ranking de mirrors"""
+    from pathlib import Path
+    return Path(config_dir_path()) / "mirrors.json"
+
+
+def get_mirror_candidates(config: dict) -> list:
+    """Índice configurado más los mirrors alternativos, sin repetir"""
+    candidates = [config.get("index_url", DEFAULT_INDEX_URL)]
+    for url in config.get("mirrors", []):
+        if url not in candidates:
+            candidates.append(url)
+    return candidates
+
+
+def load_mirror_state() -> dict:
+    """Carga el último ranking de mirrors (vacío si no existe)"""
+    try:
+        return read_json_snapshot(os.path.join(config_dir_path(), "mirrors.json"))
+    except (ValueError, IOError):
+        return {}
+
+
+def clear_mirror_state() -> None:
+    """Descarta el ranking de mirrors (y su instantánea): se sondeó otra configuración"""
+    path = os.path.join(config_dir_path(), "mirrors.json")
+    for stale in (path, path + ".snapshot"):
+        if os.path.exists(stale):
+            os.unlink(stale)
+
+
+def get_ranked_mirror(config: dict):
+    """Mejor mirror según el último sondeo, o None si no hay ranking reciente"""
+    if not config.get("mirrors"):
+        return None
+
+    state = load_mirror_state()
+    best = state.get("best")
+    candidates = get_mirror_candidates(config)
+    # Un ranking de otros candidatos (otro index_url u otros mirrors) ya no vale
+    if state.get("candidates") != candidates or best not in candidates:
+        return None
+    if time.time() - state.get("updated_at", 0) > MIRROR_RANKING_MAX_AGE:
+        return None
+    return best
+
+
+def get_cache_dir() -> "Path":
+    """Obtiene el directorio de caché de aetos (artefactos descargados)"""
+    from pathlib import Path
+    return Path(config_dir_path()) / "cache"
+
+
+def get_page_cache_dir() -> "Path":
+    """Directorio de la caché comprimida de páginas del índice"""
+    return get_cache_dir() / "pages"
+
+
+def get_wheelhouse_dir() -> "Path":
+    """Obtiene el directorio compartido de wheels y lo crea si no existe"""
+    wheelhouse = get_cache_dir() / "wheels"
+    wheelhouse.mkdir(parents=True, exist_ok=True)
+    return wheelhouse
+
+
+def get_trusted_host(index_url: str) -> str:
+    """Extrae el host de la URL del índice (sin https://)"""
+    return index_url.split("//")[-1].split("/")[0]
+
+
+def get_index_args(index_url: str) -> list:
+    """Opciones de pip que apuntan al índice configurado"""
+    return ["--index-url", index_url, "--trusted-host", get_trusted_host(index_url)]
+
+
+def build_pip_command(command: str, args: list, index_url: str, python: str = None,
+                      index_args: list = None) -> list:
+    """Construye el comando de pip con el índice configurado"""
+    return [python or sys.executable, "-m", "pip", command] + (index_args or get_index_args(index_url)) + args
+
+
+def start_index_filter(args: list, index_url: str, requested: bool, wheelhouse: "Path" = None):
+    """Arranca el proxy que poda las páginas del índice (o None si no hace falta)
+
+    Con ``wheelhouse`` (motor en tubería) el proxy arranca aunque no se pode:
+    pip descarga a través de él al resolver y lo verificado queda en la caché
+    de wheels, así que la tubería no vuelve a bajarlo.
+    """
+    prune = bool(requested or load_config().get("filter_index"))
+    if not prune and wheelhouse is None:
+        return None
+    filter_module = import_aetos_module("aetos_filter")
+    if prune and not filter_module.applies_to(args):
+        print("⚠️  El filtrado del índice no aplica con otra plataforma, intérprete o índice; se omite")
+        prune = False
+        if wheelhouse is None:
+            return None
+    proxy = filter_module.FilteringProxy(
+        index_url, get_cache_dir() / "filtered",
+        filter_module.FileFilter() if prune else filter_module.KeepAllFilter(),
+        wheelhouse=wheelhouse, trusted_hosts={get_trusted_host(index_url)},
+    ).start()
+    if prune:
+        print(f"🧹 Filtrando el índice para Python {proxy.file_filter.python} "
+              f"({len(proxy.file_filter.tags)} etiquetas compatibles)")
+    return proxy
+
+
+def filtered_index_args(proxy, index_url: str) -> list:
+    """Opciones de pip para leer el índice a través del proxy"""
+    return ["--index-url", proxy.url, "--trusted-host", get_trusted_host(index_url)]
+
+
+def stop_index_filter(proxy) -> None:
+    proxy.stop()
+    stats = proxy.stats
+    if stats["pages"] and proxy.prunes:
+        print(f"🧹 Índice filtrado: {stats['kept']} de {stats['files']} archivos en {stats['pages']} páginas")
+
+
+def import_aetos_module(name: str):
+    """Importa un módulo hermano de aetos (como paquete o como py_module instalado)"""
+    import importlib
+    if __package__:
+        return importlib.import_module(f"{__package__}.{name}")
+    return importlib.import_module(name)
+
+
+def extract_option(args: list, option: str):
+    """Extrae una opción ``--opcion valor`` o ``--opcion=valor`` de los argumentos
+
+    Retorna una tupla (valor, argumentos_restantes); valor es None si no aparece.
+    """
+    remaining = []
+    value = None
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg == option and i + 1 < len(args):
+            value = args[i + 1]
+            i += 2
+            continue
+        if arg.startswith(option + "="):
+            value = arg.split("=", 1)[1]
+        else:
+            remaining.append(arg)
+        i += 1
+    return value, remaining
+
+
+def extract_number(args: list, option: str, kind=int, minimum=1, maximum=None):
+    """Como extract_option, pero el valor tiene que ser un número en [minimum, maximum]
+
+    Si no lo es, muestra el error y termina (en vez de un traceback a mitad del comando).
+    """
+    import math
+    value, args = extract_option(args, option)
+    if value is None:
+        return None, args
+    try:
+        number = kind(value)
+    except ValueError:
+        number = None
+    if (number is None or not math.isfinite(number) or number < minimum
+            or (maximum is not None and number > maximum)):
+        expected = f"entre {minimum} y {maximum}" if maximum is not None else f"mayor o igual que {minimum}"
+        print(f"❌ {option} espera un número {'entero ' if kind is int else ''}{expected}: {value}")
+        sys.exit(1)
+    return number, args
+
+
+def profiled_command(cmd: list, name: str = "pip") -> list:
+    """Con aetos --profile, inyecta el perfilador en el intérprete hijo"""
+    if PROFILE_SESSION is None:
+        return cmd
+    return PROFILE_SESSION.wrap(cmd, name)
+
+
+def run_profiled(mode: str, argv: list) -> None:
+    """Ejecuta ``aetos <argv>`` bajo el perfilador y resume dónde se fue el tiempo"""
+    global PROFILE_SESSION
+    profile = import_aetos_module("aetos_profile")
+    if mode not in profile.MODES:
+        print(f"❌ Modo de perfilado desconocido: {mode} (use {' o '.join(profile.MODES)})")
+        sys.exit(1)
+
+    command = argv[0] if argv else "ayuda"
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{command}"
+    session = profile.ProfileSession(mode, os.path.join(config_dir_path(), "profiles", name))
+    sys.argv = sys.argv[:1] + argv
+    PROFILE_SESSION = session.start()
+    try:
+        main()
+    finally:
+        session.stop()
+        PROFILE_SESSION = None
+        print_profile_summary(session)
+
+
+def print_profile_summary(session) -> None:
+    """Muestra las funciones con más tiempo propio de cada proceso perfilado"""
+    profile = import_aetos_module("aetos_profile")
+    print(f"🔬 Perfil ({session.mode}) guardado en: {session.directory}")
+    for prefix in session.reports():
+        print(f"🔥 {os.path.basename(prefix)}: funciones con más tiempo propio")
+        print(f"  {'propio':>9} {'total':>9} {'llamadas':>9}  función")
+        for hot in profile.top_functions(prefix + ".pstats", PROFILE_TOP):
+            print(f"  {hot.self_time:8.3f}s {hot.total_time:8.3f}s {hot.calls:>9}  {hot.label}")
+    print("💡 Detalle: python -m pstats <proceso>.pstats; flamegraph: flamegraph.pl <proceso>.folded > perfil.svg")
+
+
+def handle_matrix_install(pythons: str, args: list, index_url: str) -> None:
+    """Instala los mismos requisitos en varios intérpretes compartiendo descargas"""
+    matrix = import_aetos_module("aetos_matrix")
+
+    jobs, args = extract_number(args, "--jobs")
+    versions = [v.strip() for v in pythons.split(",") if v.strip()]
+    if not versions:
+        print("❌ Uso: aetos install --python 3.9,3.10,... [paquetes|-r archivo]")
+        sys.exit(1)
+    shared = matrix.shared_destination_options(args)
+    if shared:
+        print(f"❌ {', '.join(shared)} no se admite con varios intérpretes: "
+              "las instalaciones simultáneas escribirían en el mismo directorio")
+        print("Instale en cada intérprete por separado (aetos install --python 3.11 ...)")
+        sys.exit(1)
+
+    try:
+        interpreters = [matrix.resolve_interpreter(v) for v in versions]
+    except matrix.InterpreterNotFound as e:
+        print(f"❌ No se encontró el intérprete de Python {e}")
+        sys.exit(1)
+
+    wheelhouse = get_wheelhouse_dir()
+    print(f"🦅 Aetos: usando índice {index_url}")
+    print(f"📦 Descargas compartidas en: {wheelhouse}")
+
+    results = matrix.run_matrix(
+        list(zip(versions, interpreters)),
+        args,
+        get_index_args(index_url),
+        wheelhouse,
+        jobs=jobs,
+    )
+
+    exit_code = 0
+    for result in results:
+        if result.returncode == 0:
+            print(f"✅ Python {result.version}: instalación completada")
+        else:
+            print(f"❌ Python {result.version}: falló la {result.stage} (código {result.returncode})")
+            if result.output:
+                print(result.output.rstrip())
+            exit_code = exit_code or result.returncode
+    sys.exit(exit_code)
+
+
+def resolve_single_python(version: str):
+    """Ejecutable de ``--python <versión>`` con un solo intérprete (None si es este mismo)"""
+    matrix = import_aetos_module("aetos_matrix")
+    try:
+        python = matrix.resolve_interpreter(version)
+    except matrix.InterpreterNotFound as e:
+        print(f"❌ No se encontró el intérprete de Python {e}")
+        sys.exit(1)
+    return None if python == sys.executable else python
+
+
+def handle_pipeline_install(args: list, index_url: str, filter_index: bool = False) -> None:
+    """Instala con el motor en tubería de aetos; solo retorna si hay que delegar en pip"""
+    pipeline = import_aetos_module("aetos_pipeline")
+    unsupported = pipeline.unsupported_options(args)
+    if unsupported or os.name == "nt":
+        reason = ", ".join(unsupported) if unsupported else "Windows"
+        print(f"⚠️  El motor en tubería no admite {reason}; se usa pip")
+        return
+
+    wheelhouse = get_wheelhouse_dir()
+    index_args = get_index_args(index_url)
+    print(f"🦅 Aetos: usando índice {index_url}")
+    proxy = start_index_filter(args, index_url, filter_index, wheelhouse=wheelhouse)
+    print("🔎 Resolviendo dependencias con pip...")
+    try:
+        artifacts = pipeline.resolve(args, filtered_index_args(proxy, index_url) if proxy else index_args,
+                                     wheelhouse, wrap=lambda cmd: profiled_command(cmd, "pip-resolve"))
+    except pipeline.ResolutionError as e:
+        print(f"❌ No se pudieron resolver los requisitos:\n{e}")
+        sys.exit(1)
+    except pipeline.UnsupportedSource as e:
+        print(f"⚠️  El motor en tubería no instala requisitos de VCS ni directorios ({e}); se usa pip")
+        return
+    finally:
+        if proxy is not None:
+            stop_index_filter(proxy)
+    if proxy is not None:
+        # Los enlaces del informe apuntan al proxy: lo que pip bajó ya está en la caché
+        upstream_url = import_aetos_module("aetos_filter").upstream_url
+        artifacts = [artifact._replace(url=upstream_url(artifact.url)) for artifact in artifacts]
+    if not artifacts:
+        print("✅ Los requisitos ya están satisfechos")
+        sys.exit(0)
+
+    def on_event(kind: str, artifact, detail: str) -> None:
+        if kind == "installed":
+            print(f"✅ {artifact.name} {artifact.version}")
+        elif kind == "error":
+            print(f"❌ {artifact.name} {artifact.version}: {detail}")
+
+    peers = get_peer_set(load_config())
+    print(f"🚀 Descargando, verificando e instalando {len(artifacts)} paquetes en paralelo")
+    start = time.monotonic()
+    result = pipeline.run_pipeline(
+        artifacts,
+        wheelhouse,
+        pipeline.scheme_for(args),
+        trusted_hosts={get_trusted_host(index_url)},
+        peers=peers,
+        on_event=on_event,
+        # Cada versión reemplazada se quita cuando su wheel nuevo ya está verificado
+        before_install=pipeline.outdated_remover(artifacts, args),
+    )
+    if peers is not None and peers.hits:
+        print(f"🤝 {peers.hits} artefactos desde la caché de otros nodos")
+
+    errors = dict(result.errors)
+    if result.built and not errors:
+        print(f"🔨 Construyendo {len(result.built)} paquetes sin wheel con pip")
+        proc = pipeline.build_sdists(result.built, args, index_args, wheelhouse)
+        if proc.returncode != 0:
+            errors["sdists"] = proc.stderr.strip()
+            print(f"❌ Error al construir con pip:\n{proc.stderr.strip()}")
+
+    print(f"📊 {len(result.installed) + (0 if errors else len(result.built))} instalados, "
+          f"{len(errors)} con errores en {time.monotonic() - start:.1f}s")
+    sys.exit(1 if errors else 0)
+
+
+def uninstall_names(args: list):
+    """Nombres a desinstalar y si se confirmó con -y; None si hay opciones que no se reproducen"""
+    from pathlib import Path
+    env = import_aetos_module("aetos_env")
+    names, confirmed = [], False
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("-y", "--yes"):
+            confirmed = True
+        elif arg in ("-r", "--requirement") and i + 1 < len(args):
+            names += [req.name for req in env.parse_requirements_file(Path(args[i + 1]))]
+            i += 1
+        elif arg.startswith("--requirement="):
+            names += [req.name for req in env.parse_requirements_file(Path(arg.split("=", 1)[1]))]
+        elif arg.startswith("-"):
+            return None, confirmed
+        else:
+            # Como pip: se acepta un especificador (requests==2.31) y cuenta el nombre
+            try:
+                names.append(env.Requirement(arg).name)
+            except env.InvalidRequirement:
+                return None, confirmed
+        i += 1
+    return names, confirmed
+
+
+def handle_fast_uninstall(args: list, atomic: bool) -> None:
+    """Desinstala dentro del proceso a partir de los RECORD; solo retorna si hay que delegar en pip"""
+    names, confirmed = uninstall_names(args)
+    if names is None:
+        print("⚠️  La desinstalación rápida solo admite paquetes, -r y -y; se usa pip")
+        return
+    if not names:
+        print("❌ Uso: aetos uninstall --fast [-y] <paquetes|-r archivo>")
+        sys.exit(1)
+
+    uninstall = import_aetos_module("aetos_uninstall")
+    start = time.monotonic()
+    plans, missing, unsupported = uninstall.plan_uninstall(names)
+    for name in missing:
+        print(f"⚠️  {name} no está instalado; se omite")
+    if not plans and not unsupported:
+        sys.exit(0)
+
+    total = sum(len(plan.files) for plan in plans)
+    print(f"🗑️  Desinstalando {len(plans) + len(unsupported)} paquetes ({total} archivos)")
+    for plan in plans:
+        for path in plan.skipped:
+            print(f"⚠️  {plan.name}: {path} está fuera del entorno; se conserva")
+    if not confirmed:
+        for plan in plans:
+            print(f"  {plan.name} {plan.version}")
+        try:
+            answer = input("¿Continuar? (S/n) ")
+        except EOFError:  # sin terminal (stdin cerrado): no se borra nada sin -y
+            answer = "n"
+        if answer.strip().lower() not in ("", "s", "si", "sí", "y", "yes"):
+            print("👋 Cancelado")
+            sys.exit(1)
+
+    result = uninstall.remove_atomic(plans) if atomic else uninstall.remove(plans)
+    removed = 0
+    for plan in plans:
+        # Los errores van por archivo o por directorio movido entero: se atribuyen a su plan
+        own_errors = [message for path in plan.files for error, message in result.errors.items()
+                      if path == error or path.startswith(error + os.sep)]
+        if own_errors:
+            print(f"❌ {plan.name} {plan.version}: {len(own_errors)} archivos sin borrar ({own_errors[0]})")
+        else:
+            removed += 1
+            print(f"✅ {plan.name} {plan.version}")
+    returncode = 1 if result.errors else 0
+
+    # Instalaciones antiguas sin RECORD (p. ej. egg-info de setup.py install): las quita pip
+    if unsupported:
+        import subprocess
+        print(f"⚠️  Sin RECORD: {', '.join(unsupported)}; se desinstalan con pip")
+        proc = subprocess.run(profiled_command([sys.executable, "-m", "pip", "uninstall", "-y"] + unsupported))
+        returncode = returncode or proc.returncode
+
+    if result.trash:
+        uninstall.cleanup_in_background(result.trash)
+        print("🧹 Los archivos retirados se borran en segundo plano")
+    print(f"📊 {removed} desinstalados, {len(plans) - removed} con errores en {time.monotonic() - start:.1f}s")
+    sys.exit(returncode)
+
+
+def get_peer_set(config: dict):
+    """Vecinos de la LAN configurados con ``aetos cache peers add`` (o None)"""
+    urls = config.get("peers")
+    if not urls:
+        return None
+    peers_module = import_aetos_module("aetos_peers")
+    return peers_module.PeerSet(urls, timeout=float(config.get("peer_timeout", peers_module.DEFAULT_TIMEOUT)))
 
 
 def handle_config_command(args: list) -> None:
@@ -49,10 +733,15 @@ def handle_config_command(args: list) -> None:
     if not args or args[0] == "show":
         current_url = get_index_url()
         print(f"🦅 URL del índice actual: {current_url}")
-        if current_url == DEFAULT_INDEX_URL:
+        layers = config_layers()
+        if current_url == DEFAULT_INDEX_URL and not layers:
             print("✅ Usando configuración por defecto")
+        elif [name for name, _ in layers] == ["usuario"]:
+            print(f"📝 Configuración personalizada guardada en: {config_file_path()}")
         else:
-            print(f"📝 Configuración personalizada guardada en: {CONFIG_FILE}")
+            print("📝 Capas de configuración (las últimas tienen prioridad):")
+            for name, source in layers:
+                print(f"  {name}: {source}")
 
     elif args[0] == "set":
         if len(args) < 2:
@@ -67,16 +756,20 @@ def handle_config_command(args: list) -> None:
             print("❌ Error: La URL debe comenzar con http:// o https://")
             sys.exit(1)
 
-        config = load_config()
-        config["index_url"] = new_url
-        save_config(config)
+        update_config(lambda config: config.update(index_url=new_url))
+        clear_mirror_state()
         print(f"✅ URL del índice actualizada a: {new_url}")
-        print(f"📝 Configuración guardada en: {CONFIG_FILE}")
+        print(f"📝 Configuración guardada en: {config_file_path()}")
 
     elif args[0] == "reset":
-        if CONFIG_FILE.exists():
-            CONFIG_FILE.unlink()
-            print(f"🗑️  Archivo de configuración eliminado: {CONFIG_FILE}")
+        config_file = config_file_path()
+        with config_lock():
+            if os.path.exists(config_file):
+                os.unlink(config_file)
+                print(f"🗑️  Archivo de configuración eliminado: {config_file}")
+            if os.path.exists(config_file + ".snapshot"):
+                os.unlink(config_file + ".snapshot")
+        clear_mirror_state()
         print(f"✅ Restablecida a la URL por defecto: {DEFAULT_INDEX_URL}")
 
     else:
@@ -85,26 +778,503 @@ def handle_config_command(args: list) -> None:
         sys.exit(1)
 
 
+def handle_sync_command(args: list) -> None:
+    """Sincroniza varios entornos virtuales con sus archivos de requisitos"""
+    workers, args = extract_number(args, "--jobs")
+    dry_run = "--dry-run" in args
+    args = [arg for arg in args if arg != "--dry-run"]
+
+    if len(args) != 1:
+        print("❌ Uso: aetos sync <manifiesto> [--jobs N] [--dry-run]")
+        print("El manifiesto tiene una línea '<venv> <requisitos>' por entorno")
+        sys.exit(1)
+
+    sync = import_aetos_module("aetos_sync")
+    try:
+        targets = sync.read_manifest(args[0])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Error al leer el manifiesto: {e}")
+        sys.exit(1)
+
+    try:
+        plans = sync.plan_all(targets, workers)
+    except OSError as e:
+        print(f"❌ Error al leer los requisitos: {e}")
+        sys.exit(1)
+
+    for plan in plans:
+        for option in plan.ignored:
+            print(f"⚠️  {plan.target.requirements}: sync no aplica '{option}'; se ignora")
+
+    if dry_run:
+        for plan in plans:
+            print(f"🔍 {plan.target.venv}")
+            for spec in plan.install + plan.local:
+                print(f"   + {spec}")
+            for name in plan.uninstall:
+                print(f"   - {name}")
+        return
+
+    index_url = get_index_url()
+    print(f"🦅 Aetos: usando índice {index_url}")
+    results = sync.run_sync(plans, get_index_args(index_url), get_wheelhouse_dir(), workers)
+
+    installed = uninstalled = failed = 0
+    for result in results:
+        plan = result.plan
+        if result.returncode != 0:
+            failed += 1
+            print(f"❌ {plan.target.venv}: falló (código {result.returncode})")
+            if result.output:
+                print(result.output.rstrip())
+        elif plan.install or plan.uninstall or plan.local:
+            installed += len(plan.install) + len(plan.local)
+            uninstalled += len(plan.uninstall)
+            print(f"✅ {plan.target.venv}: +{len(plan.install) + len(plan.local)} -{len(plan.uninstall)}")
+        else:
+            print(f"✔️  {plan.target.venv}: al día")
+
+    print(f"📊 Resumen: {len(results)} entornos, {installed} instalados, "
+          f"{uninstalled} desinstalados, {failed} con errores")
+    sys.exit(1 if failed else 0)
+
+
+def handle_search_command(args: list) -> None:
+    """Busca proyectos en el catálogo local del índice"""
+    limit, args = extract_number(args, "--limit")
+    refresh = "--refresh" in args
+    terms = [arg for arg in args if arg != "--refresh"]
+
+    if not terms:
+        print("❌ Uso: aetos search <término> [--limit N] [--refresh]")
+        sys.exit(1)
+
+    catalog_module = import_aetos_module("aetos_catalog")
+    index_url = get_index_url()
+    try:
+        catalog = catalog_module.open_catalog(index_url, get_cache_dir(), refresh=refresh)
+    except (OSError, ValueError) as e:
+        print(f"❌ No se pudo descargar el catálogo de {index_url}: {e}")
+        sys.exit(1)
+
+    term = " ".join(terms)
+    results = catalog.search(term, limit=limit or 20)
+    if not results:
+        print(f"🔍 Sin resultados para '{term}'")
+        sys.exit(1)
+
+    print(f"🔍 {len(results)} resultados para '{term}':")
+    for name in results:
+        print(f"  {name}")
+
+
+def load_dependency_graph(args: list) -> tuple:
+    """Grafo de dependencias del entorno y los argumentos restantes (--refresh lo reconstruye)"""
+    graph_module = import_aetos_module("aetos_graph")
+    refresh = "--refresh" in args
+    args = [arg for arg in args if arg != "--refresh"]
+    graph, cached = graph_module.load_graph(get_cache_dir(), refresh=refresh)
+    if not cached:
+        print(f"🔎 Grafo de dependencias reconstruido ({len(graph['nodes'])} distribuciones)")
+    return graph, args
+
+
+def handle_tree_command(args: list) -> None:
+    """Muestra el árbol de dependencias del entorno (o de los paquetes indicados)"""
+    graph_module = import_aetos_module("aetos_graph")
+    depth, args = extract_number(args, "--depth", minimum=0)
+    graph, args = load_dependency_graph(args)
+
+    roots = []
+    for name in args:
+        key = graph_module.find(graph, name)
+        if key is None:
+            print(f"❌ {name} no está instalado")
+            sys.exit(1)
+        roots.append(key)
+    for line in graph_module.render_tree(graph, roots or graph_module.top_level(graph),
+                                         max_depth=depth):
+        print(line)
+
+
+def handle_why_command(args: list) -> None:
+    """Explica por qué está instalado un paquete: quién lo requiere, hasta la raíz"""
+    graph_module = import_aetos_module("aetos_graph")
+    depth, args = extract_number(args, "--depth", minimum=0)
+    graph, args = load_dependency_graph(args)
+    if len(args) != 1:
+        print("❌ Uso: aetos why <paquete> [--depth N] [--refresh]")
+        sys.exit(1)
+
+    key = graph_module.find(graph, args[0])
+    if key is None:
+        print(f"❌ {args[0]} no está instalado")
+        sys.exit(1)
+    name, version, requested = graph["nodes"][key]
+    if requested:
+        print(f"👤 {name} {version} se instaló a petición del usuario")
+    dependents = graph["reverse"].get(key, [])
+    if not dependents:
+        print(f"🌱 Ninguna distribución instalada depende de {name}")
+        return
+    print(f"🔗 {name} {version} es requerido por {len(dependents)} distribuciones:")
+    for line in graph_module.render_tree(graph, [key], reverse=True,
+                                         max_depth=depth)[1:]:
+        print(line)
+    roots = graph_module.requiring_roots(graph, key)
+    if roots:
+        print(f"🌳 Lo traen: {', '.join(graph['nodes'][root][0] for root in roots)}")
+
+
+def handle_prefetch_command(args: list) -> None:
+    """Descarga a la caché lo que piden archivos de requisitos o de bloqueo, sin instalar"""
+    usage = "Uso: aetos prefetch <requisitos|pylock.toml>... [--jobs N] [--max-time S] [--no-deps] [--restart]"
+    jobs, args = extract_number(args, "--jobs")
+    max_time, args = extract_number(args, "--max-time", kind=float, minimum=0)
+    flags = {arg for arg in args if arg in ("--no-deps", "--restart")}
+    files = [arg for arg in args if arg not in flags and arg not in ("-r", "--requirement")]
+    if not files:
+        print(f"❌ {usage}")
+        sys.exit(1)
+
+    from pathlib import Path
+    prefetch = import_aetos_module("aetos_prefetch")
+    lock_module = import_aetos_module("aetos_lock")
+    try:
+        specs = prefetch.collect_specs([Path(f) for f in files])
+    except (OSError, ValueError) as e:
+        print(f"❌ Error al leer los requisitos: {e}")
+        sys.exit(1)
+    except ImportError:
+        print("❌ Para leer pylock.toml en Python < 3.11 hace falta el paquete tomli")
+        sys.exit(1)
+
+    index_url = get_index_url()
+    state_dir = get_cache_dir() / "prefetch"
+    state_file = prefetch.get_state_file(state_dir, specs, index_url)
+
+    # Un solo prefetch a la vez: si cron lo lanza mientras otro sigue, no hace nada
+    try:
+        lock = lock_module.FileLock(state_dir / "prefetch.lock", timeout=0).acquire()
+    except lock_module.LockBusy:
+        print("⏳ Ya hay un aetos prefetch en curso; nada que hacer")
+        return
+
+    try:
+        if "--restart" in flags and state_file.exists():
+            state_file.unlink()
+        prefetch.lower_priority()
+        print(f"🦅 Aetos: usando índice {index_url}")
+        print(f"📥 Precargando {len(specs)} requisitos en: {get_wheelhouse_dir()}")
+
+        def on_progress(spec: str, ok: bool, error: str) -> None:
+            if ok:
+                print(f"✅ {spec}")
+            else:
+                print(f"❌ {spec}: {error.splitlines()[-1] if error else 'falló la descarga'}")
+
+        result = prefetch.run_prefetch(
+            specs,
+            get_index_args(index_url),
+            get_wheelhouse_dir(),
+            state_file,
+            jobs=jobs or prefetch.DEFAULT_JOBS,
+            no_deps="--no-deps" in flags,
+            max_time=max_time,
+            on_progress=on_progress,
+        )
+    finally:
+        lock.release()
+
+    print(f"📊 Resumen: {len(result.fetched)} descargados, {result.skipped} ya en caché, "
+          f"{len(result.failed)} con errores")
+    if result.interrupted:
+        print("⏸️  Se alcanzó --max-time; la próxima ejecución continúa donde quedó")
+    sys.exit(1 if result.failed else 0)
+
+
+def handle_cache_command(args: list) -> None:
+    """Comparte la caché con otros nodos de la LAN y gestiona los vecinos"""
+    usage = ("Uso: aetos cache [serve [--host H] [--port P]|peers [add <url>|remove <url>]|"
+             f"verify [--fast] [--delete] [--jobs N]]\n{PEERS_NOTE}")
+    if not args:
+        print(f"❌ {usage}")
+        sys.exit(1)
+
+    if args[0] == "serve":
+        host, rest = extract_option(args[1:], "--host")
+        port, rest = extract_number(rest, "--port", minimum=0, maximum=65535)
+        peers_module = import_aetos_module("aetos_peers")
+        wheelhouse = get_wheelhouse_dir()
+        try:
+            server = peers_module.PeerCacheServer(
+                wheelhouse,
+                host or "0.0.0.0",
+                peers_module.DEFAULT_PORT if port is None else port,
+                on_serve=lambda name, client: print(f"📤 {name} → {client}"),
+            )
+        except OSError as e:
+            print(f"❌ No se pudo abrir el puerto: {e}")
+            sys.exit(1)
+        print(f"🤝 Compartiendo {wheelhouse} (solo lectura) en {server.url}wheels/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n👋 Servidor detenido")
+
+    elif args[0] == "verify":
+        jobs, rest = extract_number(args[1:], "--jobs")
+        fast = "--fast" in rest
+        hashes = import_aetos_module("aetos_hashes")
+        wheelhouse = get_wheelhouse_dir()
+        print(f"🔍 Verificando {wheelhouse}{' (rápido: se confía en lo que no cambió)' if fast else ''}")
+
+        def on_corrupt(name: str, expected: str, actual: str) -> None:
+            print(f"❌ {name}: sha256 {actual[:12]}… en vez de {expected[:12]}…")
+
+        start = time.monotonic()
+        result = hashes.verify_cache(wheelhouse, fast=fast, jobs=jobs,
+                                     on_corrupt=on_corrupt)
+        elapsed = time.monotonic() - start
+        megabytes = result.bytes_hashed / (1024 * 1024)
+        print(f"📊 {result.checked} artefactos: {result.hashed} hasheados ({megabytes:.1f} MB, "
+              f"{megabytes / max(elapsed, 1e-6):.0f} MB/s), {result.trusted} sin cambios, "
+              f"{len(result.new)} nuevos, {len(result.corrupt)} corruptos")
+        if result.corrupt and "--delete" in rest:
+            for name in result.corrupt:
+                try:
+                    (wheelhouse / name).unlink()
+                except FileNotFoundError:
+                    pass  # ya lo quitó otro proceso
+            print(f"🗑️  {len(result.corrupt)} artefactos corruptos eliminados; se volverán a descargar")
+        sys.exit(1 if result.corrupt else 0)
+
+    elif args[0] == "peers":
+        if len(args) == 1 or args[1] == "list":
+            peers = load_config().get("peers", [])
+            if not peers:
+                print("ℹ️  No hay vecinos configurados (aetos cache peers add <url>)")
+            for url in peers:
+                print(f"  {url}")
+            if peers:
+                print(f"ℹ️  {PEERS_NOTE}")
+            return
+        if args[1] not in ("add", "remove") or len(args) < 3:
+            print(f"❌ {usage}")
+            sys.exit(1)
+        url = args[2]
+        if args[1] == "add" and not (url.startswith('http://') or url.startswith('https://')):
+            print("❌ Error: La URL debe comenzar con http:// o https://")
+            sys.exit(1)
+        if args[1] == "remove" and url not in load_user_config().get("peers", []):
+            print(f"❌ El vecino no está configurado: {url}")
+            sys.exit(1)
+
+        def edit(user_config: dict) -> None:
+            peers = user_config.setdefault("peers", [])
+            if args[1] == "add" and url not in peers:
+                peers.append(url)
+            elif args[1] == "remove" and url in peers:
+                peers.remove(url)
+
+        update_config(edit)
+        print(f"✅ Vecino añadido: {url}" if args[1] == "add" else f"🗑️  Vecino eliminado: {url}")
+        if args[1] == "add":
+            print(f"ℹ️  {PEERS_NOTE}")
+
+    else:
+        print(f"❌ Comando de caché desconocido: {args[0]}")
+        print(usage)
+        sys.exit(1)
+
+
+def print_mirror_ranking(state: dict) -> None:
+    """Muestra el ranking de mirrors"""
+    for position, url in enumerate(state.get("ranking", []), 1):
+        stats = state["mirrors"][url]
+        freshness = "⚠️  desactualizado" if stats["behind"] else "al día"
+        print(f"  {position}. {url}  {stats['latency'] * 1000:.0f} ms, "
+              f"{stats['error_rate'] * 100:.0f}% errores, {freshness}")
+
+
+def handle_mirror_command(args: list) -> None:
+    """Maneja los mirrors alternativos y su sondeo en segundo plano"""
+    usage = "Uso: aetos mirror [list|add <url>|remove <url>|watch [--interval S] [--once]]"
+    config = load_config()
+    mirrors = config.get("mirrors", [])
+
+    if not args or args[0] in ("list", "status"):
+        state = load_mirror_state()
+        print(f"🦅 Índice en uso: {get_index_url()}")
+        if not mirrors:
+            print("ℹ️  No hay mirrors alternativos configurados (aetos mirror add <url>)")
+        elif not state.get("ranking"):
+            print("ℹ️  Sin datos de sondeo todavía (aetos mirror watch --once)")
+        else:
+            print_mirror_ranking(state)
+
+    elif args[0] in ("add", "remove"):
+        if len(args) < 2:
+            print(f"❌ {usage}")
+            sys.exit(1)
+        url = args[1]
+        if args[0] == "add" and not (url.startswith('http://') or url.startswith('https://')):
+            print("❌ Error: La URL debe comenzar con http:// o https://")
+            sys.exit(1)
+        if args[0] == "remove" and url not in load_user_config().get("mirrors", []):
+            print(f"❌ El mirror no está configurado: {url}")
+            sys.exit(1)
+
+        # Solo se modifica la capa de usuario, bajo el bloqueo de configuración
+        def edit(user_config: dict) -> None:
+            user_mirrors = user_config.setdefault("mirrors", [])
+            if args[0] == "add" and url not in user_mirrors:
+                user_mirrors.append(url)
+            elif args[0] == "remove" and url in user_mirrors:
+                user_mirrors.remove(url)
+
+        update_config(edit)
+        print(f"✅ Mirror añadido: {url}" if args[0] == "add" else f"🗑️  Mirror eliminado: {url}")
+
+    elif args[0] == "watch":
+        interval, rest = extract_number(args[1:], "--interval", kind=float)
+        reference, rest = extract_option(rest, "--reference")
+        once = "--once" in rest
+        candidates = get_mirror_candidates(config)
+        mirrors_module = import_aetos_module("aetos_mirrors")
+
+        def on_update(state: dict) -> None:
+            print(f"🔄 Ranking actualizado ({time.strftime('%H:%M:%S')}), mejor: {state['best']}")
+            print_mirror_ranking(state)
+
+        print(f"👀 Sondeando {len(candidates)} mirrors; ranking en {get_mirror_state_file()}")
+        try:
+            mirrors_module.watch(
+                candidates,
+                get_mirror_state_file(),
+                interval or MIRROR_WATCH_INTERVAL,
+                reference=reference,
+                once=once,
+                on_update=on_update,
+                cache=import_aetos_module("aetos_pages").PageCache(get_page_cache_dir()),
+            )
+        except KeyboardInterrupt:
+            print("\n👋 Sondeo detenido")
+
+    else:
+        print(f"❌ Comando de mirror desconocido: {args[0]}")
+        print(usage)
+        sys.exit(1)
+
+
+def speculation_enabled(config: dict, args: list) -> bool:
+    """Si ``aetos install`` debe aprender y precargar dependencias (se activa en la configuración)"""
+    if not config.get("speculative_prefetch", False):
+        return False
+    # Sin índice o con otro intérprete, lo aprendido de este entorno no aplica
+    return "--no-index" not in args and not any(
+        arg == "--python" or arg.startswith("--python=") for arg in args
+    )
+
+
+def start_speculation(args: list, index_url: str):
+    """Empieza a descargar las dependencias aprendidas de ``aetos install`` (o None)"""
+    if not speculation_enabled(load_config(), args):
+        return None
+
+    speculate = import_aetos_module("aetos_speculate")
+    fetcher = speculate.begin(
+        speculate.get_graph_file(get_cache_dir(), index_url),
+        args,
+        get_index_args(index_url),
+        get_wheelhouse_dir(),
+    )
+    if fetcher is not None:
+        print("🔮 Precargando en segundo plano las dependencias de instalaciones anteriores")
+    return fetcher
+
+
+def finish_speculation(fetcher, args: list, index_url: str, success: bool) -> None:
+    """Aprende las dependencias instaladas y recorta las descargas especulativas sin usar"""
+    config = load_config()
+    if not speculation_enabled(config, args):
+        return
+
+    speculate = import_aetos_module("aetos_speculate")
+    budget_mb = config.get("speculative_budget_mb", speculate.DEFAULT_BUDGET_MB)
+    try:
+        speculate.finish(
+            fetcher,
+            speculate.get_graph_file(get_cache_dir(), index_url),
+            args,
+            get_wheelhouse_dir(),
+            success,
+            int(budget_mb * 1024 * 1024),
+        )
+    except OSError as e:
+        print(f"⚠️  No se pudo actualizar el historial de dependencias: {e}")
+
+
+# Comandos que resuelve aetos sin delegar en pip; cada uno importa lo que necesita
+AETOS_COMMANDS = {
+    "config": handle_config_command,
+    "sync": handle_sync_command,
+    "search": handle_search_command,
+    "mirror": handle_mirror_command,
+    "prefetch": handle_prefetch_command,
+    "cache": handle_cache_command,
+    "tree": handle_tree_command,
+    "why": handle_why_command,
+}
+
+
 def main():
     if len(sys.argv) < 2:
         print("❌ Uso: aetos <comando> [paquetes]")
         print("Ej: aetos install requests")
         print("\nComandos disponibles:")
         print("  aetos install <paquete>        Instalar un paquete")
+        print("  aetos install --python 3.9,3.10 -r req.txt")
+        print("                                 Instalar en varios intérpretes")
+        print("  aetos install --pipeline <paquete>")
+        print("                                 Instalar solapando descarga e instalación")
+        print("  aetos install --filter-index <paquete>")
+        print("                                 Podar el índice a los archivos compatibles")
         print("  aetos uninstall <paquete>      Desinstalar un paquete")
+        print("  aetos uninstall --fast -y <paquetes>")
+        print("                                 Desinstalar en paralelo sin pasar por pip")
+        print("  aetos sync <manifiesto>        Sincronizar varios entornos virtuales")
+        print("  aetos prefetch <requisitos>    Llenar la caché sin instalar (para cron)")
         print("  aetos list                     Listar paquetes instalados")
         print("  aetos show <paquete>           Mostrar información de un paquete")
+        print("  aetos tree [paquetes]          Árbol de dependencias del entorno")
+        print("  aetos why <paquete>            Quién requiere un paquete instalado")
+        print("  aetos search <término>         Buscar proyectos en el índice")
         print("  aetos config show              Mostrar URL del índice actual")
         print("  aetos config set <url>         Cambiar URL del índice")
         print("  aetos config reset             Restablecer URL por defecto")
+        print("  aetos mirror add <url>         Añadir un mirror alternativo")
+        print("  aetos mirror watch             Sondear mirrors y elegir el mejor")
+        print("  aetos cache serve              Compartir la caché con otros nodos de la LAN")
+        print("  aetos cache peers add <url>    Consultar la caché de otro nodo antes del índice")
+        print("                                 (solo con aetos install --pipeline)")
+        print("  aetos cache verify [--fast]    Comprobar la integridad de la caché")
+        print("  aetos --profile[=sampling] <comando>")
+        print("                                 Perfilar aetos y pip (pstats y flamegraph)")
         sys.exit(1)
 
+    # Perfilado: aetos --profile[=cprofile|sampling] <comando> ...
+    if sys.argv[1] == "--profile" or sys.argv[1].startswith("--profile="):
+        run_profiled(sys.argv[1].partition("=")[2] or "cprofile", sys.argv[2:])
+        return
+
     # Comando de pip (ej: install, list, uninstall)
     command = sys.argv[1]
 
-    # Manejar comandos de configuración
-    if command == "config":
-        handle_config_command(sys.argv[2:])
+    # Comandos propios de aetos (config, sync, ...)
+    handler = AETOS_COMMANDS.get(command)
+    if handler is not None:
+        handler(sys.argv[2:])
         return
 
     # Obtener URL del índice actual
@@ -113,26 +1283,80 @@ def main():
     # Argumentos restantes
     args = sys.argv[2:]
 
+    # Páginas del índice podadas a lo instalable (aetos install --filter-index, o "filter_index": true)
+    filter_index = command == "install" and "--filter-index" in args
+    args = [arg for arg in args if arg != "--filter-index"] if filter_index else args
+
+    # Instalación en varios intérpretes (aetos install --python 3.9,3.10 ...)
+    python = None
+    if command == "install":
+        pythons, matrix_args = extract_option(args, "--python")
+        # Una lista de versiones (3.9,3.10); una ruta se delega al --python de pip
+        if pythons is not None and pythons.replace(".", "").replace(",", "").isdigit():
+            versions = [v.strip() for v in pythons.split(",") if v.strip()]
+            if len(versions) != 1:
+                handle_matrix_install(pythons, matrix_args, index_url)
+                return
+            # Una sola versión: pip de siempre, ejecutado con ese intérprete
+            _, args = extract_number(matrix_args, "--jobs")  # sin instalaciones en paralelo que limitar
+            python = resolve_single_python(versions[0])
+            if python is not None and filter_index:
+                print("⚠️  El filtrado del índice no aplica con otra plataforma, intérprete o índice; se omite")
+    # Motor en tubería, precarga y filtrado conocen solo el entorno de este intérprete
+    local_install = command == "install" and python is None
+
+    # Desinstalación en paralelo dentro del proceso (aetos uninstall --fast | --atomic,
+    # o "uninstall_engine": "aetos"); termina el proceso salvo que tenga que delegar en pip
+    if command == "uninstall" and ("--fast" in args or "--atomic" in args
+                                   or load_config().get("uninstall_engine") == "aetos"):
+        atomic = "--atomic" in args
+        args = [arg for arg in args if arg not in ("--fast", "--atomic")]
+        handle_fast_uninstall(args, atomic)
+
+    # Motor propio en tubería (aetos install --pipeline, o "install_engine": "pipeline");
+    # termina el proceso salvo que tenga que delegar en pip
+    if command == "install" and ("--pipeline" in args or load_config().get("install_engine") == "pipeline"):
+        args = [arg for arg in args if arg != "--pipeline"]
+        if local_install:
+            handle_pipeline_install(args, index_url, filter_index)
+        else:
+            print("⚠️  El motor en tubería no admite --python; se usa pip")
+
+    # Precarga especulativa de dependencias conocidas mientras pip resuelve
+    speculation = None
+    if local_install:
+        speculation = start_speculation(args, index_url)
+        if speculation is not None:
+            args = args + ["--find-links", speculation.find_links]
+
+    proxy = start_index_filter(args, index_url, filter_index) if local_install else None
+    if command == "install" and load_config().get("peers"):
+        print(f"ℹ️  {PEERS_NOTE}")
+
     # Construir el comando de pip
-    pip_cmd = [
-        sys.executable, "-m", "pip", command,
-        "--index-url", index_url,
-        "--trusted-host", index_url.split("//")[-1].split("/")[0],  # Host sin https://
-    ] + args
+    pip_cmd = build_pip_command(command, args, index_url, python=python,
+                                index_args=filtered_index_args(proxy, index_url) if proxy else None)
 
     print(f"🦅 Aetos: usando índice {index_url}")
     print(f"🚀 Ejecutando: {' '.join(pip_cmd)}")
 
     # Ejecutar el comando
+    import subprocess
     try:
-        result = subprocess.run(pip_cmd, check=True)
-        sys.exit(result.returncode)
+        returncode = subprocess.run(profiled_command(pip_cmd), check=True).returncode
     except subprocess.CalledProcessError as e:
         print(f"❌ Error al ejecutar pip: {e}")
-        sys.exit(e.returncode)
+        returncode = e.returncode
     except FileNotFoundError:
         print("❌ No se encontró pip. Asegúrate de tener Python instalado correctamente.")
-        sys.exit(1)
+        returncode = 1
+    finally:
+        if proxy is not None:
+            stop_index_filter(proxy)
+
+    if local_install:
+        finish_speculation(speculation, args, index_url, returncode == 0)
+    sys.exit(returncode)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+# aetos_catalog.py
+# Catálogo local de nombres de proyectos del índice para búsquedas rápidas
+
+import bisect
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+if __package__:
+    from . import aetos_http
+else:
+    import aetos_http
+
+# Antigüedad máxima antes de revalidar el catálogo con el índice (segundos)
+CATALOG_MAX_AGE = 24 * 3600
+
+NAMES_FILE = "names.txt"
+META_FILE = "meta.json"
+TRIGRAMS_FILE = "trigrams.pickle"
+
+# Similitud mínima (Jaccard de trigramas) para las sugerencias aproximadas
+FUZZY_THRESHOLD = 0.3
+
+
+def normalize(name: str) -> str:
+    """Normaliza un nombre de proyecto según PEP 503"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def get_catalog_dir(cache_dir: Path, index_url: str) -> Path:
+    """Directorio del catálogo de un índice concreto"""
+    key = hashlib.sha256(index_url.encode()).hexdigest()[:16]
+    return cache_dir / "catalog" / key
+
+
+def trigrams(name: str) -> set:
+    """Trigramas de un nombre, con marcas de inicio y fin"""
+    padded = f"^{name}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_root_listing(response: aetos_http.Response) -> List[str]:
+    """Extrae los nombres de proyecto del listado raíz (JSON o HTML)
+
+    Lanza ValueError si el listado JSON no tiene la forma de PEP 691.
+    """
+    if response.is_json:
+        listing = json.loads(response.body)
+        projects = listing.get("projects") if isinstance(listing, dict) else None
+        if not isinstance(projects, list) or not all(
+                isinstance(project, dict) and isinstance(project.get("name"), str) for project in projects):
+            raise ValueError("el listado JSON del índice no es válido (se esperaba 'projects' con 'name')")
+        names = [project["name"] for project in projects]
+    else:
+        names = re.findall(r"<a\b[^>]*>([^<]+)</a>", response.body.decode("utf-8", "replace"))
+    return sorted({normalize(name.strip()) for name in names if name.strip()})
+
+
+def build_trigram_index(names: List[str]) -> Dict[str, array]:
+    """Índice invertido trigrama -> posiciones de los nombres que lo contienen"""
+    index = {}
+    for position, name in enumerate(names):
+        for trigram in trigrams(name):
+            postings = index.get(trigram)
+            if postings is None:
+                postings = index[trigram] = array("I")
+            postings.append(position)
+    return index
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    # Temporal propio de cada proceso e hilo: dos --refresh a la vez no comparten archivo
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_meta(directory: Path) -> dict:
+    try:
+        with open(directory / META_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def refresh_catalog(index_url: str, directory: Path, force: bool = False,
+                    max_age: float = CATALOG_MAX_AGE) -> str:
+    """Actualiza el catálogo con una petición condicional al listado raíz del índice
+
+    Retorna ``"fresh"`` si no hizo falta consultar, ``"not-modified"`` si el índice
+    respondió 304 y ``"updated"`` si se descargó un listado nuevo.
+    """
+    meta = read_meta(directory)
+    has_names = (directory / NAMES_FILE).exists()
+    now = time.time()
+    if has_names and not force and now - meta.get("checked_at", 0) < max_age:
+        return "fresh"
+
+    headers = {"Accept": aetos_http.SIMPLE_ACCEPT}
+    if has_names:
+        headers.update(aetos_http.conditional_headers(meta.get("etag"), meta.get("last_modified")))
+
+    response = aetos_http.fetch(index_url, headers)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    if response.not_modified:
+        meta["checked_at"] = now
+        _write_atomic(directory / META_FILE, json.dumps(meta).encode())
+        return "not-modified"
+
+    names = parse_root_listing(response)
+    _write_atomic(directory / NAMES_FILE, "".join(f"{name}\n" for name in names).encode())
+    _write_atomic(directory / TRIGRAMS_FILE, pickle.dumps(build_trigram_index(names)))
+    meta = {
+        "url": index_url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "checked_at": now,
+        "count": len(names),
+    }
+    _write_atomic(directory / META_FILE, json.dumps(meta).encode())
+    return "updated"
+
+
+class Catalog:
+    """Catálogo ordenado de nombres con búsqueda exacta, por prefijo, subcadena y aproximada"""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        blob = (directory / NAMES_FILE).read_text()
+        self.names = blob.split("\n")[:-1]
+        # Cada nombre queda entre saltos de línea para localizar subcadenas con find()
+        self._blob = "\n" + blob
+        self._trigrams = None
+
+    def _prefix_matches(self, term: str) -> List[str]:
+        start = bisect.bisect_left(self.names, term)
+        end = bisect.bisect_left(self.names, term + "\uffff")
+        return self.names[start:end]
+
+    def _substring_matches(self, term: str) -> List[str]:
+        blob = self._blob
+        matches = []
+        position = blob.find(term)
+        while position != -1:
+            start = blob.rfind("\n", 0, position) + 1
+            end = blob.find("\n", position)
+            matches.append(blob[start:end])
+            position = blob.find(term, end)
+        return matches
+
+    def _fuzzy_matches(self, term: str, limit: int) -> List[str]:
+        if self._trigrams is None:
+            try:
+                with open(self.directory / TRIGRAMS_FILE, 'rb') as f:
+                    self._trigrams = pickle.load(f)
+            except (OSError, pickle.UnpicklingError):
+                self._trigrams = build_trigram_index(self.names)
+
+        term_trigrams = trigrams(term)
+        counts = Counter()
+        for trigram in term_trigrams:
+            counts.update(self._trigrams.get(trigram, ()))
+
+        scored = []
+        for position, shared in counts.items():
+            name = self.names[position]
+            # Un nombre de n caracteres tiene como mucho n trigramas (con las marcas ^ y $)
+            score = shared / (len(term_trigrams) + len(name) - shared)
+            if score >= FUZZY_THRESHOLD:
+                scored.append((-score, name))
+        return [name for _, name in sorted(scored)[:limit]]
+
+    def search(self, term: str, limit: int = 20) -> List[str]:
+        """Busca proyectos: exacto, luego prefijo, subcadena y por último aproximado"""
+        term = normalize(term.strip())
+        if not term:
+            return []
+
+        results = []
+        seen = set()
+
+        def add(names: List[str]) -> None:
+            for name in names:
+                if name not in seen:
+                    seen.add(name)
+                    results.append(name)
+
+        add(sorted(self._prefix_matches(term), key=lambda n: (len(n), n)))
+        add(sorted(self._substring_matches(term), key=lambda n: (len(n), n)))
+        if len(results) < limit and len(term) >= 3:
+            add(self._fuzzy_matches(term, limit))
+        return results[:limit]
+
+
+def open_catalog(index_url: str, cache_dir: Path, refresh: bool = False) -> Catalog:
+    """Abre el catálogo del índice, revalidándolo si está viejo o si se pide
+
+    Si el índice no responde se usa el catálogo existente; sin catálogo el error se propaga.
+    """
+    directory = get_catalog_dir(cache_dir, index_url)
+    try:
+        refresh_catalog(index_url, directory, force=refresh)
+    except OSError:
+        if not (directory / NAMES_FILE).exists():
+            raise
+    return Catalog(directory)
@@ -0,0 +1,290 @@
+# aetos_env.py
+# Inspección de entornos virtuales y archivos de requisitos (sin lanzar pip)
+
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from importlib import metadata as importlib_metadata
+except ImportError:  # Python 3.7
+    import importlib_metadata
+
+try:
+    from packaging.markers import InvalidMarker, Marker
+    from packaging.requirements import InvalidRequirement, Requirement
+except ImportError:  # pip siempre trae su copia de packaging
+    from pip._vendor.packaging.markers import InvalidMarker, Marker
+    from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+
+# Paquetes que nunca se desinstalan al sincronizar un entorno
+PROTECTED_PACKAGES = {"pip", "setuptools", "wheel"}
+
+# Variables de marcadores (PEP 508) de otro intérprete, sin depender de que tenga packaging
+MARKER_ENVIRONMENT_SCRIPT = """
+import json, os, platform, sys
+def version(info):
+    text = "%d.%d.%d" % (info.major, info.minor, info.micro)
+    return text if info.releaselevel == "final" else text + info.releaselevel[0] + str(info.serial)
+print(json.dumps({
+    "implementation_name": sys.implementation.name,
+    "implementation_version": version(sys.implementation.version),
+    "os_name": os.name,
+    "platform_machine": platform.machine(),
+    "platform_release": platform.release(),
+    "platform_system": platform.system(),
+    "platform_version": platform.version(),
+    "python_full_version": platform.python_version(),
+    "platform_python_implementation": platform.python_implementation(),
+    "python_version": ".".join(platform.python_version_tuple()[:2]),
+    "sys_platform": sys.platform,
+}))
+"""
+
+_marker_environments: Dict[str, dict] = {}
+_marker_environments_lock = threading.Lock()
+
+
+def canonicalize_name(name: str) -> str:
+    """Normaliza el nombre de un proyecto según PEP 503"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def get_venv_python(venv: Path) -> Path:
+    """Ruta del intérprete de un entorno virtual"""
+    if os.name == "nt":
+        return venv / "Scripts" / "python.exe"
+    return venv / "bin" / "python"
+
+
+def get_venv_full_version(venv: Path) -> Optional[str]:
+    """Versión completa de Python de un entorno (``3.11.7``), leída de pyvenv.cfg"""
+    cfg = venv / "pyvenv.cfg"
+    if not cfg.exists():
+        return None
+    for line in cfg.read_text().splitlines():
+        key, _, value = line.partition("=")
+        if key.strip() in ("version", "version_info"):
+            return ".".join(value.strip().split(".")[:3])
+    return None
+
+
+def get_venv_version(venv: Path) -> Optional[str]:
+    """Versión mayor.menor de Python de un entorno, leída de pyvenv.cfg"""
+    version = get_venv_full_version(venv)
+    return ".".join(version.split(".")[:2]) if version else None
+
+
+def venv_marker_environment(venv: Path) -> dict:
+    """Variables de marcadores con las que se evalúan los requisitos de un entorno
+
+    Se pregunta al intérprete del entorno una sola vez por ejecutable real (los
+    entornos creados con el mismo Python comparten la respuesta). Si no se
+    puede ejecutar, al menos la versión de Python sale de pyvenv.cfg.
+    """
+    python = get_venv_python(venv)
+    key = os.path.realpath(python)
+    with _marker_environments_lock:
+        if key not in _marker_environments:
+            try:
+                proc = subprocess.run([str(python), "-c", MARKER_ENVIRONMENT_SCRIPT],
+                                      capture_output=True, text=True)
+                environment = json.loads(proc.stdout) if proc.returncode == 0 else None
+            except (OSError, ValueError):
+                environment = None
+            if not isinstance(environment, dict):
+                full_version = get_venv_full_version(venv)
+                if full_version is None:
+                    return {}
+                # Sin caché: otro entorno con el mismo ejecutable puede tener otro pyvenv.cfg
+                return {"python_full_version": full_version,
+                        "python_version": ".".join(full_version.split(".")[:2])}
+            _marker_environments[key] = environment
+        return _marker_environments[key]
+
+
+def find_site_packages(venv: Path) -> List[Path]:
+    """Directorios site-packages de un entorno virtual"""
+    if os.name == "nt":
+        candidates = [venv / "Lib" / "site-packages"]
+    else:
+        candidates = sorted(venv.glob("lib/python*/site-packages"))
+    return [path for path in candidates if path.is_dir()]
+
+
+def installed_distributions(paths: Optional[List[Path]] = None) -> Dict[str, str]:
+    """Distribuciones instaladas en ``paths`` (o en sys.path) como {nombre: versión}"""
+    return {name: dist.version for name, dist in distributions_by_name(paths).items()}
+
+
+def parse_requirements_file(path: Path, _seen: Optional[set] = None,
+                            local: Optional[List[str]] = None,
+                            options: Optional[List[str]] = None,
+                            editable: Optional[List[str]] = None) -> List[Requirement]:
+    """Lee un archivo de requisitos, siguiendo ``-r`` e ignorando el resto de opciones
+
+    Las líneas ``-e`` y las rutas locales no tienen nombre de proyecto: no se
+    retornan, pero si se pasa ``local`` se añaden ahí (las rutas, absolutas), y
+    las de ``-e`` también a ``editable``. Si se pasa ``options``, ahí van las
+    líneas de opciones ignoradas (``-c``, ``--index-url``...) y cada ``--hash``
+    de los requisitos.
+    """
+    seen = _seen if _seen is not None else set()
+    path = Path(path).resolve()
+    if path in seen:
+        return []
+    seen.add(path)
+
+    text = path.read_text().replace("\\\n", " ")
+    requirements = []
+    for line in text.splitlines():
+        line = line.split(" #", 1)[0].strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith(("-r ", "--requirement ", "--requirement=")):
+            included = re.split(r"[\s=]+", line, maxsplit=1)[1].strip()
+            requirements += parse_requirements_file(path.parent / included, seen, local, options, editable)
+            continue
+        if line.startswith(("-e ", "--editable ", "--editable=")):
+            target = _local_target(path.parent, re.split(r"[\s=]+", line, maxsplit=1)[1].strip())
+            if local is not None:
+                local.append(target)
+            if editable is not None:
+                editable.append(target)
+            continue
+        if line.startswith("-"):
+            if options is not None:
+                options.append(line)
+            continue
+        if options is not None:
+            options += re.findall(r"--hash[=\s]\S+", line)
+        line = re.sub(r"\s--hash[=\s]\S+", "", line)
+        try:
+            requirements.append(Requirement(line))
+        except InvalidRequirement:
+            if local is not None and _looks_local(line):
+                local.append(_local_target(path.parent, line))
+            continue
+    return requirements
+
+
+def _looks_local(line: str) -> bool:
+    """Si una línea sin nombre de proyecto es una ruta o un archivo (``./lib``, ``dist/x.whl``)"""
+    return line.startswith((".", "/", "~")) or os.sep in line or "/" in line
+
+
+def _local_target(base: Path, target: str) -> str:
+    """Ruta relativa al archivo de requisitos como absoluta; URLs (``git+https://...``) tal cual"""
+    if "://" in target or target.startswith("file:"):
+        return target
+    return str((base / os.path.expanduser(target)).resolve())
+
+
+def option_value(args: list, options: tuple) -> Optional[str]:
+    """Valor de la primera de ``options`` (``-t dir``, ``--target=dir``) en unos argumentos de pip
+
+    Solo lee; ``aetos.extract_option`` además la quita, sin importar este módulo al arrancar.
+    """
+    for i, arg in enumerate(args):
+        if arg in options and i + 1 < len(args):
+            return args[i + 1]
+        for option in options:
+            if arg.startswith(option + "="):
+                return arg.split("=", 1)[1]
+    return None
+
+
+def parse_artifact_filename(filename: str) -> Optional[Tuple[str, str]]:
+    """(nombre normalizado, versión) de un wheel o sdist, o None si no se reconoce"""
+    if filename.endswith(".whl"):
+        parts = filename[:-4].split("-")
+        if len(parts) >= 5:
+            return canonicalize_name(parts[0]), parts[1]
+        return None
+    for suffix in (".tar.gz", ".zip", ".tar.bz2"):
+        if filename.endswith(suffix):
+            name, _, version = filename[:-len(suffix)].rpartition("-")
+            if name and version:
+                return canonicalize_name(name), version
+    return None
+
+
+def distributions_by_name(paths: Optional[List[Path]] = None) -> dict:
+    """Distribuciones instaladas en ``paths`` (o en sys.path) indexadas por nombre normalizado"""
+    search_path = [str(p) for p in paths] if paths is not None else sys.path
+    dists = {}
+    for dist in importlib_metadata.distributions(path=search_path):
+        name = dist.metadata["Name"]
+        if name:
+            dists.setdefault(canonicalize_name(name), dist)
+    return dists
+
+
+def requirement_edges(dist) -> List[Tuple[str, str]]:
+    """Dependencias directas (sin extras) de una distribución como (nombre normalizado, especificador)"""
+    edges = []
+    for line in dist.requires or []:
+        try:
+            req = Requirement(line)
+        except InvalidRequirement:
+            continue
+        if req.marker is not None and not req.marker.evaluate({"extra": ""}):
+            continue
+        edges.append((canonicalize_name(req.name), str(req.specifier)))
+    return edges
+
+
+def requirement_dependencies(dist) -> List[str]:
+    """Nombres normalizados de las dependencias directas (sin extras) de una distribución"""
+    return [name for name, _ in requirement_edges(dist)]
+
+
+def marker_applies(marker, environment: Optional[dict] = None) -> bool:
+    """Si un marcador de entorno (objeto o texto) se cumple; sin marcador, siempre
+
+    ``environment`` sustituye variables del intérprete actual (p. ej. las de
+    otro entorno virtual). Un marcador inválido se deja pasar: decide pip.
+    """
+    if not marker:
+        return True
+    try:
+        marker = Marker(marker) if isinstance(marker, str) else marker
+    except InvalidMarker:
+        return True
+    return marker.evaluate({"extra": "", **(environment or {})})
+
+
+def requirement_spec(req: Requirement) -> str:
+    """Requisito como texto para pip, sin marcadores de entorno (las URLs se conservan)"""
+    extras = "[{}]".format(",".join(sorted(req.extras))) if req.extras else ""
+    if req.url:
+        return f"{req.name}{extras} @ {req.url}"
+    return f"{req.name}{extras}{req.specifier}"
+
+
+def direct_url(dist) -> Optional[dict]:
+    """Contenido de ``direct_url.json`` (PEP 610) de una distribución, o None si vino del índice"""
+    try:
+        data = json.loads(dist.read_text("direct_url.json") or "null")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def is_local_install(dist) -> bool:
+    """Si se instaló en modo editable o desde un directorio o archivo local"""
+    origin = direct_url(dist)
+    return origin is not None and ("dir_info" in origin or origin.get("url", "").startswith("file:"))
+
+
+def requirement_satisfied(req: Requirement, dist) -> bool:
+    """Si la distribución instalada cumple el requisito (con URL, si vino de esa URL)"""
+    if req.url:
+        origin = direct_url(dist) or {}
+        return origin.get("url", "").split("#", 1)[0] == req.url.split("#", 1)[0]
+    return req.specifier.contains(dist.version, prereleases=True)
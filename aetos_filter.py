@@ -0,0 +1,541 @@
+# aetos_filter.py
+# Proxy local del índice: poda las páginas de proyecto a los archivos que este intérprete puede instalar
+
+import base64
+import hashlib
+import html
+import http.client
+import itertools
+import json
+import os
+import re
+import shutil
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple, Optional
+
+if __package__:
+    from . import aetos_hashes, aetos_http, aetos_pages
+else:
+    import aetos_hashes
+    import aetos_http
+    import aetos_pages
+
+try:
+    from packaging.specifiers import InvalidSpecifier, SpecifierSet
+    from packaging.tags import sys_tags
+except ImportError:  # pip siempre trae su copia de packaging
+    from pip._vendor.packaging.specifiers import InvalidSpecifier, SpecifierSet
+    from pip._vendor.packaging.tags import sys_tags
+
+# Una página podada se sirve sin revalidar durante este tiempo (como el max-age de PyPI)
+PAGE_MAX_AGE = 600
+
+# Opciones de pip con las que el intérprete de destino no es este (no se filtra)
+FOREIGN_TARGET_OPTIONS = (
+    "--platform", "--python-version", "--implementation", "--abi", "--python",
+    "--no-index", "-i", "--index-url",
+)
+
+# Enlaces de una página HTML (PEP 503): <a ...>archivo</a>, con su <br> y salto de línea
+ANCHOR_RE = re.compile(r"<a\s([^>]*)>.*?</a>((?:\s*<br\s*/?>)?[ \t]*\r?\n?)", re.IGNORECASE | re.DOTALL)
+HREF_RE = re.compile(r"""(\shref\s*=\s*)("[^"]*"|'[^']*'|[^\s>]+)""", re.IGNORECASE)
+ATTRIBUTE_RE = re.compile(r"""([\w-]+)\s*=\s*("[^"]*"|'[^']*'|[^\s>]+)""")
+
+# Enlaces a archivos servidos por el proxy: /~files/<sha256 o ->/<URL en base64>/<archivo>
+TEE_PREFIX = "/~files/"
+SHA256_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def target_python() -> str:
+    """Versión con la que pip evalúa Requires-Python (sin sufijos de prelanzamiento)"""
+    return ".".join(str(part) for part in sys.version_info[:3])
+
+
+def tag_set_key(tags: Iterable[str], python: str) -> str:
+    """Identificador del conjunto de etiquetas y versión: separa las cachés podadas"""
+    digest = hashlib.sha256("\n".join([python] + sorted(tags)).encode())
+    return digest.hexdigest()[:16]
+
+
+def applies_to(args: list) -> bool:
+    """Si la instalación es para este intérprete (con otra plataforma o índice no se poda)"""
+    return not any(arg == option or arg.startswith(option + "=")
+                   for arg in args for option in FOREIGN_TARGET_OPTIONS)
+
+
+class FileFilter:
+    """Decide qué archivos de una página puede instalar el intérprete de destino
+
+    Se descartan los wheels sin ninguna etiqueta soportada y los archivos cuyo
+    Requires-Python excluye la versión de destino. Los sdists y lo que no se
+    entiende se conservan: decide pip.
+    """
+
+    def __init__(self, tags: Optional[Iterable[str]] = None, python: Optional[str] = None):
+        self.tags = frozenset(tags) if tags is not None else frozenset(str(tag) for tag in sys_tags())
+        self.python = python or target_python()
+        self.key = tag_set_key(self.tags, self.python)
+        # Miles de archivos comparten unas pocas etiquetas y especificadores
+        self._wheels = {}
+        self._specifiers = {}
+
+    def _tags_supported(self, stem: str) -> bool:
+        """Si alguna etiqueta del wheel (``py3.py2-none-any`` se expande) está soportada"""
+        parts = stem.split("-")
+        if len(parts) < 5:
+            return True  # nombre de wheel inválido: que lo descarte pip
+        key = "-".join(parts[-3:])
+        if key not in self._wheels:
+            interpreters, abis, platforms = (part.split(".") for part in parts[-3:])
+            self._wheels[key] = any(
+                f"{interpreter}-{abi}-{platform}" in self.tags
+                for interpreter in interpreters for abi in abis for platform in platforms
+            )
+        return self._wheels[key]
+
+    def _python_supported(self, requires_python: Optional[str]) -> bool:
+        if not requires_python:
+            return True
+        if requires_python not in self._specifiers:
+            try:
+                specifier = SpecifierSet(requires_python)
+            except InvalidSpecifier:
+                self._specifiers[requires_python] = True
+            else:
+                self._specifiers[requires_python] = specifier.contains(self.python, prereleases=True)
+        return self._specifiers[requires_python]
+
+    def compatible(self, filename: str, requires_python: Optional[str] = None) -> bool:
+        if filename.endswith(".whl") and not self._tags_supported(filename[:-len(".whl")]):
+            return False
+        return self._python_supported(requires_python)
+
+
+class KeepAllFilter:
+    """No poda nada: el proxy solo hace falta para guardar las descargas (ver ``tee_link``)"""
+    key = "all"
+    tags = frozenset()
+    python = target_python()
+
+    def compatible(self, filename: str, requires_python: Optional[str] = None) -> bool:
+        return True
+
+
+def tee_link(url: str, sha256: Optional[str] = None) -> str:
+    """Enlace para que pip baje ``url`` a través del proxy, que lo guarda en la caché de wheels
+
+    Es relativo a la raíz, así que sirve en cualquier puerto, y termina en el
+    nombre del archivo, del que pip saca nombre y versión. El fragmento
+    (``#sha256=...``) se conserva: pip sigue comprobando el hash.
+    """
+    base, _, fragment = url.partition("#")
+    filename = urllib.parse.urlsplit(base).path.rsplit("/", 1)[-1]
+    token = base64.urlsafe_b64encode(base.encode()).decode().rstrip("=")
+    link = f"{TEE_PREFIX}{sha256 or '-'}/{token}/{filename}"
+    return f"{link}#{fragment}" if fragment else link
+
+
+def parse_tee_path(path: str) -> tuple:
+    """(URL del índice, sha256 o None, nombre de archivo) de un enlace de ``tee_link``
+
+    Un nombre que termina en ``.metadata`` pide los metadatos aparte del
+    archivo (PEP 658). Lanza ValueError si la ruta no es de ``tee_link``.
+    """
+    if not path.startswith(TEE_PREFIX):
+        raise ValueError(f"no es un enlace del proxy: {path}")
+    sha256, token, filename = (path[len(TEE_PREFIX):].split("/") + ["", ""])[:3]
+    filename = urllib.parse.unquote(filename)
+    if (path.count("/") != 4 or not filename or filename.startswith(".")
+            or "/" in filename or "\\" in filename):
+        raise ValueError(f"enlace del proxy inválido: {path}")
+    if sha256 != "-" and not SHA256_RE.fullmatch(sha256):
+        raise ValueError(f"sha256 inválido: {sha256}")
+    try:
+        url = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+    except ValueError as e:
+        raise ValueError(f"enlace del proxy inválido: {path}") from e
+    if urllib.parse.urlsplit(url).scheme not in ("http", "https"):
+        raise ValueError(f"el proxy solo descarga por HTTP: {url}")
+    if filename.endswith(".metadata") and not url.endswith(".metadata"):
+        url += ".metadata"
+    return url, None if sha256 == "-" else sha256, filename
+
+
+def upstream_url(url: str) -> str:
+    """URL del índice detrás de un enlace de ``tee_link`` (las demás se devuelven tal cual)"""
+    try:
+        return parse_tee_path(urllib.parse.urlsplit(url).path)[0]
+    except ValueError:
+        return url
+
+
+def _fragment_sha256(url: str) -> Optional[str]:
+    fragment = urllib.parse.urlsplit(url).fragment
+    return fragment[len("sha256="):] if fragment.startswith("sha256=") else None
+
+
+def prune_json(body: bytes, page_url: str, file_filter: FileFilter,
+               rewrite: Optional[Callable[[str, Optional[str]], str]] = None) -> tuple:
+    """Poda una página JSON (PEP 691); retorna (cuerpo, archivos conservados, archivos totales)
+
+    ``rewrite`` recibe la URL absoluta y el sha256 de cada archivo conservado y
+    retorna el enlace que verá pip (ver ``tee_link``).
+    """
+    data = json.loads(body)
+    files = data.get("files", [])
+    kept = []
+    for entry in files:
+        if file_filter.compatible(entry.get("filename", ""), entry.get("requires-python")):
+            if "url" in entry:
+                entry["url"] = urllib.parse.urljoin(page_url, entry["url"])
+                if rewrite is not None:
+                    entry["url"] = rewrite(entry["url"], (entry.get("hashes") or {}).get("sha256"))
+            kept.append(entry)
+    data["files"] = kept
+    return json.dumps(data).encode(), len(kept), len(files)
+
+
+def prune_html(body: bytes, page_url: str, file_filter: FileFilter,
+               rewrite: Optional[Callable[[str, Optional[str]], str]] = None) -> tuple:
+    """Poda una página HTML (PEP 503); retorna (cuerpo, archivos conservados, archivos totales)
+
+    Los enlaces relativos pasan a absolutos: pip descarga los archivos del
+    índice directamente, sin pasar por el proxy. Con ``rewrite``, como en
+    ``prune_json``.
+    """
+    text = body.decode("utf-8", errors="replace")
+    kept = total = 0
+
+    def replace(match) -> str:
+        nonlocal kept, total
+        attributes = {name.lower(): html.unescape(value.strip("\"'"))
+                      for name, value in ATTRIBUTE_RE.findall(match.group(1))}
+        href = attributes.get("href")
+        if href is None:
+            return match.group(0)
+        total += 1
+        url = urllib.parse.urljoin(page_url, href)
+        filename = urllib.parse.unquote(urllib.parse.urlsplit(url).path.rsplit("/", 1)[-1])
+        if not file_filter.compatible(filename, attributes.get("data-requires-python")):
+            return ""
+        kept += 1
+        if rewrite is not None:
+            url = rewrite(url, _fragment_sha256(url))
+        absolute = html.escape(url, quote=True)
+        return HREF_RE.sub(lambda m: f'{m.group(1)}"{absolute}"', match.group(0), count=1)
+
+    text = ANCHOR_RE.sub(replace, text)
+    return text.encode("utf-8"), kept, total
+
+
+def accepts_json(accept: str) -> bool:
+    """Si la cabecera Accept del cliente admite páginas JSON (pip >= 22.2); sin cabecera, sí"""
+    if not accept.strip():
+        return True
+    for item in accept.split(","):
+        media_type, _, params = item.partition(";")
+        if media_type.strip().lower() not in (aetos_http.SIMPLE_JSON, "*/*"):
+            continue
+        quality = re.search(r"q\s*=\s*([0-9.]+)", params)
+        try:
+            return not quality or float(quality.group(1)) > 0
+        except ValueError:
+            return True
+    return False
+
+
+def json_to_html(body: bytes) -> bytes:
+    """Página JSON (PEP 691) como HTML (PEP 503), para clientes que no entienden JSON"""
+    data = json.loads(body)
+    name = html.escape(data.get("name", ""))
+    lines = ["<!DOCTYPE html>", "<html>", f"<head><title>Links for {name}</title></head>", "<body>",
+             f"<h1>Links for {name}</h1>"]
+    for entry in data.get("files", []):
+        url = entry.get("url", "")
+        hashes = entry.get("hashes") or {}
+        if "sha256" in hashes:
+            url += f"#sha256={hashes['sha256']}"
+        attributes = [f'href="{html.escape(url, quote=True)}"']
+        if entry.get("requires-python"):
+            attributes.append(f'data-requires-python="{html.escape(entry["requires-python"], quote=True)}"')
+        yanked = entry.get("yanked")
+        if yanked:
+            reason = yanked if isinstance(yanked, str) else ""
+            attributes.append(f'data-yanked="{html.escape(reason, quote=True)}"')
+        metadata = entry.get("core-metadata", entry.get("dist-info-metadata"))
+        if metadata:
+            value = "true"
+            if isinstance(metadata, dict) and "sha256" in metadata:
+                value = f"sha256={metadata['sha256']}"
+            attributes.append(f'data-dist-info-metadata="{value}" data-core-metadata="{value}"')
+        lines.append(f'<a {" ".join(attributes)}>{html.escape(entry.get("filename", ""))}</a><br/>')
+    lines += ["</body>", "</html>", ""]
+    return "\n".join(lines).encode("utf-8")
+
+
+class PageBody(NamedTuple):
+    """Cuerpo de una página por bloques, con su tamaño total (el Content-Length)"""
+    chunks: Iterable[bytes]
+    size: int
+
+    @classmethod
+    def of(cls, body: bytes) -> "PageBody":
+        return cls([body], len(body))
+
+    def read(self) -> bytes:
+        try:
+            body = b"".join(self.chunks)
+        except aetos_http.DECODE_ERRORS as e:
+            raise ValueError(f"página en caché ilegible: {e}") from e
+        if len(body) != self.size:
+            raise ValueError("página en caché incompleta")
+        return body
+
+
+class FilteringProxy:
+    """Índice local delante del configurado que sirve las páginas de proyecto podadas
+
+    ``/`` se reenvía tal cual; ``/<proyecto>/`` se pide al índice (JSON si lo
+    ofrece), se poda con ``file_filter`` y se guarda en una caché por
+    conjunto de etiquetas. Una página guardada se sirve sin preguntar durante
+    ``max_age`` segundos y después se revalida con una petición condicional.
+
+    Con ``wheelhouse``, los enlaces de las páginas apuntan al proxy
+    (``tee_link``): pip descarga cada archivo a través de él y el proxy deja en
+    ``wheelhouse`` los que coinciden con el sha256 publicado. Así lo que pip
+    baja para resolver no se vuelve a bajar después (``aetos install --pipeline``).
+    """
+
+    def __init__(self, index_url: str, cache_dir: Path, file_filter: Optional[FileFilter] = None,
+                 max_age: float = PAGE_MAX_AGE, host: str = "127.0.0.1", port: int = 0,
+                 wheelhouse: Optional[Path] = None, trusted_hosts: Iterable[str] = ()):
+        self.index_url = index_url.rstrip("/") + "/"
+        self.file_filter = file_filter or FileFilter()
+        self.wheelhouse = Path(wheelhouse) if wheelhouse is not None else None
+        self.trusted_hosts = frozenset(trusted_hosts)
+        # Las páginas con enlaces al proxy solo las puede servir un proxy que guarde descargas
+        key = self.file_filter.key + ("-tee" if self.wheelhouse is not None else "")
+        self.cache = aetos_pages.PageCache(Path(cache_dir) / key)
+        self.memo = aetos_hashes.HashMemo(self.wheelhouse) if self.wheelhouse is not None else None
+        self.max_age = max_age
+        self.stats = {"pages": 0, "files": 0, "kept": 0, "revalidated": 0, "saved": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "FilteringProxy":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def prunes(self) -> bool:
+        return not isinstance(self.file_filter, KeepAllFilter)
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self.memo is not None:
+            try:
+                self.memo.save()
+            except OSError:
+                pass  # solo se pierde el atajo: la tubería volverá a hashear
+
+    def __enter__(self) -> "FilteringProxy":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _count(self, **amounts) -> None:
+        with self._lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+
+    def _cached(self, url: str) -> tuple:
+        """(meta, cuerpo, si sigue fresca) de la página podada guardada, o (None, None, False)
+
+        El cuerpo es un ``PageBody`` que se descomprime a medida que se envía
+        (``PageCache.iter_body``). El primer bloque se lee aquí, así una copia
+        ilegible se descarta antes de empezar a responder.
+        """
+        meta = self.cache.meta(url)
+        if meta is None:
+            return None, None, False
+        try:
+            age = time.time() - self.cache.entry_path(url).stat().st_mtime
+            chunks = self.cache.iter_body(url)
+            first = next(chunks, b"")
+        except (KeyError, OSError, ValueError) + aetos_http.DECODE_ERRORS:
+            return None, None, False
+        return meta, PageBody(itertools.chain([first], chunks), meta["size"]), age < self.max_age
+
+    def project_page(self, project: str, json_ok: bool = True) -> tuple:
+        """(cuerpo podado, Content-Type) de un proyecto; lanza OSError si el índice falla"""
+        body, content_type = self.open_project_page(project, json_ok)
+        return body.read(), content_type
+
+    def open_project_page(self, project: str, json_ok: bool = True) -> tuple:
+        """(``PageBody``, Content-Type) de un proyecto, para enviarlo por bloques
+
+        Sin ``json_ok`` (pip anterior a 22.2 no entiende PEP 691) una página
+        JSON se sirve convertida a HTML.
+        """
+        body, content_type = self._project_page(project)
+        if not json_ok and content_type.split(";")[0].strip() == aetos_http.SIMPLE_JSON:
+            return PageBody.of(json_to_html(body.read())), "text/html"
+        return body, content_type
+
+    def _project_page(self, project: str) -> tuple:
+        """Página podada tal como la sirve el índice (JSON si lo admite), con caché"""
+        url = f"{self.index_url}{urllib.parse.quote(project)}/"
+        meta, body, fresh = self._cached(url)
+        if fresh:
+            return body, meta["headers"].get("Content-Type", "text/html")
+
+        headers = {"Accept": aetos_http.SIMPLE_ACCEPT}
+        if meta is not None:
+            headers.update(aetos_http.conditional_headers(
+                meta["headers"].get("ETag"), meta["headers"].get("Last-Modified")))
+        try:
+            response = aetos_http.fetch(url, headers)
+        except OSError as e:
+            if body is None or getattr(e, "code", None) == 404:
+                raise
+            return body, meta["headers"].get("Content-Type", "text/html")  # índice caído: copia vieja
+
+        if response.not_modified and body is not None:
+            os.utime(self.cache.entry_path(url))
+            self._count(revalidated=1)
+            return body, meta["headers"].get("Content-Type", "text/html")
+
+        prune = prune_json if response.is_json else prune_html
+        pruned, kept, total = prune(response.body, response.url or url, self.file_filter,
+                                    rewrite=tee_link if self.wheelhouse is not None else None)
+        self._count(pages=1, files=total, kept=kept)
+        try:
+            self.cache.put(url, pruned, response.headers)
+        except OSError:
+            pass
+        return PageBody.of(pruned), response.headers.get("Content-Type", "text/html")
+
+    def keep(self, url: str, sha256: Optional[str], filename: str) -> tuple:
+        """Descarga un archivo para pip; retorna (ruta, si es temporal y hay que borrarla)
+
+        Lo que ya está en ``wheelhouse`` con el sha256 publicado se sirve sin
+        bajarlo. Un archivo que no coincide con su hash no entra en la caché:
+        se sirve igual y pip lo rechaza. Sin hash publicado se guarda como en
+        ``aetos_pipeline.fetch_verified``, memorizado tras una descarga completa.
+        """
+        target = self.wheelhouse / filename
+        if sha256 and aetos_hashes.verify_cached(self.memo, target, sha256):
+            return target, False
+        partial = self.wheelhouse / f".{filename}.{os.getpid()}.{threading.get_ident()}.part"
+        insecure = urllib.parse.urlsplit(url).hostname in self.trusted_hosts
+        try:
+            digest = aetos_http.download_file(url, partial, insecure=insecure)
+        except BaseException:
+            if partial.exists():
+                partial.unlink()
+            raise
+        if (sha256 and digest != sha256) or not aetos_hashes.is_cached_artifact(filename):
+            return partial, True
+        os.replace(partial, target)
+        self.memo.record(target, digest)
+        self._count(saved=1)
+        return target, False
+
+    def _make_handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                parts = [p for p in path.split("/") if p]
+                try:
+                    if proxy.wheelhouse is not None and path.startswith(TEE_PREFIX):
+                        self._send_artifact(*parse_tee_path(path))
+                        return
+                    if not parts:
+                        response = aetos_http.fetch(proxy.index_url, {"Accept": self.headers.get("Accept", "")})
+                        body, content_type = response.body, response.headers.get("Content-Type", "text/html")
+                    elif len(parts) == 1:
+                        page, content_type = proxy.open_project_page(
+                            urllib.parse.unquote(parts[0]), accepts_json(self.headers.get("Accept", "")))
+                        self._send_page(page, content_type)
+                        return
+                    else:
+                        self._send(404, b"Not Found", "text/plain")
+                        return
+                except urllib.error.HTTPError as e:
+                    self._send(e.code, str(e.reason).encode(), "text/plain")
+                    return
+                except (OSError, ValueError) as e:
+                    self._send(502, str(e).encode(), "text/plain")
+                    return
+                self._send(200, body, content_type)
+
+            def _send_artifact(self, url: str, sha256: Optional[str], filename: str):
+                if filename.endswith(".metadata"):
+                    self._send(200, aetos_http.fetch(url).body, "application/octet-stream")
+                    return
+                try:
+                    path, temporary = proxy.keep(url, sha256, filename)
+                except urllib.error.HTTPError:
+                    raise
+                except (OSError, http.client.HTTPException) as e:
+                    # pip reintenta los 503, como los errores pasajeros del índice
+                    self._send(503, str(e).encode(), "text/plain")
+                    return
+                try:
+                    with open(path, 'rb') as f:
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/octet-stream")
+                        self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                        self.send_header("Cache-Control", "no-store")
+                        self.end_headers()
+                        shutil.copyfileobj(f, self.wfile, aetos_http.ARTIFACT_CHUNK_SIZE)
+                except OSError:
+                    self.close_connection = True
+                finally:
+                    if temporary and path.exists():
+                        path.unlink()
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self._send_page(PageBody.of(body), content_type, status)
+
+            def _send_page(self, page: "PageBody", content_type: str, status: int = 200):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(page.size))
+                # El puerto cambia en cada ejecución: que pip no guarde estas páginas
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                sent = 0
+                try:
+                    for chunk in page.chunks:
+                        self.wfile.write(chunk)
+                        sent += len(chunk)
+                except (ValueError,) + aetos_http.DECODE_ERRORS:
+                    pass  # copia dañada a mitad de camino: se corta la conexión
+                if sent != page.size:
+                    self.close_connection = True
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,181 @@
+# aetos_graph.py
+# Grafo de dependencias del entorno (directo e inverso) en caché, para aetos tree y aetos why
+
+import hashlib
+import marshal
+import os
+import re
+import sys
+from collections import deque
+from typing import List, Optional
+
+# Cambia si cambia la forma del grafo guardado
+GRAPH_FORMAT = 1
+
+
+def environment_paths() -> List[str]:
+    """Directorios donde se buscan distribuciones: el sys.path sin el directorio actual"""
+    cwd = os.getcwd()
+    return [path for path in sys.path if path and os.path.abspath(path) != cwd]
+
+
+def state_key(paths: List[str]) -> tuple:
+    """Estado de los directorios del entorno: (ruta, mtime, inodo) de cada uno
+
+    Instalar o desinstalar crea o borra entradas ``*.dist-info`` y eso cambia
+    el mtime del directorio: basta un stat por directorio para saber si el
+    grafo guardado sigue valiendo.
+    """
+    key = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            key.append((path, None, None))
+            continue
+        key.append((path, stat.st_mtime_ns, stat.st_ino))
+    return tuple(key)
+
+
+def cache_file(cache_dir, paths: List[str]) -> str:
+    """Archivo del grafo de un entorno concreto (intérprete y rutas)"""
+    digest = hashlib.sha256("\0".join([sys.executable] + paths).encode()).hexdigest()[:16]
+    return os.path.join(str(cache_dir), "envgraph", f"{digest}.marshal")
+
+
+def build_graph(paths: List[str]) -> dict:
+    """Lee los metadatos de todas las distribuciones y arma los índices directo e inverso
+
+    ``nodes`` guarda [nombre, versión, pedido por el usuario]; ``forward`` las
+    dependencias de cada una como [nombre, especificador]; ``reverse`` quién
+    depende de cada nombre (esté instalado o no).
+    """
+    # ⚡ importlib.metadata y packaging solo hacen falta al reconstruir
+    if __package__:
+        from . import aetos_env
+    else:
+        import aetos_env
+
+    nodes, forward, reverse = {}, {}, {}
+    for name, dist in aetos_env.distributions_by_name([os.fspath(p) for p in paths]).items():
+        requested = dist.read_text("REQUESTED") is not None
+        nodes[name] = [dist.metadata["Name"], dist.version, requested]
+        edges = [[dependency, spec] for dependency, spec in aetos_env.requirement_edges(dist)
+                 if dependency != name]
+        forward[name] = sorted(edges)
+        for dependency, _ in edges:
+            reverse.setdefault(dependency, []).append(name)
+    for dependents in reverse.values():
+        dependents.sort()
+    return {"nodes": nodes, "forward": forward, "reverse": reverse}
+
+
+def load_graph(cache_dir, paths: Optional[List[str]] = None, refresh: bool = False) -> tuple:
+    """Grafo del entorno desde la caché, o reconstruido si el entorno cambió
+
+    Retorna (grafo, si venía de la caché).
+    """
+    paths = environment_paths() if paths is None else [os.fspath(p) for p in paths]
+    path = cache_file(cache_dir, paths)
+    key = state_key(paths)
+    if not refresh:
+        try:
+            with open(path, 'rb') as f:
+                cached = marshal.load(f)
+            if cached[0] == GRAPH_FORMAT and cached[1] == key:
+                return cached[2], True
+        except (OSError, EOFError, ValueError, TypeError, IndexError):
+            pass
+
+    graph = build_graph(paths)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            marshal.dump((GRAPH_FORMAT, key, graph), f)
+        os.replace(tmp, path)
+    except (OSError, ValueError):
+        pass  # sin caché también se responde, solo que más lento
+    return graph, False
+
+
+def find(graph: dict, name: str) -> Optional[str]:
+    """Nombre normalizado de ``name`` si está en el grafo
+
+    Misma normalización que ``aetos_env.canonicalize_name``, sin importar
+    packaging: con la caché válida no hace falta.
+    """
+    key = re.sub(r"[-_.]+", "-", name).lower()
+    return key if key in graph["nodes"] else None
+
+
+def top_level(graph: dict) -> List[str]:
+    """Distribuciones de las que no depende ninguna otra instalada"""
+    return sorted(name for name in graph["nodes"] if not graph["reverse"].get(name))
+
+
+def _describe(graph: dict, name: str) -> tuple:
+    node = graph["nodes"].get(name)
+    return (node[0], node[1]) if node else (name, None)
+
+
+def render_tree(graph: dict, roots: List[str], reverse: bool = False,
+                max_depth: Optional[int] = None) -> List[str]:
+    """Líneas del árbol de dependencias (o de dependientes, con ``reverse``) de ``roots``
+
+    Cada subárbol se despliega una sola vez; las repeticiones se marcan con
+    "(ver arriba)" y los ciclos con "(ciclo)".
+    """
+    lines, expanded = [], set()
+
+    def children(name: str) -> list:
+        if not reverse:
+            return graph["forward"].get(name, [])
+        return [[dependent, spec] for dependent in graph["reverse"].get(name, [])
+                for dependency, spec in graph["forward"].get(dependent, []) if dependency == name]
+
+    # Recorrido en profundidad con pila explícita: (nombre, especificador, profundidad, camino)
+    stack = [(name, None, 0, ()) for name in reversed(roots)]
+    while stack:
+        name, spec, depth, path = stack.pop()
+        display, version = _describe(graph, name)
+        if depth == 0:
+            line = f"{display}=={version}" if version else f"{display} (no instalado)"
+        else:
+            requirement = spec or "cualquiera"
+            installed = version or "no instalado"
+            if reverse:
+                line = f"{'  ' * depth}- {display}=={version} [requiere: {requirement}]"
+            else:
+                line = f"{'  ' * depth}- {display} [requerido: {requirement}, instalado: {installed}]"
+        nested = children(name)
+        if name in path:
+            lines.append(line + " (ciclo)")
+            continue
+        if nested and name in expanded:
+            lines.append(line + " (ver arriba)")
+            continue
+        lines.append(line)
+        if max_depth is not None and depth >= max_depth:
+            continue
+        expanded.add(name)
+        for child, child_spec in reversed(nested):
+            stack.append((child, child_spec, depth + 1, path + (name,)))
+    return lines
+
+
+def requiring_roots(graph: dict, name: str) -> List[str]:
+    """Distribuciones que nadie requiere (o pedidas por el usuario) que acaban trayendo ``name``"""
+    roots, seen = set(), {name}
+    queue = deque([name])
+    while queue:
+        current = queue.popleft()
+        dependents = graph["reverse"].get(current, [])
+        node = graph["nodes"].get(current)
+        if current != name and (not dependents or (node and node[2])):
+            roots.add(current)
+        for dependent in dependents:
+            if dependent not in seen:
+                seen.add(dependent)
+                queue.append(dependent)
+    return sorted(roots)
@@ -0,0 +1,196 @@
+# aetos_hashes.py
+# Integridad de la caché de artefactos: hashes por mmap en paralelo, memorizados por archivo
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional
+
+if __package__:
+    from . import aetos_env, aetos_lock
+else:
+    import aetos_env
+    import aetos_lock
+
+MEMO_FILE = "hashes.json"
+MEMO_LOCK = "hashes.lock"
+
+
+class VerifyResult(NamedTuple):
+    checked: int
+    hashed: int
+    trusted: int
+    bytes_hashed: int
+    new: List[str]
+    corrupt: dict
+
+
+def mmap_sha256(path: Path) -> str:
+    """sha256 de un archivo leído por mmap, sin copiarlo a memoria de Python
+
+    hashlib suelta el GIL con búferes grandes, así que varios hilos hashean en
+    paralelo de verdad.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def file_key(stat: os.stat_result) -> list:
+    """Identidad de una versión concreta del archivo: (inodo, tamaño, mtime)"""
+    return [stat.st_ino, stat.st_size, stat.st_mtime_ns]
+
+
+def is_cached_artifact(name: str) -> bool:
+    return not name.startswith(".") and aetos_env.parse_artifact_filename(name) is not None
+
+
+class HashMemo:
+    """Hash de referencia de cada artefacto y la versión del archivo que lo cumplía
+
+    Un nombre de artefacto es inmutable en el índice: si el contenido deja de
+    coincidir con su hash de referencia, el archivo está corrupto. La clave
+    (inodo, tamaño, mtime) solo dice si hace falta volver a hashear.
+    """
+
+    def __init__(self, wheelhouse: Path):
+        self.path = Path(wheelhouse) / MEMO_FILE
+        self._lock = threading.Lock()
+        # Cambios de este proceso (None = olvidado), para mezclarlos al guardar
+        self._changes = {}
+        self.entries = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def reference(self, name: str) -> Optional[str]:
+        entry = self.entries.get(name)
+        return entry["sha256"] if entry else None
+
+    def is_current(self, path: Path, stat: os.stat_result, sha256: Optional[str] = None) -> bool:
+        """Si el archivo no cambió desde que se comprobó (y tiene el hash ``sha256``, si se da)"""
+        entry = self.entries.get(path.name)
+        return (
+            entry is not None
+            and entry.get("key") == file_key(stat)
+            and (sha256 is None or entry["sha256"] == sha256)
+        )
+
+    def record(self, path: Path, sha256: str, stat: Optional[os.stat_result] = None) -> None:
+        stat = stat or os.stat(path)
+        entry = {"sha256": sha256, "key": file_key(stat)}
+        with self._lock:
+            self.entries[path.name] = self._changes[path.name] = entry
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            self.entries.pop(name, None)
+            self._changes[name] = None
+
+    def save(self) -> None:
+        """Guarda los cambios de este proceso sobre lo que haya en disco
+
+        Bajo el bloqueo se vuelve a leer el archivo, así que dos verificaciones
+        a la vez no se pisan las entradas.
+        """
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with aetos_lock.FileLock(self.path.with_name(MEMO_LOCK)):
+            entries = self._load()
+            with self._lock:
+                for name, entry in self._changes.items():
+                    if entry is None:
+                        entries.pop(name, None)
+                    else:
+                        entries[name] = entry
+                self._changes = {}
+                self.entries = entries
+                data = json.dumps(entries, sort_keys=True)
+            try:
+                with open(tmp, 'w') as f:
+                    f.write(data)
+                os.replace(tmp, self.path)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+
+
+def verify_cached(memo: HashMemo, path: Path, sha256: str) -> bool:
+    """Si un artefacto en caché tiene ``sha256``; solo se hashea si cambió desde la última vez"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if memo.is_current(path, stat, sha256):
+        return True
+    if mmap_sha256(path) != sha256:
+        return False
+    memo.record(path, sha256, stat)
+    return True
+
+
+def verify_cache(wheelhouse: Path, fast: bool = False, jobs: Optional[int] = None,
+                 on_corrupt: Optional[Callable[[str, str, str], None]] = None) -> VerifyResult:
+    """Comprueba todos los artefactos de la caché contra su hash de referencia
+
+    Sin ``fast`` se hashea todo (detecta también corrupción silenciosa del
+    disco); con ``fast`` se confía en los archivos cuya clave no cambió. Los
+    artefactos sin referencia (descargados por pip) se hashean y la toman.
+    ``on_corrupt`` recibe (archivo, hash esperado, hash obtenido).
+    """
+    wheelhouse = Path(wheelhouse)
+    memo = HashMemo(wheelhouse)
+    names = sorted(name for name in os.listdir(wheelhouse)
+                   if is_cached_artifact(name) and os.path.isfile(wheelhouse / name))
+    for name in set(memo.entries) - set(names):
+        memo.forget(name)
+
+    lock = threading.Lock()
+    hashed = trusted = bytes_hashed = 0
+    new, corrupt, vanished = [], {}, []
+
+    def check(name: str) -> None:
+        nonlocal hashed, trusted, bytes_hashed
+        path = wheelhouse / name
+        try:
+            stat = os.stat(path)
+            if fast and memo.is_current(path, stat):
+                with lock:
+                    trusted += 1
+                return
+            digest = mmap_sha256(path)
+        except FileNotFoundError:
+            # Borrado o reemplazado desde el listado (cache clean, una instalación): se omite
+            with lock:
+                vanished.append(name)
+            memo.forget(name)
+            return
+        reference = memo.reference(name)
+        with lock:
+            hashed += 1
+            bytes_hashed += stat.st_size
+            if reference is None:
+                new.append(name)
+            elif digest != reference:
+                corrupt[name] = digest
+        if reference is None or digest == reference:
+            memo.record(path, digest, stat)
+        elif on_corrupt:
+            on_corrupt(name, reference, digest)
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 4) as pool:
+        list(pool.map(check, names))
+    memo.save()
+    return VerifyResult(len(names) - len(vanished), hashed, trusted, bytes_hashed, sorted(new), corrupt)
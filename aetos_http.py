@@ -0,0 +1,198 @@
+# aetos_http.py
+# Capa de acceso HTTP al índice (peticiones condicionales, cabeceras comunes)
+
+import hashlib
+import http.client
+import ssl
+import urllib.error
+import urllib.request
+import zlib
+from email.message import Message
+from typing import NamedTuple, Optional
+
+# Códecs opcionales: se anuncian al servidor solo si están instalados
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+USER_AGENT = "aetos"
+DEFAULT_TIMEOUT = 30
+
+# Formatos del índice simple: JSON (PEP 691) preferido sobre HTML (PEP 503)
+SIMPLE_JSON = "application/vnd.pypi.simple.v1+json"
+SIMPLE_ACCEPT = f"{SIMPLE_JSON}, application/vnd.pypi.simple.v1+html;q=0.2, text/html;q=0.1"
+
+CHUNK_SIZE = 64 * 1024
+# Los artefactos son grandes y ya vienen comprimidos: bloques mayores
+ARTIFACT_CHUNK_SIZE = 256 * 1024
+
+# Errores de los descompresores disponibles
+DECODE_ERRORS = (zlib.error,) + ((brotli.error,) if brotli else ()) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def accept_encoding() -> str:
+    """Codificaciones que aceptamos, de mejor a peor relación de compresión"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    return ", ".join(encodings + ["gzip", "deflate"])
+
+
+class _Identity:
+    def decompress(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Brotli:
+    def __init__(self):
+        self._decompressor = brotli.Decompressor()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.process(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Deflate:
+    """``deflate`` con o sin envoltorio zlib (hay servidores que mandan deflate crudo)"""
+
+    def __init__(self):
+        self._decompressor = None
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._decompressor is None:
+            raw = not data or (data[0] & 0x0F) != 8
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS if raw else zlib.MAX_WBITS)
+        return self._decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._decompressor.flush() if self._decompressor else b""
+
+
+def decoder(content_encoding: Optional[str]):
+    """Descompresor incremental para una cabecera Content-Encoding
+
+    Lanza ``OSError`` si el servidor usó una codificación que no podemos leer.
+    """
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding in ("identity", ""):
+        return _Identity()
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _Deflate()
+    if encoding == "br" and brotli is not None:
+        return _Brotli()
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise OSError(f"codificación no soportada: {encoding}")
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Message
+    body: bytes
+    url: str
+    # Bytes recibidos por la red (comprimidos); -1 si no se midieron
+    transferred: int = -1
+
+    @property
+    def not_modified(self) -> bool:
+        return self.status == 304
+
+    @property
+    def is_json(self) -> bool:
+        return (self.headers.get("Content-Type") or "").startswith(SIMPLE_JSON)
+
+
+def read_body(resp) -> tuple:
+    """Lee y descomprime por bloques el cuerpo de una respuesta: (cuerpo, bytes recibidos)"""
+    decompressor = decoder(resp.headers.get("Content-Encoding"))
+    chunks = []
+    transferred = 0
+    try:
+        while True:
+            chunk = resp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            transferred += len(chunk)
+            chunks.append(decompressor.decompress(chunk))
+        chunks.append(decompressor.flush())
+    except DECODE_ERRORS as e:
+        raise OSError(f"respuesta comprimida inválida: {e}") from e
+    return b"".join(chunks), transferred
+
+
+def fetch(url: str, headers: Optional[dict] = None, timeout: float = DEFAULT_TIMEOUT) -> Response:
+    """Descarga una URL negociando compresión; un 304 se devuelve como respuesta y no como error
+
+    El cuerpo se entrega ya descomprimido. Los errores de red o HTTP se propagan
+    como ``OSError`` (``urllib.error.URLError``).
+    """
+    request = urllib.request.Request(url, headers={
+        "User-Agent": USER_AGENT, "Accept-Encoding": accept_encoding(), **(headers or {})
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as resp:
+            body, transferred = read_body(resp)
+            return Response(resp.status, resp.headers, body, resp.url, transferred)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return Response(304, e.headers, b"", url)
+        raise
+
+
+def open_stream(url: str, headers: Optional[dict] = None, timeout: float = DEFAULT_TIMEOUT,
+                insecure: bool = False):
+    """Abre una URL para leer el cuerpo por bloques, sin compresión de transporte
+
+    Para artefactos (wheels, sdists) que ya vienen comprimidos y cuyo hash se
+    calcula sobre los bytes tal cual. ``insecure`` no verifica el certificado,
+    como ``--trusted-host`` de pip. Se usa como gestor de contexto.
+    """
+    request = urllib.request.Request(url, headers={
+        "User-Agent": USER_AGENT, "Accept-Encoding": "identity", **(headers or {})
+    })
+    context = ssl._create_unverified_context() if insecure else None
+    return urllib.request.urlopen(request, timeout=timeout, context=context)
+
+
+def download_file(url: str, path, timeout: float = DEFAULT_TIMEOUT, insecure: bool = False) -> str:
+    """Descarga una URL a ``path`` por bloques y retorna el sha256 de lo recibido
+
+    Lanza ``http.client.IncompleteRead`` si la conexión se corta antes del
+    ``Content-Length`` anunciado: sin hash publicado, es la única comprobación.
+    """
+    digest = hashlib.sha256()
+    received = 0
+    with open_stream(url, timeout=timeout, insecure=insecure) as resp, open(path, 'wb') as f:
+        expected = resp.headers.get("Content-Length")
+        for chunk in iter(lambda: resp.read(ARTIFACT_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            f.write(chunk)
+            received += len(chunk)
+    if expected is not None and expected.isdigit() and received != int(expected):
+        raise http.client.IncompleteRead(b"", int(expected) - received)
+    return digest.hexdigest()
+
+
+def conditional_headers(etag: Optional[str] = None, last_modified: Optional[str] = None) -> dict:
+    """Cabeceras para una petición condicional a partir de la respuesta anterior"""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    return headers
@@ -0,0 +1,225 @@
+# aetos_matrix.py
+# Instalación de los mismos requisitos en varios intérpretes con descargas compartidas
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+if __package__:
+    from . import aetos_env
+else:
+    import aetos_env
+
+# Opciones de pip install que consumen el argumento siguiente (también las generales de pip)
+PIP_OPTIONS_WITH_VALUE = {
+    "-r", "--requirement", "-c", "--constraint", "-e", "--editable", "-t", "--target",
+    "--prefix", "--root", "--src", "--upgrade-strategy", "--progress-bar", "--report",
+    "-i", "--index-url", "--extra-index-url", "-f", "--find-links", "--only-binary", "--no-binary",
+    "--platform", "--python-version", "--implementation", "--abi", "-C", "--config-settings",
+    "--global-option", "--group", "--python", "--log", "--log-file", "--proxy", "--retries",
+    "--timeout", "--exists-action", "--trusted-host", "--cert", "--client-cert", "--cache-dir",
+    "--use-feature", "--use-deprecated", "--keyring-provider", "--resume-retries",
+}
+
+# Las que pip download también entiende; el resto se descarta junto con su valor
+DOWNLOAD_OPTIONS_WITH_VALUE = {
+    "-r", "--requirement", "-c", "--constraint", "--only-binary", "--no-binary",
+    "-i", "--index-url", "--extra-index-url", "-f", "--find-links", "--trusted-host",
+    "--proxy", "--timeout", "--retries", "--cert", "--client-cert",
+}
+DOWNLOAD_FLAGS = {"--pre", "--prefer-binary", "--no-deps", "--no-build-isolation"}
+
+# Destinos fijos: con varios intérpretes a la vez todos escribirían en el mismo directorio
+SHARED_DESTINATION_OPTIONS = (("-t", "--target"), ("--prefix",), ("--root",))
+
+# Líneas con las que pip download informa de cada archivo que deja en el destino
+SAVED_RE = re.compile(r"^\s*(?:Saved|File was already downloaded) (.+?)\s*$", re.MULTILINE)
+SDIST_SUFFIXES = (".tar.gz", ".zip", ".tar.bz2")
+
+
+class InterpreterNotFound(Exception):
+    """No se encontró un intérprete para la versión pedida"""
+
+
+class MatrixResult(NamedTuple):
+    version: str
+    stage: str
+    returncode: int
+    output: str
+
+
+def resolve_interpreter(version: str) -> str:
+    """Encuentra el ejecutable de Python para una versión (3.11) o ruta dada"""
+    if os.path.sep in version or os.path.exists(version):
+        return version
+
+    if version == "%d.%d" % sys.version_info[:2]:
+        return sys.executable
+
+    for name in (f"python{version}", f"python{version.replace('.', '')}"):
+        path = shutil.which(name)
+        if path:
+            return path
+
+    raise InterpreterNotFound(version)
+
+
+def shared_destination_options(args: list) -> List[str]:
+    """Opciones de ``args`` que mandan todas las instalaciones al mismo directorio"""
+    return [options[-1] for options in SHARED_DESTINATION_OPTIONS
+            if aetos_env.option_value(args, options) is not None]
+
+
+def filter_download_args(args: list) -> list:
+    """Conserva solo los argumentos de pip install que acepta pip download
+
+    Las opciones con valor que pip download no admite se descartan junto con
+    su valor, para que este no acabe tomándose por un requisito.
+    """
+    download_args = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        option = arg.split("=", 1)[0]
+        if arg in PIP_OPTIONS_WITH_VALUE:
+            if arg in DOWNLOAD_OPTIONS_WITH_VALUE and i + 1 < len(args):
+                download_args += [arg, args[i + 1]]
+            i += 2  # Con su valor, se reenvíe o no
+            continue
+        if arg in DOWNLOAD_FLAGS or ("=" in arg and option in DOWNLOAD_OPTIONS_WITH_VALUE):
+            download_args.append(arg)
+        elif not arg.startswith("-"):
+            download_args.append(arg)
+        i += 1
+    return download_args
+
+
+def _run(cmd: list) -> subprocess.CompletedProcess:
+    return subprocess.run(cmd, capture_output=True, text=True)
+
+
+def download(python: str, args: list, index_args: list, dest: Path,
+             wheelhouse: Path) -> subprocess.CompletedProcess:
+    """Descarga con pip download en ``dest`` reutilizando lo que ya hay en la caché
+
+    Los sdists se construyen después como wheels en ``dest`` (ver ``build_wheels``).
+    """
+    cmd = [
+        python, "-m", "pip", "download",
+        "--dest", str(dest),
+        "--find-links", str(wheelhouse),
+    ] + index_args + args
+    proc = _run(cmd)
+    if proc.returncode != 0:
+        return proc
+    sdists = [path for path in dict.fromkeys(SAVED_RE.findall(proc.stdout or ""))
+              if path.endswith(SDIST_SUFFIXES)]
+    if not sdists:
+        return proc
+    return build_wheels(python, sdists, index_args, dest, wheelhouse)
+
+
+def build_wheels(python: str, sdists: List[str], index_args: list, dest: Path,
+                 wheelhouse: Path) -> subprocess.CompletedProcess:
+    """Construye wheels de los sdists para ``python`` y los deja en ``dest``
+
+    La instalación es sin índice, y pip download no guarda las dependencias de
+    construcción (setuptools, hatchling...): se construye aquí, con el índice a
+    mano para el entorno aislado de construcción.
+    """
+    cmd = [
+        python, "-m", "pip", "wheel", "--no-deps",
+        "--wheel-dir", str(dest),
+        "--find-links", str(wheelhouse),
+    ] + index_args + sdists
+    return _run(cmd)
+
+
+def install(python: str, args: list, wheelhouse: Path) -> subprocess.CompletedProcess:
+    """Instala solo desde la caché compartida, sin tocar la red"""
+    cmd = [
+        python, "-m", "pip", "install",
+        "--no-index",
+        "--find-links", str(wheelhouse),
+    ] + args
+    return _run(cmd)
+
+
+def merge_into_wheelhouse(staging: Path, wheelhouse: Path) -> None:
+    """Mueve a la caché los archivos nuevos de un directorio temporal"""
+    for path in staging.iterdir():
+        target = wheelhouse / path.name
+        if not target.exists():
+            os.replace(path, target)
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def wheelhouse_contents(wheelhouse: Path) -> set:
+    """(nombre, versión) de los artefactos que ya están en la caché"""
+    contents = set()
+    for path in wheelhouse.iterdir():
+        parsed = aetos_env.parse_artifact_filename(path.name)
+        if parsed:
+            contents.add(parsed)
+    return contents
+
+
+def download_union(downloads: List[Tuple[str, list]], index_args: list, wheelhouse: Path,
+                   jobs: Optional[int] = None) -> List[subprocess.CompletedProcess]:
+    """Descarga en la caché compartida una lista de (intérprete, argumentos)
+
+    La primera descarga va directa a la caché (los wheels puros quedan disponibles
+    para el resto); las demás solo traen lo que falta, en paralelo y en directorios
+    temporales que luego se mezclan con la caché.
+    """
+    if not downloads:
+        return []
+
+    def staged(item: Tuple[str, list]) -> subprocess.CompletedProcess:
+        python, args = item
+        staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=wheelhouse))
+        try:
+            return download(python, args, index_args, staging, wheelhouse)
+        finally:
+            merge_into_wheelhouse(staging, wheelhouse)
+
+    python, args = downloads[0]
+    results = [download(python, args, index_args, wheelhouse, wheelhouse)]
+    with ThreadPoolExecutor(max_workers=jobs or len(downloads)) as pool:
+        results += list(pool.map(staged, downloads[1:]))
+    return results
+
+
+def run_matrix(targets: List[Tuple[str, str]], args: list, index_args: list,
+               wheelhouse: Path, jobs: Optional[int] = None) -> List[MatrixResult]:
+    """Descarga la unión de artefactos una vez e instala en paralelo en cada intérprete
+
+    ``targets`` es una lista de (versión, ejecutable).
+    """
+    download_args = filter_download_args(args)
+    downloads = download_union(
+        [(python, download_args) for _, python in targets], index_args, wheelhouse, jobs
+    )
+
+    results = {}
+    for (version, _), proc in zip(targets, downloads):
+        if proc.returncode != 0:
+            results[version] = MatrixResult(version, "descarga", proc.returncode, proc.stderr)
+
+    def install_target(target: Tuple[str, str]) -> None:
+        version, python = target
+        proc = install(python, args, wheelhouse)
+        stage = "instalación" if proc.returncode else "completada"
+        results[version] = MatrixResult(version, stage, proc.returncode, proc.stderr)
+
+    pending = [t for t in targets if t[0] not in results]
+    with ThreadPoolExecutor(max_workers=jobs or len(targets)) as pool:
+        list(pool.map(install_target, pending))
+
+    return [results[version] for version, _ in targets]
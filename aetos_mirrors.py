@@ -0,0 +1,169 @@
+# aetos_mirrors.py
+# Sondeo periódico de mirrors: latencia, tasa de error y frescura, con ranking persistente
+
+import json
+import os
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional
+
+if __package__:
+    from . import aetos_http, aetos_pages
+else:
+    import aetos_http
+    import aetos_pages
+
+# Proyecto de referencia para medir la frescura (se publica con frecuencia)
+REFERENCE_PROJECT = "pip"
+# Muestras que se conservan por mirror para calcular las estadísticas
+WINDOW = 20
+PROBE_TIMEOUT = 10
+# Penalización (en segundos equivalentes) para un mirror desactualizado
+STALE_PENALTY = 5.0
+
+
+class ProbeResult(NamedTuple):
+    url: str
+    ok: bool
+    latency: float
+    freshness: Optional[int]
+    error: str
+    # "serial" (número de la última subida) o "files" (cantidad de archivos): no se mezclan
+    freshness_kind: str = "serial"
+
+
+def project_url(index_url: str, project: str) -> str:
+    return index_url.rstrip("/") + f"/{project}/"
+
+
+def parse_freshness(response: aetos_http.Response) -> tuple:
+    """(valor, tipo) de la frescura de un mirror
+
+    El tipo es "serial" para el número de serie de la última subida y "files"
+    para la cantidad de archivos, si el índice no publica serie (p. ej. Nexus).
+    """
+    serial = response.headers.get("X-PyPI-Last-Serial")
+    if serial and serial.isdigit():
+        return int(serial), "serial"
+    if response.is_json:
+        data = json.loads(response.body)
+        serial = data.get("meta", {}).get("_last-serial")
+        if serial is not None:
+            return int(serial), "serial"
+        return len(data.get("files", [])), "files"
+    return len(re.findall(rb"<a\b", response.body)), "files"
+
+
+def probe(url: str, project: str = REFERENCE_PROJECT, timeout: float = PROBE_TIMEOUT,
+          cache: Optional[aetos_pages.PageCache] = None) -> ProbeResult:
+    """Mide un mirror descargando la página del proyecto de referencia
+
+    Con ``cache`` la página se revalida con una petición condicional y, si no
+    cambió, la frescura se lee de la copia guardada.
+    """
+    start = time.monotonic()
+    headers = {"Accept": aetos_http.SIMPLE_ACCEPT}
+    try:
+        if cache is not None:
+            response = aetos_pages.fetch_cached(cache, project_url(url, project), headers, timeout)
+        else:
+            response = aetos_http.fetch(project_url(url, project), headers, timeout=timeout)
+        freshness, kind = parse_freshness(response)
+    except (OSError, ValueError) as e:
+        return ProbeResult(url, False, time.monotonic() - start, None, str(e))
+    return ProbeResult(url, True, time.monotonic() - start, freshness, "", kind)
+
+
+def probe_all(urls: List[str], reference: Optional[str] = None, timeout: float = PROBE_TIMEOUT,
+              cache: Optional[aetos_pages.PageCache] = None) -> List[ProbeResult]:
+    """Sondea todos los mirrors (y la referencia, si hay) en paralelo"""
+    targets = list(urls) + ([reference] if reference and reference not in urls else [])
+    with ThreadPoolExecutor(max_workers=len(targets) or 1) as pool:
+        return list(pool.map(lambda url: probe(url, timeout=timeout, cache=cache), targets))
+
+
+def load_state(path: Path) -> dict:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"mirrors": {}}
+
+
+def save_state(path: Path, state: dict) -> None:
+    """Guarda el estado de forma atómica (los lectores nunca ven un archivo a medias)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def score_mirror(samples: list, timeout: float = PROBE_TIMEOUT) -> dict:
+    """Estadísticas de un mirror a partir de sus muestras [instante, ok, latencia, atraso]"""
+    latencies = [latency for _, ok, latency, _ in samples if ok]
+    error_rate = 1 - len(latencies) / len(samples) if samples else 1.0
+    latency = statistics.median(latencies) if latencies else timeout
+    behind = samples[-1][3] if samples else 0
+    score = latency + error_rate * timeout + (STALE_PENALTY if behind else 0)
+    return {
+        "latency": round(latency, 4),
+        "error_rate": round(error_rate, 4),
+        "behind": behind,
+        "score": round(score, 4),
+    }
+
+
+def update_state(state: dict, urls: List[str], results: List[ProbeResult],
+                 now: Optional[float] = None, timeout: float = PROBE_TIMEOUT) -> dict:
+    """Añade una ronda de sondeos al estado y recalcula el ranking
+
+    El atraso de cada mirror se mide contra la referencia (o contra el mirror más
+    fresco de la ronda si no hay referencia). Solo se comparan valores del mismo
+    tipo: series con series y cantidades de archivos con cantidades; un mirror
+    sin otro del mismo tipo no suma atraso. Se guardan también los candidatos
+    sondeados: si la configuración cambia, el ranking deja de valer.
+    """
+    now = time.time() if now is None else now
+    freshest = {}
+    for result in results:
+        if result.ok and result.freshness is not None:
+            kind = result.freshness_kind
+            freshest[kind] = max(freshest.get(kind, result.freshness), result.freshness)
+
+    mirrors = {}
+    for result in results:
+        if result.url not in urls:
+            continue
+        entry = state.get("mirrors", {}).get(result.url, {})
+        behind = 0
+        if result.ok and result.freshness is not None:
+            behind = max(freshest[result.freshness_kind] - result.freshness, 0)
+        samples = (entry.get("samples", []) + [[now, result.ok, result.latency, behind]])[-WINDOW:]
+        mirrors[result.url] = {"samples": samples, **score_mirror(samples, timeout)}
+
+    ranking = sorted(mirrors, key=lambda url: mirrors[url]["score"])
+    return {
+        "updated_at": now,
+        "candidates": list(urls),
+        "best": ranking[0] if ranking else None,
+        "ranking": ranking,
+        "mirrors": mirrors,
+    }
+
+
+def watch(urls: List[str], path: Path, interval: float, reference: Optional[str] = None,
+          once: bool = False, on_update: Optional[Callable[[dict], None]] = None,
+          cache: Optional[aetos_pages.PageCache] = None) -> None:
+    """Sondea los mirrors cada ``interval`` segundos y persiste el ranking en ``path``"""
+    while True:
+        state = update_state(load_state(path), urls, probe_all(urls, reference, cache=cache))
+        save_state(path, state)
+        if on_update:
+            on_update(state)
+        if once:
+            return
+        time.sleep(interval)
@@ -0,0 +1,337 @@
+# aetos_pages.py
+# Caché en disco, comprimida, de páginas y metadatos del índice
+
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from email.message import Message
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+if __package__:
+    from . import aetos_http
+else:
+    import aetos_http
+
+zstandard = aetos_http.zstandard
+
+MAGIC = b"AETOSPG1"
+ENTRY_SUFFIX = ".page"
+CHUNK_SIZE = 64 * 1024
+# La ventana de zlib es de 32 KB: un diccionario más grande no se aprovecha
+DICTIONARY_SIZE = 32 * 1024
+# Páginas guardadas antes de entrenar el diccionario por primera vez
+TRAIN_AFTER = 16
+# Tras un entrenamiento fallido, no se reintenta hasta que la caché crezca este factor
+RETRAIN_GROWTH = 2
+# Páginas que se usan como muestra al entrenar
+SAMPLE_LIMIT = 200
+
+# Cabeceras de la respuesta que se guardan junto a la página
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "X-PyPI-Last-Serial", "Cache-Control")
+
+_train_lock = threading.Lock()
+
+
+def build_zdict(samples: List[bytes], size: int = DICTIONARY_SIZE) -> bytes:
+    """Diccionario para zlib con los fragmentos que más se repiten entre páginas
+
+    Los hashes y los números cambian en cada enlace; lo que se repite es el
+    marcado y las URLs. zlib encuentra antes lo que está al final del
+    diccionario, así que los fragmentos más valiosos van últimos.
+    """
+    counts = Counter()
+    for sample in samples:
+        fragments = set(re.split(rb"[0-9a-f]{16,}|[0-9]+", sample))
+        counts.update(fragment for fragment in fragments if 4 <= len(fragment) <= 256)
+
+    min_count = 2 if len(samples) > 1 else 1
+    ranked = sorted(
+        (fragment for fragment, count in counts.items() if count >= min_count),
+        key=lambda fragment: (counts[fragment] * len(fragment), fragment),
+        reverse=True,
+    )
+    chosen = []
+    total = 0
+    for fragment in ranked:
+        if total + len(fragment) > size:
+            continue
+        chosen.append(fragment)
+        total += len(fragment)
+    return b"".join(reversed(chosen))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PageCache:
+    """Páginas del índice comprimidas en disco (zstd si está instalado, si no zlib)
+
+    Cada entrada guarda la URL, las cabeceras útiles para revalidar y el cuerpo
+    comprimido con el diccionario entrenado sobre páginas anteriores. La lectura
+    descomprime por bloques.
+    """
+
+    def __init__(self, directory: Path, codec: Optional[str] = None):
+        self.directory = Path(directory)
+        self.codec = codec or ("zstd" if zstandard is not None else "zlib")
+        self._dictionary = None
+        self._failed_at = None
+
+    # -- diccionario ------------------------------------------------------
+
+    @property
+    def dictionary_file(self) -> Path:
+        return self.directory / f"dictionary.{self.codec}"
+
+    def dictionary(self) -> tuple:
+        """(identificador, bytes) del diccionario actual; ("", b"") si no hay"""
+        if self._dictionary is None:
+            try:
+                data = self.dictionary_file.read_bytes()
+            except FileNotFoundError:
+                return "", b""
+            self._dictionary = (hashlib.sha256(data).hexdigest()[:16], data)
+        return self._dictionary
+
+    @property
+    def failed_training_file(self) -> Path:
+        return self.directory / f"dictionary.{self.codec}.failed"
+
+    def failed_training_entries(self) -> int:
+        """Entradas que había en el último entrenamiento fallido (0 si no falló ninguno)"""
+        if self._failed_at is None:
+            try:
+                self._failed_at = int(self.failed_training_file.read_text())
+            except (OSError, ValueError):
+                self._failed_at = 0
+        return self._failed_at
+
+    def should_train(self) -> bool:
+        """Si ``put`` debe intentar entrenar: sin diccionario y con páginas suficientes
+
+        Si el último intento falló, se espera a que la caché crezca
+        ``RETRAIN_GROWTH`` veces: entrenar recorre todas las entradas.
+        """
+        if self.dictionary()[1]:
+            return False
+        threshold = max(TRAIN_AFTER, self.failed_training_entries() * RETRAIN_GROWTH)
+        return len(self.entries()) >= threshold
+
+    def train(self, sample_limit: int = SAMPLE_LIMIT) -> int:
+        """Entrena el diccionario con las páginas guardadas y recomprime la caché
+
+        Retorna el tamaño del diccionario (0 si no hubo muestras suficientes).
+        Un fallo queda anotado para que ``put`` no lo repita en cada página.
+        """
+        with _train_lock:
+            size = self._train(sample_limit)
+            try:
+                if size:
+                    self.failed_training_file.unlink()
+                else:
+                    self.directory.mkdir(parents=True, exist_ok=True)
+                    _write_atomic(self.failed_training_file, str(len(self.entries())).encode())
+            except OSError:
+                pass
+            self._failed_at = None
+            return size
+
+    def _train(self, sample_limit: int) -> int:
+        entries = self.entries()
+        bodies = {}
+        for path in entries:
+            meta = self._read_meta(path)
+            body = self._read_entry(path, meta) if meta else None
+            if body is not None:
+                bodies[path] = (meta, body)
+        samples = [body for _, body in list(bodies.values())[:sample_limit]]
+        if not samples:
+            return 0
+
+        if self.codec == "zstd":
+            try:
+                data = zstandard.train_dictionary(DICTIONARY_SIZE, samples).as_bytes()
+            except zstandard.ZstdError:
+                return 0  # pocas muestras para zstd
+        else:
+            data = build_zdict(samples)
+        if not data:
+            return 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.dictionary_file, data)
+        self._dictionary = None
+        for path, (meta, body) in bodies.items():
+            self._write_entry(path, meta["url"], meta["headers"], body)
+        return len(data)
+
+    # -- compresión -------------------------------------------------------
+
+    def _compress(self, body: bytes, dictionary: bytes) -> bytes:
+        if self.codec == "zstd":
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            return zstandard.ZstdCompressor(level=10, dict_data=dict_data).compress(body)
+        if dictionary:
+            compressor = zlib.compressobj(9, zdict=dictionary)
+        else:
+            compressor = zlib.compressobj(9)
+        return compressor.compress(body) + compressor.flush()
+
+    def _decompressor(self, dictionary: bytes):
+        if self.codec == "zstd":
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            return zstandard.ZstdDecompressor(dict_data=dict_data).decompressobj()
+        return zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+
+    # -- entradas ---------------------------------------------------------
+
+    def entry_path(self, url: str) -> Path:
+        return self.directory / (hashlib.sha256(url.encode()).hexdigest()[:32] + ENTRY_SUFFIX)
+
+    def entries(self) -> List[Path]:
+        try:
+            return sorted(self.directory.glob("*" + ENTRY_SUFFIX))
+        except OSError:
+            return []
+
+    def _write_entry(self, path: Path, url: str, headers: dict, body: bytes) -> None:
+        dict_id, dictionary = self.dictionary()
+        meta = json.dumps({
+            "url": url,
+            "headers": headers,
+            "codec": self.codec,
+            "dictionary": dict_id,
+            "size": len(body),
+        }).encode()
+        data = MAGIC + len(meta).to_bytes(4, "big") + meta + self._compress(body, dictionary)
+        _write_atomic(path, data)
+
+    def put(self, url: str, body: bytes, headers=None) -> None:
+        """Guarda una página; ``headers`` puede ser un ``Message`` o un diccionario"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        kept = {}
+        for name in KEPT_HEADERS:
+            value = headers.get(name) if headers is not None else None
+            if value is not None:
+                kept[name] = value
+        self._write_entry(self.entry_path(url), url, kept, body)
+
+        if self.should_train():
+            self.train()
+
+    @staticmethod
+    def _read_meta(path: Path) -> Optional[dict]:
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    return None
+                length = int.from_bytes(f.read(4), "big")
+                return json.loads(f.read(length))
+        except (OSError, ValueError):
+            return None
+
+    def meta(self, url: str) -> Optional[dict]:
+        """URL, cabeceras y tamaño original de la página guardada, o None"""
+        meta = self._read_meta(self.entry_path(url))
+        if meta is None or meta.get("url") != url:
+            return None
+        return meta
+
+    def _iter_entry(self, path: Path, meta: dict) -> Iterator[bytes]:
+        dict_id, dictionary = self.dictionary()
+        if meta.get("codec") != self.codec or meta.get("dictionary") not in ("", dict_id):
+            raise ValueError("entrada comprimida con otro códec o diccionario")
+        decompressor = self._decompressor(dictionary if meta.get("dictionary") else b"")
+        with open(path, 'rb') as f:
+            f.seek(len(MAGIC))
+            f.seek(int.from_bytes(f.read(4), "big"), os.SEEK_CUR)
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
+    def _read_entry(self, path: Path, meta: dict) -> Optional[bytes]:
+        try:
+            body = b"".join(self._iter_entry(path, meta))
+        except (OSError, ValueError) + aetos_http.DECODE_ERRORS:
+            return None
+        return body if len(body) == meta.get("size") else None
+
+    def iter_body(self, url: str) -> Iterator[bytes]:
+        """Cuerpo de la página por bloques, descomprimiendo a medida que se lee
+
+        Lanza ``KeyError`` si la página no está en la caché.
+        """
+        meta = self.meta(url)
+        if meta is None:
+            raise KeyError(url)
+        return self._iter_entry(self.entry_path(url), meta)
+
+    def read(self, url: str) -> Optional[bytes]:
+        """Cuerpo completo de la página, o None si no está o no se puede leer"""
+        meta = self.meta(url)
+        if meta is None:
+            return None
+        return self._read_entry(self.entry_path(url), meta)
+
+    def stats(self) -> dict:
+        """Entradas, bytes originales y bytes en disco de la caché"""
+        entries = self.entries()
+        original = stored = 0
+        for path in entries:
+            meta = self._read_meta(path)
+            if meta:
+                original += meta.get("size", 0)
+                stored += path.stat().st_size
+        return {"entries": len(entries), "original": original, "stored": stored}
+
+
+def fetch_cached(cache: PageCache, url: str, headers: Optional[dict] = None,
+                 timeout: float = aetos_http.DEFAULT_TIMEOUT) -> aetos_http.Response:
+    """Descarga una página revalidándola contra la copia comprimida en caché
+
+    Si el servidor responde 304 se devuelve la copia guardada, con ``status``
+    304 y las cabeceras guardadas actualizadas con las de la respuesta.
+    """
+    meta = cache.meta(url)
+    request_headers = dict(headers or {})
+    if meta is not None:
+        request_headers.update(aetos_http.conditional_headers(
+            meta["headers"].get("ETag"), meta["headers"].get("Last-Modified")
+        ))
+
+    response = aetos_http.fetch(url, request_headers, timeout)
+    if response.not_modified:
+        body = cache.read(url) if meta is not None else None
+        if body is not None:
+            merged = Message()
+            for name, value in meta["headers"].items():
+                merged[name] = value
+            for name, value in response.headers.items():
+                del merged[name]
+                merged[name] = value
+            return response._replace(headers=merged, body=body)
+        # La copia no se puede leer: se pide la página completa
+        response = aetos_http.fetch(url, headers, timeout)
+
+    if response.status == 200:
+        try:
+            cache.put(url, response.body, response.headers)
+        except OSError:
+            pass
+    return response
@@ -0,0 +1,184 @@
+# aetos_peers.py
+# Caché en niveles: los nodos de la LAN comparten su caché de artefactos por HTTP (solo lectura)
+
+import html
+import http.client
+import os
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, List, Optional
+
+if __package__:
+    from . import aetos_http
+else:
+    import aetos_http
+
+DEFAULT_PORT = 8470
+# En la LAN un vecino sano responde en milisegundos: si tarda más, se va al índice
+DEFAULT_TIMEOUT = 0.5
+# Tras un fallo, el vecino se salta durante este tiempo (cortacircuitos)
+COOLDOWN = 60.0
+
+ARTIFACT_SUFFIXES = (".whl", ".tar.gz", ".zip", ".tar.bz2")
+
+
+def is_artifact_name(name: str) -> bool:
+    """Solo se sirven artefactos de la raíz de la caché (ni ocultos, ni temporales, ni rutas)"""
+    return (
+        bool(name)
+        and not name.startswith(".")
+        and "/" not in name
+        and "\\" not in name
+        and name.endswith(ARTIFACT_SUFFIXES)
+    )
+
+
+class PeerCacheServer:
+    """Servidor HTTP de solo lectura sobre el directorio de wheels
+
+    ``/wheels/`` lista los artefactos (sirve también como ``--find-links`` de pip)
+    y ``/wheels/<archivo>`` los entrega tal cual. ``on_serve`` recibe (archivo,
+    cliente) por cada artefacto servido.
+    """
+
+    def __init__(self, wheelhouse: Path, host: str = "0.0.0.0", port: int = DEFAULT_PORT,
+                 on_serve: Optional[Callable[[str, str], None]] = None):
+        self.wheelhouse = Path(wheelhouse)
+        self.on_serve = on_serve
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def serve_forever(self) -> None:
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self) -> "PeerCacheServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "PeerCacheServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def listing(self) -> bytes:
+        names = sorted(entry.name for entry in os.scandir(self.wheelhouse)
+                       if entry.is_file() and is_artifact_name(entry.name))
+        links = "".join(
+            f'<a href="{urllib.parse.quote(name)}">{html.escape(name)}</a><br>\n' for name in names
+        )
+        return f"<!DOCTYPE html>\n<html><body>\n{links}</body></html>\n".encode()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self.do_GET(body=False)
+
+            def do_GET(self, body: bool = True):
+                parts = [urllib.parse.unquote(p) for p in self.path.split("?")[0].split("/") if p]
+                if parts in ([], ["wheels"]):
+                    self._send(server.listing(), "text/html", body)
+                    return
+                if len(parts) != 2 or parts[0] != "wheels" or not is_artifact_name(parts[1]):
+                    self.send_error(404)
+                    return
+                try:
+                    f = open(server.wheelhouse / parts[1], 'rb')
+                except OSError:
+                    self.send_error(404)
+                    return
+                with f:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                    self.end_headers()
+                    if body:
+                        shutil.copyfileobj(f, self.wfile, aetos_http.ARTIFACT_CHUNK_SIZE)
+                if body and server.on_serve:
+                    server.on_serve(parts[1], self.client_address[0])
+
+            def _send(self, data: bytes, content_type: str, body: bool):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                # El listado cambia con cada descarga: que pip lo pida siempre de nuevo
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                if body:
+                    self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class PeerSet:
+    """Vecinos a consultar antes del índice, con un cortacircuitos por vecino
+
+    Un vecino que falla (caído, lento o con un archivo que no coincide con el
+    hash del índice) se salta durante ``cooldown`` segundos; un 404 solo
+    significa que no lo tiene.
+    """
+
+    def __init__(self, urls: List[str], timeout: float = DEFAULT_TIMEOUT, cooldown: float = COOLDOWN):
+        self.urls = [url.rstrip("/") for url in urls]
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.hits = 0
+        self._open_until = {}
+        self._lock = threading.Lock()
+
+    def available(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            return [url for url in self.urls if self._open_until.get(url, 0) <= now]
+
+    def trip(self, url: str) -> None:
+        with self._lock:
+            self._open_until[url] = time.monotonic() + self.cooldown
+
+    def fetch(self, filename: str, sha256: str, destination: Path) -> Optional[str]:
+        """Descarga ``filename`` del primer vecino que lo tenga con ese sha256
+
+        Retorna la URL del vecino, o None si ninguno lo tenía (``destination``
+        puede quedar con restos que el llamador debe borrar).
+        """
+        for peer in self.available():
+            url = f"{peer}/wheels/{urllib.parse.quote(filename)}"
+            try:
+                digest = aetos_http.download_file(url, destination, timeout=self.timeout)
+            except urllib.error.HTTPError as e:
+                if e.code != 404:
+                    self.trip(peer)
+                continue
+            except (OSError, http.client.HTTPException):
+                self.trip(peer)
+                continue
+            if digest == sha256:
+                with self._lock:
+                    self.hits += 1
+                return peer
+            self.trip(peer)
+        return None
@@ -0,0 +1,365 @@
+# aetos_pipeline.py
+# Motor de instalación en tubería: descarga → verificación → desempaquetado, solapados
+
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional
+
+if __package__:
+    from . import aetos_env, aetos_hashes, aetos_http, aetos_uninstall, aetos_wheel
+else:
+    import aetos_env
+    import aetos_hashes
+    import aetos_http
+    import aetos_uninstall
+    import aetos_wheel
+
+# Descargas simultáneas (la red) e instalaciones simultáneas (los núcleos)
+DOWNLOAD_JOBS = 8
+# Reintentos de una descarga ante errores pasajeros (5xx, conexión cortada), como pip
+DOWNLOAD_RETRIES = 3
+RETRY_BACKOFF = 0.25
+
+# Opciones de pip install que el motor no sabe reproducir: con ellas se usa pip
+UNSUPPORTED_OPTIONS = {
+    "--python", "--prefix", "--root", "-e", "--editable", "--src",
+    "--require-hashes", "--no-binary", "--config-settings", "--global-option",
+    "--dry-run", "--report",  # la resolución del motor ya usa --dry-run --report -
+}
+
+
+class ResolutionError(Exception):
+    """pip no pudo resolver los requisitos"""
+
+
+class HashMismatch(Exception):
+    """El artefacto descargado no coincide con el hash publicado por el índice"""
+
+
+class UnsupportedSource(Exception):
+    """La resolución incluye requisitos de VCS o directorios locales, que instala pip"""
+
+
+class RemovalError(Exception):
+    """No se pudo quitar del todo la versión instalada que reemplaza un wheel"""
+
+
+class Artifact(NamedTuple):
+    name: str
+    version: str
+    url: str
+    filename: str
+    sha256: Optional[str]
+    requested: bool
+
+    @property
+    def is_wheel(self) -> bool:
+        return self.filename.endswith(".whl")
+
+
+class PipelineResult(NamedTuple):
+    installed: List[str]
+    built: List[str]
+    errors: dict
+
+
+def unsupported_options(args: list) -> List[str]:
+    unsupported = [arg for arg in args if arg.split("=", 1)[0] in UNSUPPORTED_OPTIONS]
+    if pins_hashes(args):
+        unsupported.append("--hash")
+    return unsupported
+
+
+def pins_hashes(args: list) -> bool:
+    """Si algún archivo de ``-r``/``-c`` fija hashes con ``--hash``
+
+    pip entra entonces en modo de comprobación de hashes sin ``--require-hashes``;
+    el motor solo comprobaría el sha256 que publica el índice.
+    """
+    for i, arg in enumerate(args):
+        if arg in ("-r", "--requirement", "-c", "--constraint") and i + 1 < len(args):
+            path = args[i + 1]
+        elif arg.startswith(("--requirement=", "--constraint=")):
+            path = arg.split("=", 1)[1]
+        else:
+            continue
+        options = []
+        try:
+            aetos_env.parse_requirements_file(Path(path), options=options)
+        except OSError:
+            continue  # pip informará del archivo que falta
+        if any(option.startswith("--hash") for option in options):
+            return True
+    return False
+
+
+def parse_report(report: dict) -> List[Artifact]:
+    """Artefactos a instalar según el informe JSON de ``pip install --report``
+
+    Los requisitos de VCS (``git+https://...``) y de directorios locales no son
+    archivos descargables: si hay alguno se lanza ``UnsupportedSource``.
+    """
+    artifacts, unsupported = [], []
+    for item in report.get("install", []):
+        info = item["download_info"]
+        url = info["url"]
+        if "vcs_info" in info or "dir_info" in info:
+            unsupported.append(item["metadata"]["name"])
+            continue
+        archive = info.get("archive_info", {})
+        sha256 = archive.get("hashes", {}).get("sha256")
+        if sha256 is None and archive.get("hash", "").startswith("sha256="):
+            sha256 = archive["hash"].split("=", 1)[1]
+        filename = urllib.parse.unquote(urllib.parse.urlsplit(url).path.rsplit("/", 1)[-1])
+        artifacts.append(Artifact(
+            item["metadata"]["name"], item["metadata"]["version"], url, filename,
+            sha256, bool(item.get("requested")),
+        ))
+    if unsupported:
+        raise UnsupportedSource(", ".join(unsupported))
+    return artifacts
+
+
+def resolve(args: list, index_args: list, wheelhouse: Path, python: Optional[str] = None,
+            wrap: Optional[Callable[[list], list]] = None) -> List[Artifact]:
+    """Resuelve con pip sin instalar nada (``--dry-run --report``)
+
+    ``wrap`` puede transformar el comando de pip (p. ej. para perfilarlo).
+    """
+    cmd = [
+        python or sys.executable, "-m", "pip", "install", "--dry-run", "--quiet",
+        "--report", "-", "--find-links", str(wheelhouse),
+    ] + index_args + args
+    proc = subprocess.run(wrap(cmd) if wrap else cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise ResolutionError(proc.stderr.strip())
+    try:
+        return parse_report(json.loads(proc.stdout))
+    except (ValueError, KeyError) as e:
+        raise ResolutionError(f"informe de pip inesperado: {e}") from e
+
+
+def transient(error: Exception) -> bool:
+    """Si vale la pena reintentar la descarga que falló con ``error``"""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code >= 500 or error.code == 429
+    return isinstance(error, (urllib.error.URLError, ConnectionError, TimeoutError,
+                              http.client.HTTPException))
+
+
+def download_with_retries(url: str, path: Path, insecure: bool = False) -> str:
+    """``aetos_http.download_file`` reintentando los errores pasajeros con espera creciente"""
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        try:
+            return aetos_http.download_file(url, path, insecure=insecure)
+        except (OSError, http.client.HTTPException) as e:
+            if attempt == DOWNLOAD_RETRIES or not transient(e):
+                raise
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+
+def fetch_verified(artifact: Artifact, wheelhouse: Path, trusted_hosts: set = frozenset(),
+                   peers=None, memo: Optional[aetos_hashes.HashMemo] = None) -> Path:
+    """Descarga el artefacto a la caché calculando el hash a medida que llegan los bytes
+
+    Si ya está en la caché con el hash correcto no se descarga; con ``memo``
+    solo se vuelve a hashear si el archivo cambió desde la última comprobación.
+    Si el índice no publica hash, solo se reutiliza un archivo que ``memo``
+    registró al terminar una descarga completa y que no cambió desde entonces.
+    Con ``peers`` (``aetos_peers.PeerSet``) se pide antes a los vecinos de la
+    LAN, solo si el índice publica el sha256 con el que comprobarlo. El archivo
+    solo aparece en la caché una vez verificado.
+    """
+    if artifact.url.startswith("file:"):
+        path = Path(urllib.request.url2pathname(urllib.parse.urlsplit(artifact.url).path))
+        if artifact.sha256 and aetos_hashes.mmap_sha256(path) != artifact.sha256:
+            raise HashMismatch(artifact.filename)
+        return path
+
+    target = wheelhouse / artifact.filename
+    if target.exists():
+        if artifact.sha256 is None:
+            if memo is not None and memo.is_current(target, os.stat(target)):
+                return target
+        elif memo is not None:
+            if aetos_hashes.verify_cached(memo, target, artifact.sha256):
+                return target
+        elif aetos_hashes.mmap_sha256(target) == artifact.sha256:
+            return target
+
+    partial = wheelhouse / f".{artifact.filename}.{os.getpid()}.{threading.get_ident()}.part"
+    insecure = urllib.parse.urlsplit(artifact.url).hostname in trusted_hosts
+    try:
+        if not (peers is not None and artifact.sha256 and peers.fetch(artifact.filename, artifact.sha256, partial)):
+            digest = download_with_retries(artifact.url, partial, insecure=insecure)
+            if artifact.sha256 and digest != artifact.sha256:
+                raise HashMismatch(artifact.filename)
+        else:
+            digest = artifact.sha256
+        os.replace(partial, target)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    if memo is not None:
+        memo.record(target, digest)
+    return target
+
+
+def _installer_pool(jobs: Optional[int]):
+    """Procesos para desempaquetar en todos los núcleos (hilos si no se pueden crear)"""
+    try:
+        return ProcessPoolExecutor(max_workers=jobs)
+    except (OSError, NotImplementedError):
+        return ThreadPoolExecutor(max_workers=jobs)
+
+
+def run_pipeline(artifacts: List[Artifact], wheelhouse: Path, scheme: dict,
+                 trusted_hosts: set = frozenset(), download_jobs: int = DOWNLOAD_JOBS,
+                 install_jobs: Optional[int] = None, peers=None,
+                 on_event: Optional[Callable[[str, Artifact, str], None]] = None,
+                 before_install: Optional[Callable[[Artifact], None]] = None) -> PipelineResult:
+    """Descarga, verifica e instala cada wheel en cuanto está listo
+
+    Cada descarga se verifica mientras llega y pasa en el acto al grupo de
+    instaladores, así que desempaquetar unos wheels se solapa con descargar
+    otros. Los sdists solo se descargan; se construyen después con pip (ver
+    ``build_sdists``). Los hashes verificados quedan memorizados en la caché
+    (``aetos_hashes``); ``peers`` se pasa a ``fetch_verified``. ``on_event`` recibe ("verified" | "installed" | "error",
+    artefacto, detalle). ``before_install`` se llama con cada wheel ya
+    verificado, justo antes de instalarlo (ver ``outdated_remover``); si lanza
+    RemovalError el wheel no se instala y cuenta como error.
+    """
+    event = on_event or (lambda *a: None)
+    installed, errors = [], {}
+    sdists = []
+    lock = threading.Lock()
+    memo = aetos_hashes.HashMemo(wheelhouse)
+
+    with _installer_pool(install_jobs) as installers:
+        # Arranca los procesos antes que los hilos de descarga (fork con un solo hilo)
+        installers.submit(os.getpid)
+        downloads = ThreadPoolExecutor(max_workers=download_jobs)
+
+        def on_installed(artifact: Artifact, future) -> None:
+            error = future.exception()
+            with lock:
+                if error is None:
+                    installed.append(artifact.name)
+                else:
+                    errors[artifact.name] = str(error)
+            event("error" if error else "installed", artifact, str(error or ""))
+
+        def stage(artifact: Artifact) -> None:
+            try:
+                path = fetch_verified(artifact, wheelhouse, trusted_hosts, peers, memo)
+            except (OSError, http.client.HTTPException, HashMismatch) as e:
+                detail = "hash sha256 distinto del publicado" if isinstance(e, HashMismatch) else str(e)
+                with lock:
+                    errors[artifact.name] = detail
+                event("error", artifact, detail)
+                return
+            event("verified", artifact, str(path))
+            if not artifact.is_wheel:
+                with lock:
+                    sdists.append((artifact, path))
+                return
+            if before_install is not None:
+                try:
+                    before_install(artifact)
+                except RemovalError as e:
+                    # No se instala encima de una versión a medio borrar
+                    with lock:
+                        errors[artifact.name] = str(e)
+                    event("error", artifact, str(e))
+                    return
+            future = installers.submit(aetos_wheel.install_wheel, str(path), scheme, artifact.requested)
+            future.add_done_callback(lambda f: on_installed(artifact, f))
+
+        with downloads:
+            list(downloads.map(stage, artifacts))
+        try:
+            memo.save()
+        except OSError:
+            pass  # la memoria de hashes es solo un atajo
+
+    return PipelineResult(installed, [str(path) for _, path in sdists], errors)
+
+
+def build_sdists(paths: List[str], args: list, index_args: list, wheelhouse: Path,
+                 python: Optional[str] = None) -> subprocess.CompletedProcess:
+    """Instala con pip los sdists ya descargados (hay que construirlos)"""
+    target = install_target(args)
+    install_args = (["--target", target] if target else []) + (["--user"] if "--user" in args else [])
+    cmd = [
+        python or sys.executable, "-m", "pip", "install", "--no-deps",
+        "--find-links", str(wheelhouse),
+    ] + index_args + install_args + paths
+    return subprocess.run(cmd, capture_output=True, text=True)
+
+
+def install_target(args: list) -> Optional[str]:
+    """Directorio de ``--target``, o None"""
+    return aetos_env.option_value(args, ("-t", "--target"))
+
+
+def scheme_for(args: list) -> dict:
+    """Directorios de instalación según ``--target`` y ``--user``"""
+    return aetos_wheel.get_scheme(target=install_target(args), user="--user" in args)
+
+
+def outdated_installs(artifacts: List[Artifact], args: list) -> List[str]:
+    """Proyectos ya instalados que se van a reemplazar por otra versión"""
+    target = install_target(args)
+    installed = aetos_env.installed_distributions([Path(target)] if target else None)
+    return [a.name for a in artifacts if aetos_env.canonicalize_name(a.name) in installed]
+
+
+def outdated_remover(artifacts: List[Artifact], args: list) -> Callable[[Artifact], None]:
+    """``before_install`` que quita la versión instalada que reemplaza cada wheel
+
+    Se planifica todo de una vez, pero cada distribución se borra solo cuando
+    el wheel que la reemplaza ya está descargado y verificado: si la descarga
+    falla, la versión anterior sigue instalada. Los sdists los reemplaza pip al
+    construirlos. Con ``--target`` los archivos se sobrescriben y solo se borra
+    el ``.dist-info`` viejo, que lleva la versión en el nombre. Lo que
+    ``plan_uninstall`` no sabe borrar con seguridad (sin RECORD ni
+    installed-files.txt) lo quita pip. Si el borrado falla se lanza
+    RemovalError y ``run_pipeline`` no instala ese wheel.
+    """
+    target = install_target(args)
+    outdated = outdated_installs([a for a in artifacts if a.is_wheel], args)
+    plans, _, unsupported = aetos_uninstall.plan_uninstall(outdated, [Path(target)] if target else None)
+    if target:
+        plans = [plan._replace(files=[
+            path for path in plan.files
+            if os.path.relpath(path, plan.root).split(os.sep, 1)[0].endswith(".dist-info")
+        ]) for plan in plans]
+        unsupported = []  # sin RECORD no se sabe qué borrar; pip tampoco lo haría
+    by_name = {aetos_env.canonicalize_name(plan.name): plan for plan in plans}
+    without_record = set(unsupported)
+
+    def remove(artifact: Artifact) -> None:
+        name = aetos_env.canonicalize_name(artifact.name)
+        if name in by_name:
+            plan = by_name[name]
+            errors = aetos_uninstall.remove([plan]).errors
+            if errors:
+                raise RemovalError(f"no se pudo quitar {plan.name} {plan.version}: "
+                                   f"{len(errors)} archivos sin borrar ({next(iter(errors.values()))})")
+        elif name in without_record:
+            proc = subprocess.run([sys.executable, "-m", "pip", "uninstall", "-y", "-q", name],
+                                  capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise RemovalError(f"pip no pudo desinstalar {name}: {proc.stderr.strip()}")
+
+    return remove
@@ -0,0 +1,205 @@
+# aetos_prefetch.py
+# Precarga de la caché desde archivos de requisitos o de bloqueo, sin instalar nada
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, List, NamedTuple, Optional
+
+if __package__:
+    from . import aetos_env, aetos_matrix
+else:
+    import aetos_env
+    import aetos_matrix
+
+# Prioridad de CPU (nice) con la que corre la precarga y sus descargas
+NICE_INCREMENT = 10
+DEFAULT_JOBS = 2
+
+
+class PrefetchResult(NamedTuple):
+    total: int
+    skipped: int
+    fetched: List[str]
+    failed: dict
+    interrupted: bool
+
+
+def read_lockfile(path: Path) -> List[str]:
+    """Requisitos de un ``pylock.toml`` (PEP 751) como ``nombre==versión``
+
+    Los paquetes cuyo ``marker`` no se cumple en este intérprete se omiten.
+    """
+    try:
+        import tomllib
+    except ImportError:  # Python < 3.11
+        import tomli as tomllib
+    with open(path, 'rb') as f:
+        data = tomllib.load(f)
+    return [f"{package['name']}=={package['version']}"
+            for package in data.get("packages", [])
+            if package.get("version") and aetos_env.marker_applies(package.get("marker"))]
+
+
+def collect_specs(paths: List[Path]) -> List[str]:
+    """Requisitos de todos los archivos que aplican a este intérprete, sin repetir y en orden
+
+    Los marcadores se evalúan aquí: pip descarga lo que se le pide aunque el
+    marcador lo excluya (``pywin32; sys_platform == "win32"`` en Linux falla).
+    Las referencias directas conservan su URL y las líneas ``-e`` o de ruta se
+    pasan como ruta: pip descarga sus dependencias.
+    """
+    specs = []
+    for path in paths:
+        if path.suffix == ".toml":
+            specs += read_lockfile(path)
+        else:
+            local = []
+            specs += [aetos_env.requirement_spec(req) for req in aetos_env.parse_requirements_file(path, local=local)
+                      if aetos_env.marker_applies(req.marker)]
+            specs += local  # pip download trae las dependencias de los proyectos locales
+    return list(dict.fromkeys(specs))
+
+
+def pinned(spec: str) -> Optional[tuple]:
+    """(nombre normalizado, versión) si el requisito fija una versión exacta"""
+    try:
+        req = aetos_env.Requirement(spec)
+    except aetos_env.InvalidRequirement:
+        return None  # ruta local
+    specifiers = list(req.specifier)
+    if len(specifiers) == 1 and specifiers[0].operator in ("==", "===") and "*" not in specifiers[0].version:
+        return aetos_env.canonicalize_name(req.name), specifiers[0].version
+    return None
+
+
+def get_state_file(state_dir: Path, specs: List[str], index_url: str) -> Path:
+    """Archivo de progreso de un conjunto concreto de requisitos contra un índice"""
+    key = hashlib.sha256("\n".join([index_url] + sorted(specs)).encode()).hexdigest()[:16]
+    return state_dir / f"{key}.json"
+
+
+def load_state(path: Path) -> dict:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"done": []}
+
+
+def save_state(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def lower_priority() -> None:
+    """Baja la prioridad de CPU del proceso (la heredan las descargas de pip)"""
+    if hasattr(os, "nice"):
+        try:
+            os.nice(NICE_INCREMENT)
+        except OSError:
+            pass
+
+
+# Intérprete intermedio: baja su propia prioridad y se reemplaza por el comando
+NICE_LAUNCHER = (
+    "import os, sys\n"
+    "try:\n"
+    "    os.nice(int(sys.argv[1]))\n"
+    "except OSError:\n"
+    "    pass\n"
+    "os.execvp(sys.argv[2], sys.argv[2:])\n"
+)
+
+
+def low_priority_command(cmd: list) -> list:
+    """``cmd`` lanzado con prioridad baja desde cualquier hilo
+
+    ``preexec_fn`` no es seguro en procesos con hilos (el hijo puede quedar
+    bloqueado), así que la prioridad la baja el propio hijo antes del exec.
+    """
+    if not hasattr(os, "nice"):
+        return cmd
+    return [sys.executable, "-c", NICE_LAUNCHER, str(NICE_INCREMENT)] + cmd
+
+
+def fetch_one(spec: str, index_args: list, wheelhouse: Path, no_deps: bool,
+              python: Optional[str] = None) -> subprocess.CompletedProcess:
+    """Descarga un requisito (y sus dependencias) a un directorio temporal y lo pasa a la caché
+
+    Así una interrupción nunca deja archivos a medias en la caché.
+    """
+    staging = wheelhouse / f".prefetch-{os.getpid()}-{hashlib.sha256(spec.encode()).hexdigest()[:8]}"
+    staging.mkdir(exist_ok=True)
+    args = (["--no-deps"] if no_deps else []) + [spec]
+    try:
+        proc = aetos_matrix.download(python or sys.executable, args, index_args, staging, wheelhouse)
+        if proc.returncode == 0:
+            aetos_matrix.merge_into_wheelhouse(staging, wheelhouse)
+        return proc
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def run_prefetch(specs: List[str], index_args: list, wheelhouse: Path, state_file: Path,
+                 jobs: int = DEFAULT_JOBS, no_deps: bool = False, max_time: Optional[float] = None,
+                 on_progress: Optional[Callable[[str, bool, str], None]] = None) -> PrefetchResult:
+    """Descarga a la caché lo que falta de ``specs``, retomando el progreso de ``state_file``
+
+    Con ``max_time`` (segundos) no se empiezan descargas nuevas pasado ese tiempo;
+    lo pendiente queda para la próxima ejecución. Al completar todo se borra el estado.
+    """
+    state = load_state(state_file)
+    done = set(state.get("done", []))
+    cached = aetos_matrix.wheelhouse_contents(wheelhouse)
+
+    pending = []
+    skipped = 0
+    for spec in specs:
+        if spec in done or (no_deps and pinned(spec) in cached):
+            skipped += 1
+        else:
+            pending.append(spec)
+
+    deadline = None if max_time is None else time.monotonic() + max_time
+    fetched, failed = [], {}
+    interrupted = False
+    lock = threading.Lock()
+
+    def work(spec: str) -> None:
+        nonlocal interrupted
+        if deadline is not None and time.monotonic() >= deadline:
+            interrupted = True
+            return
+        proc = fetch_one(spec, index_args, wheelhouse, no_deps)
+        ok = proc.returncode == 0
+        with lock:
+            if ok:
+                fetched.append(spec)
+                done.add(spec)
+                state["done"] = sorted(done)
+                save_state(state_file, state)
+            else:
+                failed[spec] = (proc.stderr or "").strip()
+            if on_progress:
+                on_progress(spec, ok, failed.get(spec, ""))
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        list(pool.map(work, pending))
+
+    if not failed and not interrupted:
+        try:
+            state_file.unlink()
+        except FileNotFoundError:
+            pass
+    return PrefetchResult(len(specs), skipped, fetched, failed, interrupted)
@@ -0,0 +1,265 @@
+# aetos_profile.py
+# Perfilado de aetos y de los pip que lanza: archivos pstats, pilas plegadas y resumen
+
+import cProfile
+import marshal
+import os
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple
+
+MODES = ("cprofile", "sampling")
+# Intervalo entre muestras del perfilador estadístico (segundos)
+SAMPLE_INTERVAL = 0.005
+# Al convertir el grafo de llamadas de cProfile en pilas: profundidad máxima y
+# fracción mínima del tiempo total para seguir bajando (el número de caminos
+# del grafo crece exponencialmente)
+MAX_STACK_DEPTH = 64
+MIN_STACK_SHARE = 1e-4
+
+
+class HotFunction(NamedTuple):
+    label: str
+    self_time: float
+    total_time: float
+    calls: int
+
+
+def label(func: tuple) -> str:
+    """Nombre legible de una función de pstats: ``nombre (archivo:línea)``"""
+    filename, line, name = func
+    if filename == "~":  # funciones integradas
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """Perfilador estadístico: un hilo toma la pila de todos los demás hilos cada ``interval``
+
+    Apenas frena el programa y ve todos los hilos (descargas, instaladores);
+    cProfile solo mide el hilo que lo activa y encarece cada llamada.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._ticks = 0
+        self._wall = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def period(self) -> float:
+        """Tiempo real medio entre muestras (el hilo no despierta exactamente cada ``interval``)"""
+        return self._wall / self._ticks if self._ticks else self.interval
+
+    def enable(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def disable(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        started = time.monotonic()
+        while not self._stop.wait(self.interval):
+            self._ticks += 1
+            self._wall = time.monotonic() - started
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                self.samples[tuple(reversed(stack))] += 1
+
+    def stats(self) -> dict:
+        """Las muestras en el formato de pstats (tiempos estimados, llamadas = muestras)"""
+        stats = {}
+        for stack, count in self.samples.items():
+            elapsed = count * self.period
+            seen = set()
+            for depth, func in enumerate(stack):
+                entry = stats.setdefault(func, [0, 0, 0.0, 0.0, {}])
+                leaf = depth == len(stack) - 1
+                if func not in seen:  # en recursión el tiempo total cuenta una vez
+                    seen.add(func)
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += elapsed
+                if leaf:
+                    entry[2] += elapsed
+                if depth:
+                    edge = entry[4].setdefault(stack[depth - 1], [0, 0, 0.0, 0.0])
+                    edge[0] += count
+                    edge[1] += count
+                    edge[2] += elapsed if leaf else 0.0
+                    edge[3] += elapsed
+        return {
+            func: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+            for func, (cc, nc, tt, ct, callers) in stats.items()
+        }
+
+    def folded(self) -> Counter:
+        folded = Counter()
+        for stack, count in self.samples.items():
+            folded[";".join(label(func) for func in stack)] += count
+        return folded
+
+
+class DeterministicProfiler:
+    """cProfile con la misma interfaz que ``SamplingProfiler``"""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def enable(self) -> None:
+        self._profile.enable()
+
+    def disable(self) -> None:
+        self._profile.disable()
+
+    def stats(self) -> dict:
+        self._profile.create_stats()
+        return self._profile.stats
+
+    def folded(self) -> Counter:
+        return folded_from_stats(self.stats())
+
+
+def make_profiler(mode: str):
+    if mode not in MODES:
+        raise ValueError(f"modo de perfilado desconocido: {mode} (use {' o '.join(MODES)})")
+    return SamplingProfiler() if mode == "sampling" else DeterministicProfiler()
+
+
+def folded_from_stats(stats: dict, max_depth: int = MAX_STACK_DEPTH) -> Counter:
+    """Pilas plegadas (microsegundos) a partir del grafo de llamadas de cProfile
+
+    cProfile solo guarda pares llamador → llamado; el tiempo de cada función se
+    reparte entre sus llamados en proporción al tiempo de cada arista, como
+    hacen las herramientas que dibujan flamegraphs desde pstats.
+    """
+    callees: Dict[tuple, Dict[tuple, float]] = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge[3]
+
+    folded = Counter()
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    threshold = sum(stats[root][3] for root in roots) * MIN_STACK_SHARE
+
+    def walk(func: tuple, budget: float, stack: List[str], path: set) -> None:
+        _, _, self_time, total_time, _ = stats[func]
+        if total_time <= 0 or budget <= threshold:
+            return
+        share = budget / total_time
+        stack.append(label(func))
+        path.add(func)
+        micros = int(self_time * share * 1e6)
+        if micros:
+            folded[";".join(stack)] += micros
+        if len(stack) < max_depth:
+            for callee, edge_time in callees.get(func, {}).items():
+                if callee not in path:
+                    walk(callee, edge_time * share, stack, path)
+        path.discard(func)
+        stack.pop()
+
+    for root in roots:
+        walk(root, stats[root][3], [], set())
+    return folded
+
+
+def write_outputs(profiler, prefix: str) -> None:
+    """Escribe ``<prefix>.pstats`` (legible con pstats) y ``<prefix>.folded`` (flamegraph.pl)"""
+    with open(prefix + ".pstats", 'wb') as f:
+        marshal.dump(profiler.stats(), f)
+    with open(prefix + ".folded", 'w') as f:
+        for stack, count in sorted(profiler.folded().items()):
+            f.write(f"{stack} {count}\n")
+
+
+def top_functions(pstats_file: str, limit: int = 10) -> List[HotFunction]:
+    """Funciones con más tiempo propio según un archivo pstats"""
+    with open(pstats_file, 'rb') as f:
+        stats = marshal.load(f)
+    hot = [HotFunction(label(func), tt, ct, nc) for func, (cc, nc, tt, ct, _) in stats.items()]
+    hot.sort(key=lambda h: h.self_time, reverse=True)
+    return hot[:limit]
+
+
+class ProfileSession:
+    """Perfil de una invocación de aetos y de los intérpretes hijos que lanza
+
+    Cada proceso deja ``<nombre>.pstats`` y ``<nombre>.folded`` en ``directory``.
+    """
+
+    def __init__(self, mode: str, directory: str):
+        self.mode = mode
+        self.directory = directory
+        self._profiler = make_profiler(mode)
+        self._names = Counter()
+
+    def start(self) -> "ProfileSession":
+        os.makedirs(self.directory, exist_ok=True)
+        self._profiler.enable()
+        return self
+
+    def stop(self) -> None:
+        self._profiler.disable()
+        write_outputs(self._profiler, os.path.join(self.directory, "aetos"))
+
+    def wrap(self, cmd: list, name: str = "pip") -> list:
+        """Inyecta el perfilador en ``[python, -m, modulo, ...]``"""
+        if len(cmd) < 3 or cmd[1] != "-m":
+            return cmd
+        self._names[name] += 1
+        if self._names[name] > 1:
+            name = f"{name}-{self._names[name]}"
+        prefix = os.path.join(self.directory, name)
+        return [cmd[0], os.path.abspath(__file__), self.mode, prefix] + cmd[1:]
+
+    def reports(self) -> List[str]:
+        """Prefijos de los perfiles escritos (aetos primero)"""
+        names = sorted(entry[:-len(".pstats")] for entry in os.listdir(self.directory) if entry.endswith(".pstats"))
+        names.sort(key=lambda name: name != "aetos")
+        return [os.path.join(self.directory, name) for name in names]
+
+
+def run_child(argv: list) -> int:
+    """Punto de entrada en el intérprete hijo: ``<modo> <prefijo> -m <modulo> [args]``"""
+    mode, prefix, flag, module = argv[:4]
+    if flag != "-m":
+        raise SystemExit("uso: aetos_profile.py <modo> <prefijo> -m <modulo> [args]")
+    # Como python -m: el directorio de este archivo no debe tapar módulos del hijo
+    if sys.path and os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+        del sys.path[0]
+    sys.argv = [module] + argv[4:]
+    profiler = make_profiler(mode)
+    code = 0
+    profiler.enable()
+    try:
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    finally:
+        profiler.disable()
+        write_outputs(profiler, prefix)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(run_child(sys.argv[1:]))
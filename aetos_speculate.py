@@ -0,0 +1,332 @@
+# aetos_speculate.py
+# Precarga especulativa de dependencias aprendidas de instalaciones anteriores
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+if __package__:
+    from . import aetos_env, aetos_lock, aetos_matrix, aetos_peers, aetos_prefetch
+else:
+    import aetos_env
+    import aetos_lock
+    import aetos_matrix
+    import aetos_peers
+    import aetos_prefetch
+
+# Descargas especulativas simultáneas (como mucho una por CPU: compiten con pip)
+WORKERS = 4
+# Máximo de dependencias que se intentan precargar por instalación
+MAX_PREDICTIONS = 64
+# Presupuesto por defecto para descargas especulativas sin usar (MB)
+DEFAULT_BUDGET_MB = 200
+
+LEDGER_FILE = "speculative.json"
+LEDGER_LOCK = "speculative.lock"
+
+
+def get_graph_file(cache_dir: Path, index_url: str) -> Path:
+    """Grafo de dependencias aprendido para un índice concreto"""
+    key = hashlib.sha256(index_url.encode()).hexdigest()[:16]
+    return cache_dir / "depgraph" / f"{key}.json"
+
+
+def load_graph(path: Path) -> dict:
+    try:
+        with open(path, 'r') as f:
+            graph = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {"edges": {}, "versions": {}}
+    graph.setdefault("edges", {})
+    graph.setdefault("versions", {})
+    return graph
+
+
+def _write_json_atomic(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def save_graph(path: Path, graph: dict) -> None:
+    _write_json_atomic(path, graph)
+
+
+def requested_names(args: list) -> List[str]:
+    """Nombres normalizados de los proyectos pedidos en la línea de comandos y en ``-r``"""
+    names = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        option, has_value, value = arg.partition("=")
+        if (option if has_value else arg) in aetos_matrix.PIP_OPTIONS_WITH_VALUE:
+            if not has_value:
+                value = args[i + 1] if i + 1 < len(args) else ""
+                i += 1
+            if option in ("-r", "--requirement") and value:
+                try:
+                    names += [req.name for req in aetos_env.parse_requirements_file(Path(value))]
+                except OSError:
+                    pass
+        elif not arg.startswith("-"):
+            try:
+                names.append(aetos_env.Requirement(arg).name)
+            except aetos_env.InvalidRequirement:
+                pass  # rutas, URLs y similares no tienen historial
+        i += 1
+    return list(dict.fromkeys(aetos_env.canonicalize_name(name) for name in names))
+
+
+def target_paths(args: list) -> Optional[List[Path]]:
+    """Directorios donde quedará la instalación (None = el sys.path del intérprete)"""
+    target = aetos_env.option_value(args, ("-t", "--target"))
+    return [Path(target)] if target else None
+
+
+def learn(graph: dict, roots: List[str], dists: dict) -> int:
+    """Registra en el grafo las aristas instaladas alcanzables desde ``roots``
+
+    ``dists`` son las distribuciones instaladas por nombre normalizado
+    (ver ``aetos_env.distributions_by_name``). Retorna la cantidad de proyectos visitados.
+    """
+    queue = deque(name for name in roots if name in dists)
+    seen = set(queue)
+    while queue:
+        name = queue.popleft()
+        dist = dists[name]
+        dependencies = aetos_env.requirement_dependencies(dist)
+        graph["edges"][name] = dependencies
+        graph["versions"][name] = dist.version
+        for dependency in dependencies:
+            if dependency in dists and dependency not in seen:
+                seen.add(dependency)
+                queue.append(dependency)
+    return len(seen)
+
+
+def has_history(graph: dict, roots: List[str]) -> bool:
+    return any(graph["edges"].get(name) for name in roots)
+
+
+def predict(graph: dict, roots: List[str], installed: Dict[str, str], cached: set,
+            limit: int = MAX_PREDICTIONS) -> List[str]:
+    """Dependencias probables de ``roots`` como ``nombre==versión``, más cercanas primero
+
+    Se omiten las raíces (pip las pide de todos modos al empezar), lo ya instalado
+    y lo que ya está en la caché.
+    """
+    predictions = []
+    queue = deque(roots)
+    seen = set(roots)
+    while queue and len(predictions) < limit:
+        name = queue.popleft()
+        for dependency in graph["edges"].get(name, []):
+            if dependency in seen:
+                continue
+            seen.add(dependency)
+            queue.append(dependency)
+            version = graph["versions"].get(dependency)
+            if version and dependency not in installed and (dependency, version) not in cached:
+                predictions.append(f"{dependency}=={version}")
+    return predictions[:limit]
+
+
+def load_ledger(wheelhouse: Path) -> dict:
+    """Descargas especulativas que todavía no usó ninguna instalación"""
+    try:
+        with open(wheelhouse / LEDGER_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_ledger(wheelhouse: Path, ledger: dict) -> None:
+    _write_json_atomic(wheelhouse / LEDGER_FILE, ledger)
+
+
+def settle_ledger(wheelhouse: Path, ledger: dict, installed: Dict[str, str],
+                  budget: int) -> List[str]:
+    """Da por usadas las descargas instaladas y libera las más viejas por encima de ``budget``
+
+    Las descargas usadas pasan a ser parte normal de la caché y salen del registro.
+    Retorna los archivos eliminados.
+    """
+    for filename in list(ledger):
+        parsed = aetos_env.parse_artifact_filename(filename)
+        if parsed is None or not (wheelhouse / filename).exists():
+            del ledger[filename]
+        elif installed.get(parsed[0]) == parsed[1]:
+            del ledger[filename]
+
+    evicted = []
+    total = sum(entry["size"] for entry in ledger.values())
+    for filename in sorted(ledger, key=lambda name: ledger[name]["added"]):
+        if total <= budget:
+            break
+        try:
+            (wheelhouse / filename).unlink()
+        except FileNotFoundError:
+            pass
+        total -= ledger.pop(filename)["size"]
+        evicted.append(filename)
+    return evicted
+
+
+class SpeculativeFetcher:
+    """Descarga en segundo plano las dependencias previstas mientras pip resuelve
+
+    pip lee la caché a través de ``find_links``: un listado HTTP local que se
+    genera en cada petición. pip (desde 23.3) lista un directorio de
+    ``--find-links`` una sola vez por proceso, pero vuelve a pedir una URL para
+    cada proyecto, así que lo que llega a mitad de la resolución le sirve a
+    los proyectos siguientes. Cada descarga va a un directorio temporal y se
+    mueve a la caché de golpe, así pip nunca ve un archivo a medias. Las
+    descargas corren con prioridad baja para no quitarle CPU al pip que resuelve.
+    """
+
+    def __init__(self, graph: dict, roots: List[str], index_args: list, wheelhouse: Path,
+                 paths: Optional[List[Path]] = None, python: Optional[str] = None,
+                 workers: int = WORKERS):
+        self.graph = graph
+        self.roots = roots
+        self.index_args = index_args
+        self.wheelhouse = wheelhouse
+        self.paths = paths
+        self.python = python or sys.executable
+        self.workers = max(1, min(workers, os.cpu_count() or 1))
+        self.fetched = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._queue = deque()
+        self._running = []
+        self._threads = []
+        self._server = None
+        self.find_links = str(wheelhouse)
+
+    def start(self) -> "SpeculativeFetcher":
+        try:
+            self._server = aetos_peers.PeerCacheServer(self.wheelhouse, host="127.0.0.1", port=0).start()
+            self.find_links = f"{self._server.url}wheels/"
+        except OSError:
+            pass  # sin puerto local: el directorio sigue sirviendo a la próxima instalación
+        planner = threading.Thread(target=self._plan_and_fetch, daemon=True)
+        planner.start()
+        self._threads.append(planner)
+        return self
+
+    def _plan_and_fetch(self) -> None:
+        # Leer lo instalado cuesta; se hace aquí para no retrasar el arranque de pip
+        installed = aetos_env.installed_distributions(self.paths)
+        self._queue.extend(predict(self.graph, self.roots, installed,
+                                   aetos_matrix.wheelhouse_contents(self.wheelhouse)))
+        with self._lock:
+            if self._stopped.is_set():
+                return
+            for _ in range(min(self.workers, len(self._queue))):
+                worker = threading.Thread(target=self._work, daemon=True)
+                self._threads.append(worker)
+                worker.start()
+
+    def _work(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                spec = self._queue.popleft()
+            except IndexError:
+                return
+            self._fetch(spec)
+
+    def _fetch(self, spec: str) -> None:
+        staging = self.wheelhouse / f".speculative-{os.getpid()}-{threading.get_ident()}"
+        staging.mkdir(exist_ok=True)
+        cmd = [self.python, "-m", "pip", "download", "--no-deps", "--only-binary", ":all:",
+               "--quiet", "--dest", str(staging)] + self.index_args + [spec]
+        try:
+            with self._lock:
+                if self._stopped.is_set():
+                    return
+                proc = subprocess.Popen(aetos_prefetch.low_priority_command(cmd),
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                self._running.append(proc)
+            returncode = proc.wait()
+            with self._lock:
+                self._running.remove(proc)
+            if returncode == 0:
+                self._publish(staging)
+        except OSError:
+            pass
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _publish(self, staging: Path) -> None:
+        for path in staging.iterdir():
+            target = self.wheelhouse / path.name
+            if target.exists():
+                continue
+            size = path.stat().st_size
+            os.replace(path, target)
+            with self._lock:
+                self.fetched[path.name] = {"size": size, "added": time.time()}
+
+    def stop(self) -> None:
+        """Cancela lo pendiente, termina las descargas en curso y espera a los hilos"""
+        self._stopped.set()
+        with self._lock:
+            for proc in self._running:
+                proc.terminate()
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join()
+        if self._server is not None:
+            self._server.stop()
+
+
+def begin(graph_file: Path, args: list, index_args: list,
+          wheelhouse: Path) -> Optional[SpeculativeFetcher]:
+    """Arranca la precarga si hay historial para lo que se instala (None si no hay)"""
+    roots = requested_names(args)
+    if not roots:
+        return None
+    graph = load_graph(graph_file)
+    if not has_history(graph, roots):
+        return None
+    return SpeculativeFetcher(graph, roots, index_args, wheelhouse, target_paths(args)).start()
+
+
+def finish(fetcher: Optional[SpeculativeFetcher], graph_file: Path, args: list,
+           wheelhouse: Path, success: bool, budget: int) -> None:
+    """Detiene la precarga, aprende del resultado y aplica el presupuesto de la caché"""
+    if fetcher is not None:
+        fetcher.stop()
+
+    roots = requested_names(args)
+    dists = {}
+    if success and roots:
+        dists = aetos_env.distributions_by_name(target_paths(args))
+        graph = load_graph(graph_file)
+        learn(graph, roots, dists)
+        save_graph(graph_file, graph)
+
+    # Sin descargas especulativas ni pendientes no hay registro que tocar
+    if fetcher is None and not (wheelhouse / LEDGER_FILE).exists():
+        return
+
+    # Varias instalaciones a la vez comparten el registro: leer y guardar bajo bloqueo
+    with aetos_lock.FileLock(wheelhouse / LEDGER_LOCK):
+        ledger = load_ledger(wheelhouse)
+        if fetcher is not None:
+            ledger.update(fetcher.fetched)
+        if not ledger:
+            return
+        installed = {name: dist.version for name, dist in dists.items()}
+        settle_ledger(wheelhouse, ledger, installed, budget)
+        save_ledger(wheelhouse, ledger)
@@ -0,0 +1,214 @@
+# aetos_sync.py
+# Sincronización en paralelo de varios entornos virtuales con sus archivos de requisitos
+
+import json
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+if __package__:
+    from . import aetos_env, aetos_matrix
+else:
+    import aetos_env
+    import aetos_matrix
+
+
+class SyncTarget(NamedTuple):
+    venv: Path
+    requirements: Path
+
+
+class SyncPlan(NamedTuple):
+    target: SyncTarget
+    python: str
+    version: str
+    install: List[str]
+    uninstall: List[str]
+    local: List[str] = []    # líneas -e y de ruta: se reinstalan en cada sync
+    ignored: List[str] = []  # opciones del archivo que sync no aplica (-c, --index-url...)
+
+
+class SyncResult(NamedTuple):
+    plan: SyncPlan
+    returncode: int
+    output: str
+
+
+def read_manifest(path: Path) -> List[SyncTarget]:
+    """Lee el manifiesto de entornos
+
+    Formato de texto: una línea ``<venv> <requisitos>`` por entorno (``#`` comenta).
+    Formato JSON (``.json``): lista de objetos ``{"venv": ..., "requirements": ...}``.
+    Las rutas relativas se resuelven respecto al manifiesto.
+    """
+    path = Path(path)
+    base = path.parent
+
+    if path.suffix == ".json":
+        with open(path, 'r') as f:
+            pairs = [(entry["venv"], entry["requirements"]) for entry in json.load(f)]
+    else:
+        pairs = []
+        for line in path.read_text().splitlines():
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            fields = line.split()
+            if len(fields) != 2:
+                raise ValueError(f"línea inválida en el manifiesto: {line}")
+            pairs.append((fields[0], fields[1]))
+
+    return [SyncTarget(base / venv, base / requirements) for venv, requirements in pairs]
+
+
+def plan_sync(target: SyncTarget) -> SyncPlan:
+    """Calcula qué instalar y desinstalar en un entorno sin lanzar pip
+
+    Los archivos de requisitos se tratan como bloqueos completos (igual que
+    pip-sync): lo instalado que no aparece en ellos se desinstala. Los
+    marcadores se evalúan con el intérprete del entorno, no con el de aetos.
+    Las líneas ``-e`` y de ruta (sin nombre de proyecto) se reinstalan en
+    cada sync, y lo instalado como editable o desde una ruta local nunca se
+    desinstala. Las opciones del archivo que sync no aplica (``-c``, índices,
+    ``--hash``...) quedan en ``ignored`` para avisar de ellas.
+    """
+    installed = aetos_env.distributions_by_name(aetos_env.find_site_packages(target.venv))
+    local, editable, options = [], [], []
+    requirements = aetos_env.parse_requirements_file(
+        target.requirements, local=local, options=options, editable=editable)
+
+    wanted = set()
+    to_install = []
+    environment = None
+    for req in requirements:
+        if req.marker is not None:
+            if environment is None:
+                environment = aetos_env.venv_marker_environment(target.venv)
+            if not aetos_env.marker_applies(req.marker, environment):
+                continue
+        name = aetos_env.canonicalize_name(req.name)
+        wanted.add(name)
+        dist = installed.get(name)
+        if dist is None or not aetos_env.requirement_satisfied(req, dist):
+            to_install.append(aetos_env.requirement_spec(req))
+
+    to_uninstall = sorted(
+        name for name, dist in installed.items()
+        if name not in wanted and name not in aetos_env.PROTECTED_PACKAGES
+        and not aetos_env.is_local_install(dist)
+    )
+
+    return SyncPlan(
+        target,
+        str(aetos_env.get_venv_python(target.venv)),
+        aetos_env.get_venv_version(target.venv) or "",
+        to_install,
+        to_uninstall,
+        [f"-e {path}" if path in editable else path for path in local],
+        # Un aviso por línea de opciones; los --hash de los requisitos, uno solo
+        [option for option in options if not option.startswith("--hash")]
+        + (["--hash"] if any(option.startswith("--hash") for option in options) else []),
+    )
+
+
+def plan_all(targets: List[SyncTarget], jobs: Optional[int] = None) -> List[SyncPlan]:
+    """Calcula en paralelo los planes de todos los entornos"""
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(plan_sync, targets))
+
+
+def _batches(specs: List[str]) -> List[List[str]]:
+    """Reparte requisitos en lotes sin dos versiones del mismo proyecto"""
+    batches = []
+    for spec in sorted(set(specs)):
+        name = aetos_env.canonicalize_name(aetos_env.Requirement(spec).name)
+        for batch in batches:
+            if name not in batch:
+                batch[name] = spec
+                break
+        else:
+            batches.append({name: spec})
+    return [list(batch.values()) for batch in batches]
+
+
+def fetch_missing(plans: List[SyncPlan], index_args: list, wheelhouse: Path,
+                  jobs: Optional[int] = None) -> Dict[str, str]:
+    """Descarga una sola vez la unión de artefactos que faltan en todos los entornos
+
+    Retorna {versión de Python: error} para los grupos cuya descarga falló.
+    """
+    by_version = {}
+    for plan in plans:
+        if plan.install:
+            group = by_version.setdefault(plan.version, (plan.python, []))
+            group[1].extend(plan.install)
+
+    downloads = []
+    versions = []
+    for version, (python, specs) in by_version.items():
+        for batch in _batches(specs):
+            downloads.append((python, ["--no-deps"] + batch))
+            versions.append(version)
+
+    errors = {}
+    results = aetos_matrix.download_union(downloads, index_args, wheelhouse, jobs)
+    for version, proc in zip(versions, results):
+        if proc.returncode != 0:
+            errors[version] = proc.stderr
+    return errors
+
+
+def local_install_args(local: List[str]) -> List[str]:
+    """Argumentos de pip para las líneas locales del plan (``-e ruta`` o ``ruta``)"""
+    args = []
+    for line in local:
+        args += ["-e", line[len("-e "):]] if line.startswith("-e ") else [line]
+    return args
+
+
+def apply_plan(plan: SyncPlan, wheelhouse: Path, index_args: list = ()) -> SyncResult:
+    """Aplica las desinstalaciones e instalaciones de un entorno
+
+    Las líneas locales se instalan al final con el índice (pip las construye),
+    sin dependencias: el archivo de requisitos ya las fija.
+    """
+    if plan.uninstall:
+        proc = subprocess.run(
+            [plan.python, "-m", "pip", "uninstall", "-y"] + plan.uninstall,
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return SyncResult(plan, proc.returncode, proc.stderr)
+
+    if plan.install:
+        proc = aetos_matrix.install(plan.python, ["--no-deps"] + plan.install, wheelhouse)
+        if proc.returncode != 0:
+            return SyncResult(plan, proc.returncode, proc.stderr)
+
+    if plan.local:
+        proc = subprocess.run(
+            [plan.python, "-m", "pip", "install", "--no-deps"] + list(index_args)
+            + local_install_args(plan.local),
+            capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return SyncResult(plan, proc.returncode, proc.stderr)
+
+    return SyncResult(plan, 0, "")
+
+
+def run_sync(plans: List[SyncPlan], index_args: list, wheelhouse: Path,
+             jobs: Optional[int] = None) -> List[SyncResult]:
+    """Descarga lo que falta y aplica los planes en paralelo con ``jobs`` trabajadores"""
+    errors = fetch_missing(plans, index_args, wheelhouse, jobs)
+
+    def apply(plan: SyncPlan) -> SyncResult:
+        if plan.install and plan.version in errors:
+            return SyncResult(plan, 1, errors[plan.version])
+        if not (plan.install or plan.uninstall or plan.local):
+            return SyncResult(plan, 0, "")
+        return apply_plan(plan, wheelhouse, index_args)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(apply, plans))
@@ -0,0 +1,230 @@
+# aetos_uninstall.py
+# Desinstalación masiva dentro del proceso: plan desde RECORD y borrado en paralelo
+
+import importlib.util
+import os
+import shutil
+import site
+import subprocess
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+if __package__:
+    from . import aetos_env, aetos_graph
+else:
+    import aetos_env
+    import aetos_graph
+
+# Borrar es E/S pura: muchos más hilos que núcleos
+DELETE_JOBS = 16
+TRASH_PREFIX = ".aetos-trash-"
+
+
+class UninstallPlan(NamedTuple):
+    name: str
+    version: str
+    root: str
+    files: List[str]
+    skipped: List[str]
+
+
+class UninstallResult(NamedTuple):
+    errors: dict
+    trash: Optional[str]
+
+
+def _allowed_roots(root: str) -> List[str]:
+    """Directorios dentro de los que se puede borrar: el site-packages y el entorno"""
+    roots = [os.path.abspath(root), os.path.abspath(sys.prefix)]
+    user_base = site.getuserbase()
+    if user_base:
+        roots.append(os.path.abspath(user_base))
+    return roots
+
+
+def _inside(path: str, roots: List[str]) -> bool:
+    return any(path == root or path.startswith(root + os.sep) for root in roots)
+
+
+def installed_files(dist) -> Optional[List[str]]:
+    """Archivos que instaló la distribución según su RECORD o su installed-files.txt
+
+    Retorna None si no tiene ninguno de los dos: ``Distribution.files`` recurre
+    entonces al SOURCES.txt de un egg-info, con rutas del árbol de fuentes
+    (``setup.py develop``), y antes de Python 3.12 lo prefiere incluso a
+    installed-files.txt, así que aquí se lee a mano.
+    """
+    if dist.read_text("RECORD") is not None:
+        return [str(entry) for entry in dist.files or []]
+    listing = dist.read_text("installed-files.txt")
+    egg_info = getattr(dist, "_path", None)  # PathDistribution: el directorio .egg-info
+    if listing is None or egg_info is None:
+        return None
+    return [os.path.join(str(egg_info), line) for line in listing.splitlines() if line.strip()]
+
+
+def plan_uninstall(names: List[str], paths: Optional[List[Path]] = None) -> tuple:
+    """Planifica la desinstalación leyendo el RECORD de cada distribución
+
+    Retorna (planes, no_instalados, sin_record). Los archivos que el RECORD
+    sitúa fuera del entorno no se tocan (quedan en ``skipped``); los .pyc de
+    cada .py se añaden si existen aunque el RECORD no los liste, como hace pip.
+    Solo se confía en un RECORD o un installed-files.txt (``installed_files``):
+    el resto va a ``sin_record``. Sin ``paths`` se busca en el sys.path sin el
+    directorio actual.
+    """
+    installed = aetos_env.distributions_by_name(
+        paths if paths is not None else aetos_graph.environment_paths())
+    plans, missing, unsupported = [], [], []
+    for name in dict.fromkeys(aetos_env.canonicalize_name(n) for n in names):
+        dist = installed.get(name)
+        if dist is None:
+            missing.append(name)
+            continue
+        files = installed_files(dist)
+        if files is None:
+            unsupported.append(name)
+            continue
+        root = os.path.abspath(str(dist.locate_file("")))
+        allowed = _allowed_roots(root)
+        planned, skipped = {}, []
+        for entry in files:
+            path = os.path.normpath(os.path.join(root, entry))
+            if not _inside(path, allowed):
+                skipped.append(path)
+                continue
+            planned[path] = None
+            if path.endswith(".py"):
+                cached = importlib.util.cache_from_source(path)
+                if cached not in planned and os.path.exists(cached):
+                    planned[cached] = None
+        plans.append(UninstallPlan(dist.metadata["Name"], dist.version, root, list(planned), skipped))
+    return plans, missing, unsupported
+
+
+def _unlink(path: str) -> Optional[str]:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        return str(e)
+    return None
+
+
+def _remove_empty_dirs(files: List[str], roots: List[str]) -> None:
+    """Borra los directorios que quedaron vacíos, de los más profundos a los menos"""
+    directories = set()
+    for path in files:
+        parent = os.path.dirname(path)
+        while parent not in roots and _inside(parent, roots):
+            directories.add(parent)
+            parent = os.path.dirname(parent)
+    for directory in sorted(directories, key=len, reverse=True):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass  # no vacío (archivos ajenos al RECORD) o ya borrado
+
+
+def _owned_directories(plan: UninstallPlan, planned: set) -> List[str]:
+    """Directorios de primer nivel del site-packages que contienen solo archivos del plan
+
+    Se pueden mover de una sola vez; los .pyc de ``__pycache__`` cuentan como
+    propios aunque el RECORD no los liste.
+    """
+    top_levels = set()
+    for path in plan.files:
+        relative = os.path.relpath(path, plan.root)
+        first = relative.split(os.sep, 1)[0]
+        if first not in (os.curdir, os.pardir) and os.sep in relative:
+            top_levels.add(os.path.join(plan.root, first))
+
+    owned = []
+    for directory in sorted(top_levels):
+        if not os.path.isdir(directory) or os.path.islink(directory):
+            continue
+        complete = True
+        for current, _, filenames in os.walk(directory):
+            for filename in filenames:
+                path = os.path.join(current, filename)
+                generated = os.path.basename(current) == "__pycache__" and filename.endswith(".pyc")
+                if path not in planned and not generated:
+                    complete = False
+                    break
+            if not complete:
+                break
+        if complete:
+            owned.append(directory)
+    return owned
+
+
+def remove(plans: List[UninstallPlan], jobs: int = DELETE_JOBS) -> UninstallResult:
+    """Borra todos los archivos planificados repartidos entre ``jobs`` hilos"""
+    files = [path for plan in plans for path in plan.files]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        outcomes = list(pool.map(_unlink, files))
+    errors = {path: error for path, error in zip(files, outcomes) if error}
+    for plan in plans:
+        _remove_empty_dirs(plan.files, _allowed_roots(plan.root))
+    return UninstallResult(errors, None)
+
+
+def remove_atomic(plans: List[UninstallPlan]) -> UninstallResult:
+    """Retira los paquetes del entorno con renombrados y deja el borrado para después
+
+    Los directorios que pertenecen enteros a los paquetes se mueven de una vez
+    a una papelera dentro del mismo site-packages, y el resto de archivos uno a
+    uno. En cuanto termina, el entorno ya no ve los paquetes; la papelera se
+    borra con ``cleanup_in_background``.
+    """
+    if not plans:
+        return UninstallResult({}, None)
+    trash = os.path.join(plans[0].root, f"{TRASH_PREFIX}{uuid.uuid4().hex[:12]}")
+    os.mkdir(trash)
+    errors = {}
+    counter = 0
+
+    def move(path: str) -> None:
+        nonlocal counter
+        counter += 1
+        try:
+            os.replace(path, os.path.join(trash, str(counter)))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Otro sistema de archivos (p. ej. scripts en otro disco): se borra directamente
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path, onerror=lambda *e: errors.setdefault(path, str(e[2][1])))
+            else:
+                error = _unlink(path)
+                if error:
+                    errors[path] = error
+
+    for plan in plans:
+        moved = [directory + os.sep for directory in _owned_directories(plan, set(plan.files))]
+        for directory in moved:
+            move(directory[:-1])
+        remaining = [path for path in plan.files if not path.startswith(tuple(moved))]
+        for path in remaining:
+            move(path)
+        _remove_empty_dirs(remaining, _allowed_roots(plan.root))
+    return UninstallResult(errors, trash)
+
+
+def cleanup_in_background(trash: str) -> None:
+    """Borra la papelera (y las que dejaron ejecuciones interrumpidas) en otro proceso"""
+    parent = os.path.dirname(trash)
+    leftovers = [os.path.join(parent, name) for name in os.listdir(parent) if name.startswith(TRASH_PREFIX)]
+    code = "import shutil, sys\nfor path in sys.argv[1:]:\n    shutil.rmtree(path, ignore_errors=True)\n"
+    kwargs = {"start_new_session": True} if os.name != "nt" else {
+        "creationflags": getattr(subprocess, "DETACHED_PROCESS", 0)}
+    try:
+        subprocess.Popen([sys.executable, "-c", code] + leftovers, stdin=subprocess.DEVNULL,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+    except OSError:
+        for path in leftovers:
+            shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,247 @@
+# aetos_wheel.py
+# Instalación de wheels dentro del proceso: desempaquetado, scripts y RECORD (sin pip)
+
+import base64
+import csv
+import hashlib
+import importlib.util
+import io
+import os
+import py_compile
+import re
+import sys
+import sysconfig
+import zipfile
+from email.parser import Parser
+from typing import Dict, List, NamedTuple, Optional
+
+CHUNK_SIZE = 256 * 1024
+INSTALLER = "aetos"
+
+# Archivos de firma y RECORD originales: el RECORD se reescribe con lo instalado
+SKIPPED_DIST_INFO_FILES = {"RECORD", "RECORD.jws", "RECORD.p7s"}
+
+SCRIPT_TEMPLATE = """\
+#!{python}
+# -*- coding: utf-8 -*-
+import re
+import sys
+from {module} import {import_name}
+if __name__ == "__main__":
+    sys.argv[0] = re.sub(r"(-script\\.pyw|\\.exe)?$", "", sys.argv[0])
+    sys.exit({call}())
+"""
+
+
+# Primera línea de un script que hay que reescribir: "#!python" o "#!pythonw" y nada pegado
+SHEBANG = re.compile(rb"#!python(w?)(?=\s|$)")
+
+
+class WheelError(Exception):
+    """Wheel inválido o que no se puede instalar"""
+
+
+class InstalledWheel(NamedTuple):
+    name: str
+    version: str
+    files: int
+
+
+def get_scheme(target: Optional[str] = None, user: bool = False) -> Dict[str, str]:
+    """Directorios de instalación: purelib, platlib, headers, scripts y data"""
+    if target:
+        return {
+            "purelib": target,
+            "platlib": target,
+            "headers": os.path.join(target, "include"),
+            "scripts": os.path.join(target, "bin"),
+            "data": target,
+        }
+    if user:
+        scheme = f"{os.name}_user"
+    elif hasattr(sysconfig, "get_default_scheme"):
+        scheme = sysconfig.get_default_scheme()
+    else:  # Python < 3.10
+        scheme = "nt" if os.name == "nt" else "posix_prefix"
+    paths = sysconfig.get_paths(scheme=scheme)
+    return {
+        "purelib": paths["purelib"],
+        "platlib": paths["platlib"],
+        "headers": paths["include"],
+        "scripts": paths["scripts"],
+        "data": paths["data"],
+    }
+
+
+def pythonw_executable() -> str:
+    """Intérprete sin consola para los scripts "#!pythonw" (en POSIX es el mismo intérprete)"""
+    if os.name == "nt":
+        candidate = os.path.join(os.path.dirname(sys.executable), "pythonw.exe")
+        if os.path.exists(candidate):
+            return candidate
+    return sys.executable
+
+
+def record_hash(digest: bytes) -> str:
+    return "sha256=" + base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _safe_join(base: str, relative: str) -> str:
+    """Une una ruta del wheel a su destino (absoluto), rechazando rutas que salgan de él"""
+    path = os.path.normpath(os.path.join(base, relative))
+    if os.path.isabs(relative) or os.path.commonpath([base, path]) != base:
+        raise WheelError(f"ruta insegura en el wheel: {relative}")
+    return path
+
+
+def find_dist_info(names: List[str]) -> str:
+    """Directorio .dist-info en la raíz del wheel"""
+    candidates = {name.split("/")[0] for name in names if name.split("/")[0].endswith(".dist-info")}
+    if len(candidates) != 1:
+        raise WheelError("el wheel debe tener exactamente un directorio .dist-info")
+    return candidates.pop()
+
+
+def _extract(wheel: zipfile.ZipFile, info: zipfile.ZipInfo, destination: str,
+             rewrite_shebang: bool) -> tuple:
+    """Extrae un miembro por bloques calculando su hash: (hash, tamaño)"""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    with wheel.open(info) as source, open(destination, 'wb') as target:
+        first = True
+        while True:
+            chunk = source.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            match = SHEBANG.match(chunk) if first and rewrite_shebang else None
+            if match:
+                # Convención de los wheels: "#!python" se cambia por el intérprete real
+                # y "#!pythonw" (scripts de interfaz) por el intérprete sin consola
+                python = pythonw_executable() if match.group(1) else sys.executable
+                chunk = b"#!" + os.fsencode(python) + chunk[match.end(1):]
+            first = False
+            digest.update(chunk)
+            size += len(chunk)
+            target.write(chunk)
+    mode = info.external_attr >> 16
+    if rewrite_shebang or mode & 0o111:
+        os.chmod(destination, 0o755)
+    return digest.digest(), size
+
+
+def _write_file(path: str, data: bytes, executable: bool = False) -> tuple:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if executable:
+        os.chmod(path, 0o755)
+    return hashlib.sha256(data).digest(), len(data)
+
+
+def console_scripts(entry_points: str) -> Dict[str, str]:
+    """Scripts de consola y de interfaz declarados en entry_points.txt"""
+    scripts = {}
+    section = None
+    for line in entry_points.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        if line.startswith("["):
+            section = line.strip("[]").strip()
+            continue
+        if section in ("console_scripts", "gui_scripts") and "=" in line:
+            name, _, value = line.partition("=")
+            scripts[name.strip()] = value.split("[")[0].strip()
+    return scripts
+
+
+def script_source(entry_point: str) -> str:
+    """Lanzador de un punto de entrada ``modulo:objeto.atributo``"""
+    module, _, attribute = entry_point.partition(":")
+    if not attribute:
+        raise WheelError(f"punto de entrada inválido: {entry_point}")
+    import_name = attribute.split(".")[0]
+    return SCRIPT_TEMPLATE.format(
+        python=sys.executable, module=module.strip(), import_name=import_name, call=attribute.strip()
+    )
+
+
+def install_wheel(path: str, scheme: Dict[str, str], requested: bool = False,
+                  compile_bytecode: bool = True) -> InstalledWheel:
+    """Instala un wheel sin pip y retorna su nombre, versión y archivos instalados
+
+    Los archivos se extraen por bloques; el RECORD se reescribe con las rutas
+    reales (incluidos scripts y .pyc) para que pip o aetos puedan desinstalarlo.
+    """
+    scheme = {key: os.path.abspath(value) for key, value in scheme.items()}
+    try:
+        wheel = zipfile.ZipFile(path)
+    except zipfile.BadZipFile as e:
+        raise WheelError(f"{os.path.basename(path)}: {e}") from e
+
+    with wheel:
+        names = wheel.namelist()
+        dist_info = find_dist_info(names)
+        metadata = Parser().parsestr(wheel.read(f"{dist_info}/METADATA").decode("utf-8"))
+        wheel_info = Parser().parsestr(wheel.read(f"{dist_info}/WHEEL").decode("utf-8"))
+        name, version = metadata["Name"], metadata["Version"]
+        purelib = (wheel_info.get("Root-Is-Purelib") or "").strip().lower() == "true"
+        root = scheme["purelib"] if purelib else scheme["platlib"]
+        data_dir = dist_info[:-len(".dist-info")] + ".data"
+
+        installed = []  # (ruta absoluta, hash, tamaño)
+        for info in wheel.infolist():
+            if info.is_dir():
+                continue
+            member = info.filename
+            top, _, rest = member.partition("/")
+            if top == dist_info and rest in SKIPPED_DIST_INFO_FILES:
+                continue
+            is_script = False
+            if top == data_dir:
+                key, _, rest = rest.partition("/")
+                if key not in scheme:
+                    raise WheelError(f"categoría de datos desconocida en el wheel: {key}")
+                base = os.path.join(scheme["headers"], name) if key == "headers" else scheme[key]
+                destination = _safe_join(base, rest)
+                is_script = key == "scripts"
+            else:
+                destination = _safe_join(root, member)
+            digest, size = _extract(wheel, info, destination, is_script)
+            installed.append((destination, digest, size))
+
+        entry_points = f"{dist_info}/entry_points.txt"
+        if entry_points in names and os.name != "nt":
+            scripts = console_scripts(wheel.read(entry_points).decode("utf-8"))
+            for script, entry_point in scripts.items():
+                destination = _safe_join(scheme["scripts"], script)
+                digest, size = _write_file(destination, script_source(entry_point).encode(), executable=True)
+                installed.append((destination, digest, size))
+
+    dist_info_path = os.path.join(root, dist_info)
+    markers = {"INSTALLER": INSTALLER + "\n"}
+    if requested:
+        markers["REQUESTED"] = ""
+    for filename, content in markers.items():
+        destination = os.path.join(dist_info_path, filename)
+        digest, size = _write_file(destination, content.encode())
+        installed.append((destination, digest, size))
+
+    records = [(os.path.relpath(p, root), record_hash(d), str(s)) for p, d, s in installed]
+    if compile_bytecode:
+        for destination, _, _ in installed:
+            if destination.endswith(".py") and destination.startswith(root + os.sep):
+                cached = importlib.util.cache_from_source(destination)
+                try:
+                    py_compile.compile(destination, cfile=cached, doraise=True)
+                except py_compile.PyCompileError:
+                    continue  # pip tampoco falla por un .py que no compila
+                records.append((os.path.relpath(cached, root), "", ""))
+
+    records.append((os.path.relpath(os.path.join(dist_info_path, "RECORD"), root), "", ""))
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(records)
+    with open(os.path.join(dist_info_path, "RECORD"), 'w', newline="") as f:
+        f.write(buffer.getvalue())
+    return InstalledWheel(name, version, len(records))
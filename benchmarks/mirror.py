@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# benchmarks/mirror.py
+# Mirror PEP 503 local con wheels sintéticos y condiciones de red simuladas
+
+import base64
+import gzip
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+CHUNK_SIZE = 16 * 1024
+
+
+class NetworkConditions(NamedTuple):
+    """Condiciones de red inyectadas en cada respuesta"""
+    latency: float = 0.0          # segundos por petición
+    jitter: float = 0.0           # variación aleatoria (+/-) de la latencia
+    bandwidth: Optional[float] = None  # bytes por segundo (None = sin límite)
+    failure_rate: float = 0.0     # probabilidad de responder 503
+
+
+class SyntheticPackage(NamedTuple):
+    name: str
+    version: str
+    dependencies: List[str]
+    filename: str
+    sha256: str
+
+
+def _record_hash(data: bytes) -> str:
+    digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b"=")
+    return "sha256=" + digest.decode()
+
+
+def build_wheel(name: str, version: str, dependencies: List[str], payload_size: int,
+                seed: int = 0) -> bytes:
+    """Construye un wheel puro válido con un módulo y ``payload_size`` bytes de datos"""
+    module = name.replace("-", "_")
+    dist_info = f"{module}-{version}.dist-info"
+    rng = random.Random(f"{name}-{seed}")
+    # Datos aleatorios: no se comprimen, así el tamaño transferido es el real
+    payload = rng.getrandbits(8 * payload_size).to_bytes(payload_size, "little") if payload_size else b""
+    files = {
+        f"{module}/__init__.py": f"__version__ = {version!r}\n".encode(),
+        f"{module}/payload.bin": payload,
+        f"{dist_info}/METADATA": (
+            "Metadata-Version: 2.1\n"
+            f"Name: {name}\n"
+            f"Version: {version}\n"
+            + "".join(f"Requires-Dist: {dep}\n" for dep in dependencies)
+        ).encode(),
+        f"{dist_info}/WHEEL": (
+            "Wheel-Version: 1.0\nGenerator: aetos-bench\nRoot-Is-Purelib: true\nTag: py3-none-any\n"
+        ).encode(),
+    }
+    record = "".join(f"{path},{_record_hash(data)},{len(data)}\n" for path, data in files.items())
+    record += f"{dist_info}/RECORD,,\n"
+    files[f"{dist_info}/RECORD"] = record.encode()
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as wheel:
+        for path, data in files.items():
+            wheel.writestr(zipfile.ZipInfo(path, date_time=(2020, 1, 1, 0, 0, 0)), data)
+    return buffer.getvalue()
+
+
+def generate_packages(directory: Path, count: int = 20, payload_size: int = 64 * 1024,
+                      fanout: int = 2, seed: int = 0) -> Dict[str, SyntheticPackage]:
+    """Genera ``count`` paquetes ``synth-NNN``; cada uno depende de hasta ``fanout`` siguientes"""
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    packages = {}
+    names = [f"synth-{i:03d}" for i in range(count)]
+    for i, name in enumerate(names):
+        later = names[i + 1:]
+        dependencies = sorted(rng.sample(later, min(fanout, len(later))))
+        version = "1.0.0"
+        data = build_wheel(name, version, dependencies, payload_size, seed)
+        filename = f"{name.replace('-', '_')}-{version}-py3-none-any.whl"
+        (directory / filename).write_bytes(data)
+        packages[name] = SyntheticPackage(
+            name, version, dependencies, filename, hashlib.sha256(data).hexdigest()
+        )
+    return packages
+
+
+def platform_variants(name: str, versions: List[str]) -> List[Tuple[str, str]]:
+    """Wheels binarios de otras plataformas y versiones de Python, como los de numpy o grpcio
+
+    Solo se listan en la página del proyecto (no se sirven): pip los evalúa y
+    los descarta. Retorna (archivo, Requires-Python).
+    """
+    module = name.replace("-", "_")
+    platforms = ["win32", "win_amd64", "macosx_10_9_x86_64", "macosx_11_0_arm64",
+                 "manylinux_2_17_aarch64.manylinux2014_aarch64", "musllinux_1_1_s390x"]
+    files = []
+    for version in versions:
+        for minor in range(6, 10):  # CPython 3.6-3.9: Requires-Python las excluye
+            tag = f"cp3{minor}"
+            for platform in platforms:
+                files.append((f"{module}-{version}-{tag}-{tag}-{platform}.whl", ">=3.6,<3.10"))
+        files.append((f"{module}-{version}-py2-none-any.whl", "<3"))
+    return files
+
+
+class StandInMirror:
+    """Servidor de índice simple (HTML PEP 503 y JSON PEP 691) sobre un directorio de wheels
+
+    ``extra_files`` añade a la página de cada proyecto archivos (archivo,
+    Requires-Python) que solo se listan, como los de ``platform_variants``.
+    """
+
+    def __init__(self, packages: Dict[str, SyntheticPackage], files_dir: Path,
+                 conditions: NetworkConditions = NetworkConditions(), seed: int = 0,
+                 extra_files: Optional[Dict[str, List[Tuple[str, str]]]] = None):
+        self.packages = packages
+        self.files_dir = files_dir
+        self.extra_files = extra_files or {}
+        self.conditions = conditions
+        self.random = random.Random(seed)
+        self.stats = {"pages": 0, "files": 0, "bytes": 0, "failures": 0}
+        self._metadata = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/simple/"
+
+    def start(self) -> "StandInMirror":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StandInMirror":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = {key: 0 for key in self.stats}
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += amount
+
+    def _delay(self) -> None:
+        with self._lock:
+            jitter = self.random.uniform(-self.conditions.jitter, self.conditions.jitter)
+        delay = self.conditions.latency + jitter
+        if delay > 0:
+            time.sleep(delay)
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            return self.random.random() < self.conditions.failure_rate
+
+    def root_page(self, as_json: bool) -> bytes:
+        names = sorted(self.packages)
+        if as_json:
+            return json.dumps({"meta": {"api-version": "1.0"}, "projects": [{"name": n} for n in names]}).encode()
+        links = "".join(f'<a href="/simple/{n}/">{n}</a>\n' for n in names)
+        return f"<!DOCTYPE html><html><body>\n{links}</body></html>\n".encode()
+
+    def metadata(self, filename: str) -> Optional[bytes]:
+        """METADATA de un wheel, servido aparte como en PyPI (PEP 658)"""
+        with self._lock:
+            if filename not in self._metadata:
+                path = self.files_dir / filename
+                if not path.is_file():
+                    return None
+                with zipfile.ZipFile(path) as wheel:
+                    member = next(n for n in wheel.namelist() if n.endswith(".dist-info/METADATA"))
+                    self._metadata[filename] = wheel.read(member)
+            return self._metadata[filename]
+
+    def project_page(self, name: str, as_json: bool) -> Optional[bytes]:
+        package = self.packages.get(name)
+        if package is None:
+            return None
+        href = f"/files/{package.filename}"
+        metadata_hash = hashlib.sha256(self.metadata(package.filename)).hexdigest()
+        extra = self.extra_files.get(name, [])
+        if as_json:
+            files = [{
+                "filename": filename, "url": f"/files/{filename}", "requires-python": requires_python,
+                "hashes": {"sha256": hashlib.sha256(filename.encode()).hexdigest()},
+            } for filename, requires_python in extra]
+            files.append({
+                "filename": package.filename, "url": href, "hashes": {"sha256": package.sha256},
+                "core-metadata": {"sha256": metadata_hash}, "dist-info-metadata": {"sha256": metadata_hash},
+            })
+            return json.dumps({"meta": {"api-version": "1.0"}, "name": name, "files": files}).encode()
+        links = "".join(
+            f'<a href="/files/{filename}#sha256={hashlib.sha256(filename.encode()).hexdigest()}" '
+            f'data-requires-python="{requires_python.replace("<", "&lt;").replace(">", "&gt;")}">{filename}</a><br/>\n'
+            for filename, requires_python in extra
+        )
+        return (
+            "<!DOCTYPE html><html><body>\n"
+            f"{links}"
+            f'<a href="{href}#sha256={package.sha256}" data-core-metadata="sha256={metadata_hash}" '
+            f'data-dist-info-metadata="sha256={metadata_hash}">{package.filename}</a>\n'
+            "</body></html>\n"
+        ).encode()
+
+    def _make_handler(self):
+        mirror = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                mirror._delay()
+                if mirror._should_fail():
+                    mirror._count("failures")
+                    self._send(503, b"Service Unavailable", "text/plain")
+                    return
+
+                as_json = "application/vnd.pypi.simple.v1+json" in self.headers.get("Accept", "")
+                content_type = "application/vnd.pypi.simple.v1+json" if as_json else "text/html"
+                parts = [p for p in self.path.split("?")[0].split("/") if p]
+
+                if parts == ["simple"]:
+                    mirror._count("pages")
+                    self._send(200, mirror.root_page(as_json), content_type, cache=True)
+                elif len(parts) == 2 and parts[0] == "simple":
+                    body = mirror.project_page(parts[1], as_json)
+                    if body is None:
+                        self._send(404, b"Not Found", "text/plain")
+                        return
+                    mirror._count("pages")
+                    self._send(200, body, content_type, cache=True)
+                elif len(parts) == 2 and parts[0] == "files" and parts[1].endswith(".metadata"):
+                    body = mirror.metadata(parts[1][:-len(".metadata")])
+                    if body is None:
+                        self._send(404, b"Not Found", "text/plain")
+                        return
+                    mirror._count("pages")
+                    self._send(200, body, "text/plain", cache=True)
+                elif len(parts) == 2 and parts[0] == "files":
+                    path = mirror.files_dir / parts[1]
+                    if not path.is_file():
+                        self._send(404, b"Not Found", "text/plain")
+                        return
+                    mirror._count("files")
+                    self._send(200, path.read_bytes(), "application/octet-stream", cache=True)
+                else:
+                    self._send(404, b"Not Found", "text/plain")
+
+            def _send(self, status: int, body: bytes, content_type: str, cache: bool = False):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                # Como PyPI: las páginas van comprimidas si el cliente lo acepta
+                if content_type != "application/octet-stream" and \
+                        "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, mtime=0)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                if cache:
+                    # Como PyPI: páginas cacheables unos minutos, archivos inmutables
+                    max_age = 31536000 if content_type == "application/octet-stream" else 600
+                    self.send_header("Cache-Control", f"max-age={max_age}, public")
+                self.end_headers()
+                self._write_throttled(body)
+                mirror._count("bytes", len(body))
+
+            def _write_throttled(self, body: bytes):
+                bandwidth = mirror.conditions.bandwidth
+                for start in range(0, len(body), CHUNK_SIZE):
+                    chunk = body[start:start + CHUNK_SIZE]
+                    self.wfile.write(chunk)
+                    if bandwidth:
+                        time.sleep(len(chunk) / bandwidth)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
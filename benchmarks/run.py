@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# benchmarks/run.py
+# Suite de rendimiento reproducible de aetos contra un mirror local simulado
+
+import argparse
+import compileall
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from benchmarks.mirror import NetworkConditions, StandInMirror, generate_packages, platform_variants
+
+# Lo mismo que ejecuta el script de consola ``aetos`` instalado (aetos:main): importa el
+# módulo con su bytecode en caché, en lugar de recompilar aetos.py como script
+AETOS = [sys.executable, "-c", "import sys; from aetos import main; sys.exit(main())"]
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines.json"
+
+# Escenarios de red: latencia/jitter en segundos, ancho de banda en bytes/s
+SCENARIOS = {
+    "local": NetworkConditions(),
+    "wan": NetworkConditions(latency=0.05, jitter=0.02, bandwidth=2_000_000),
+    "flaky": NetworkConditions(latency=0.02, jitter=0.01, bandwidth=5_000_000, failure_rate=0.05),
+}
+
+# Solo se comparan métricas relativas a una referencia medida en la misma máquina y en la misma
+# ejecución (``_x``: veces la referencia) o tasas; los tiempos absolutos se muestran, no se comparan.
+# Holgura absoluta por unidad, para que el ruido en métricas pequeñas no cuente como regresión
+ABSOLUTE_SLACK = {"_x": 0.1, "_rate": 0.05}
+
+# Acepta JSON como aetos search al pedir la lista de proyectos
+JSON_ACCEPT = "application/vnd.pypi.simple.v1+json"
+
+ROOT_PACKAGE = "synth-000"
+
+# Presupuesto de arranque de aetos en veces el intérprete vacío (python -c pass)
+STARTUP_BUDGET_X = 1.5
+
+
+class Sandbox:
+    """HOME temporal con la configuración de aetos apuntando al mirror local"""
+
+    def __init__(self, index_url: str):
+        self.root = Path(tempfile.mkdtemp(prefix="aetos-bench-"))
+        self.home = self.root / "home"
+        (self.home / ".aetos").mkdir(parents=True)
+        with open(self.home / ".aetos" / "config.json", 'w') as f:
+            json.dump({"index_url": index_url}, f)
+        self.env = dict(
+            os.environ,
+            HOME=str(self.home),
+            USERPROFILE=str(self.home),
+            PIP_CONFIG_FILE=os.devnull,
+            PIP_CACHE_DIR=str(self.root / "pip-cache"),
+            PIP_DISABLE_PIP_VERSION_CHECK="1",
+            PIP_NO_INPUT="1",
+            PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_DIR), os.environ.get("PYTHONPATH")])),
+        )
+
+    def run(self, command: list, check: bool = True) -> float:
+        """Ejecuta un comando en el sandbox y retorna el tiempo transcurrido en segundos"""
+        start = time.perf_counter()
+        proc = subprocess.run(command, env=self.env, cwd=str(self.root), capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if check and proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(command)} falló:\n{proc.stdout}\n{proc.stderr}")
+        return elapsed
+
+    def aetos(self, *args: str, check: bool = True) -> float:
+        return self.run(AETOS + list(args), check=check)
+
+    def pip(self, *args: str) -> float:
+        """Referencia: pip directo, con la misma caché y el mismo mirror"""
+        return self.run([sys.executable, "-m", "pip"] + list(args))
+
+    def fetch(self, url: str) -> float:
+        """Referencia: un intérprete que solo descarga ``url``"""
+        code = (
+            "import sys, urllib.request; "
+            "urllib.request.urlopen(urllib.request.Request(sys.argv[1], "
+            f"headers={{'Accept': {JSON_ACCEPT!r}}})).read()"
+        )
+        return self.run([sys.executable, "-c", code, url])
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def measure_startup(repeat: int) -> dict:
+    """Tiempo de arranque de la CLI en comandos que no usan la red, en veces ``python -c pass``"""
+    sandbox = Sandbox("http://127.0.0.1:9/simple/")
+    try:
+        # Primera ejecución: genera la instantánea de configuración
+        sandbox.aetos("config", "show")
+        # Intercaladas, para que la carga de la máquina afecte por igual a la referencia
+        python_times, help_times, show_times = [], [], []
+        for _ in range(repeat):
+            python_times.append(sandbox.run([sys.executable, "-c", "pass"]))
+            help_times.append(sandbox.aetos(check=False))
+            show_times.append(sandbox.aetos("config", "show"))
+    finally:
+        sandbox.cleanup()
+
+    python_s = statistics.median(python_times)
+    help_s = statistics.median(help_times)
+    show_s = statistics.median(show_times)
+    return {
+        "python_ms": round(python_s * 1000, 1),
+        "help_ms": round(help_s * 1000, 1),
+        "config_show_ms": round(show_s * 1000, 1),
+        "help_x": round(help_s / python_s, 2),
+        "config_show_x": round(show_s / python_s, 2),
+    }
+
+
+def run_scenario(conditions: NetworkConditions, packages: dict, files_dir: Path,
+                 repeat: int, extra_files: dict = None) -> dict:
+    """Instalación en frío y en caliente, y búsqueda, contra el mirror simulado
+
+    Cada tiempo se expresa también en veces su referencia: pip directo con la misma caché
+    para las instalaciones, y un intérprete que solo descarga la lista de proyectos para
+    las búsquedas.
+    """
+    cold, warm, hit_rates, search_cold, search_warm = [], [], [], [], []
+    pipeline_cold, filtered_cold = [], []
+    pip_cold, pip_warm, fetch_times = [], [], []
+
+    with StandInMirror(packages, files_dir, conditions, extra_files=extra_files) as mirror:
+        for _ in range(repeat):
+            # Referencia: pip directo, en frío y en caliente
+            sandbox = Sandbox(mirror.url)
+            try:
+                pip_args = ("install", "-q", "--index-url", mirror.url, ROOT_PACKAGE)
+                pip_cold.append(sandbox.pip(*pip_args, "--target", "site-cold"))
+                pip_warm.append(sandbox.pip(*pip_args, "--target", "site-warm"))
+                fetch_times.append(sandbox.fetch(mirror.url))
+            finally:
+                sandbox.cleanup()
+
+            sandbox = Sandbox(mirror.url)
+            try:
+                mirror.reset_stats()
+                cold.append(sandbox.aetos("install", "-q", "--target", "site-cold", ROOT_PACKAGE))
+                files_cold = mirror.stats["files"]
+
+                mirror.reset_stats()
+                warm.append(sandbox.aetos("install", "-q", "--target", "site-warm", ROOT_PACKAGE))
+                files_warm = mirror.stats["files"]
+                hit_rates.append(1 - files_warm / files_cold if files_cold else 0.0)
+
+                search_cold.append(sandbox.aetos("search", "synth-01"))
+                search_warm.append(sandbox.aetos("search", "synth-01"))
+            finally:
+                sandbox.cleanup()
+
+            # Motor en tubería, en frío: HOME y caché de pip nuevos
+            sandbox = Sandbox(mirror.url)
+            try:
+                pipeline_cold.append(
+                    sandbox.aetos("install", "--pipeline", "-q", "--target", "site-pipeline", ROOT_PACKAGE)
+                )
+            finally:
+                sandbox.cleanup()
+
+            # Páginas podadas por el proxy local, en frío
+            sandbox = Sandbox(mirror.url)
+            try:
+                filtered_cold.append(
+                    sandbox.aetos("install", "--filter-index", "-q", "--target", "site-filtered", ROOT_PACKAGE)
+                )
+            finally:
+                sandbox.cleanup()
+
+    times = {
+        "pip_cold_s": pip_cold,
+        "pip_warm_s": pip_warm,
+        "fetch_s": fetch_times,
+        "install_cold_s": cold,
+        "install_warm_s": warm,
+        "install_pipeline_cold_s": pipeline_cold,
+        "install_filtered_cold_s": filtered_cold,
+        "search_cold_s": search_cold,
+        "search_warm_s": search_warm,
+    }
+    medians = {metric: statistics.median(values) for metric, values in times.items()}
+    references = {
+        "install_cold_s": "pip_cold_s",
+        "install_warm_s": "pip_warm_s",
+        "install_pipeline_cold_s": "pip_cold_s",
+        "install_filtered_cold_s": "pip_cold_s",
+        "search_cold_s": "fetch_s",
+        "search_warm_s": "fetch_s",
+    }
+    results = {metric: round(value, 3) for metric, value in medians.items()}
+    for metric, reference in references.items():
+        results[metric[:-len("_s")] + "_x"] = round(medians[metric] / medians[reference], 2)
+    results["cache_hit_rate"] = round(statistics.median(hit_rates), 3)
+    return results
+
+
+def _unit(metric: str) -> Optional[str]:
+    return next((suffix for suffix in ABSOLUTE_SLACK if metric.endswith(suffix)), None)
+
+
+def relative_metrics(results: dict) -> dict:
+    """Solo las métricas que se guardan y comparan: las absolutas dependen de la máquina"""
+    return {
+        group: {metric: value for metric, value in metrics.items() if _unit(metric)}
+        for group, metrics in results.items()
+    }
+
+
+def compare(results: dict, baselines: dict, tolerance: float) -> list:
+    """Lista de regresiones respecto a las líneas base (veces la referencia: menos es mejor; tasas: más)"""
+    regressions = []
+    for group, metrics in relative_metrics(results).items():
+        for metric, value in metrics.items():
+            base = baselines.get(group, {}).get(metric)
+            if base is None:
+                continue
+            unit = _unit(metric)
+            slack = ABSOLUTE_SLACK[unit]
+            if unit == "_rate":
+                worse = value < base * (1 - tolerance) - slack
+            else:
+                worse = value > base * (1 + tolerance) + slack
+            if worse:
+                regressions.append(f"{group}.{metric}: {value} (línea base {base})")
+    return regressions
+
+
+def print_results(results: dict, baselines: dict) -> None:
+    for group, metrics in results.items():
+        print(f"\n📊 {group}")
+        for metric, value in metrics.items():
+            base = baselines.get(group, {}).get(metric)
+            delta = f"{(value - base) / base * 100:+.0f}%" if base else "—"
+            print(f"  {metric:<24} {value:>10}   base {base if base is not None else '—':>10}   {delta}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de aetos con un mirror local simulado")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="escenario a ejecutar (se puede repetir; por defecto todos)")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones por medición")
+    parser.add_argument("--packages", type=int, default=20, help="paquetes sintéticos")
+    parser.add_argument("--size", type=int, default=64, help="tamaño de cada wheel en KB")
+    parser.add_argument("--variants", type=int, default=0,
+                        help="versiones con wheels de otras plataformas listadas por proyecto")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="regresión relativa tolerada")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="archivo de líneas base")
+    parser.add_argument("--save-baseline", action="store_true", help="guardar los resultados como línea base")
+    parser.add_argument("--skip-startup", action="store_true", help="no medir el arranque de la CLI")
+    parser.add_argument("--startup-only", action="store_true", help="medir solo el arranque de la CLI")
+    options = parser.parse_args()
+
+    # Como pip al instalar: bytecode ya compilado, aunque PYTHONDONTWRITEBYTECODE esté activo
+    compileall.compile_dir(str(REPO_DIR), maxlevels=0, quiet=1)
+
+    baselines = {}
+    if options.baseline.exists():
+        with open(options.baseline, 'r') as f:
+            baselines = json.load(f)
+
+    results = {}
+    if not options.skip_startup:
+        print("⏱️  Midiendo arranque de la CLI...")
+        results["startup"] = measure_startup(max(options.repeat, 11))
+
+    scenarios = [] if options.startup_only else options.scenario or list(SCENARIOS)
+    files_dir = Path(tempfile.mkdtemp(prefix="aetos-bench-files-"))
+    try:
+        packages = generate_packages(files_dir, options.packages, options.size * 1024) if scenarios else {}
+        versions = [f"0.{i}.0" for i in range(options.variants)]
+        extra_files = {name: platform_variants(name, versions) for name in packages} if versions else None
+        for name in scenarios:
+            print(f"🌐 Escenario {name}...")
+            results[name] = run_scenario(SCENARIOS[name], packages, files_dir, options.repeat, extra_files)
+    finally:
+        shutil.rmtree(files_dir, ignore_errors=True)
+
+    print_results(results, baselines)
+
+    if options.save_baseline:
+        baselines.update(relative_metrics(results))
+        with open(options.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\n📝 Líneas base guardadas en: {options.baseline}")
+        return 0
+
+    regressions = compare(results, baselines, options.tolerance)
+    startup = results.get("startup", {}).get("config_show_x", 0.0)
+    if startup > STARTUP_BUDGET_X:
+        regressions.append(f"startup.config_show_x: {startup} (presupuesto {STARTUP_BUDGET_X})")
+    if regressions:
+        print("\n❌ Regresiones de rendimiento:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\n✅ Sin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,10 +3,34 @@ from setuptools import setup
 setup(
     name="aetos",
     version="1.0.0",
-    py_modules=["aetos"],  # Si tu script se llama mi_cli.py
+    py_modules=[  # Si tu script se llama mi_cli.py
+        "aetos",
+        "aetos_catalog",
+        "aetos_env",
+        "aetos_filter",
+        "aetos_graph",
+        "aetos_hashes",
+        "aetos_http",
+        "aetos_lock",
+        "aetos_matrix",
+        "aetos_mirrors",
+        "aetos_pages",
+        "aetos_peers",
+        "aetos_pipeline",
+        "aetos_prefetch",
+        "aetos_profile",
+        "aetos_speculate",
+        "aetos_sync",
+        "aetos_uninstall",
+        "aetos_wheel",
+    ],
     install_requires=[
-        # tus dependencias aquí, ej: "requests"
+        # .aetos.toml se lee con tomllib, que llega en Python 3.11
+        'tomli; python_version < "3.11"',
     ],
+    extras_require={
+        "compression": ["brotli", "zstandard"],
+    },
     entry_points={
         "console_scripts": [
             "aetos=aetos:main",  # nombre_comando = modulo:funcion
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aetos import aetos_http
+from aetos.aetos_catalog import (
+    Catalog, _write_atomic, get_catalog_dir, open_catalog, parse_root_listing, refresh_catalog,
+)
+
+PROJECTS = ["requests", "requests-oauthlib", "Flask", "flask_login", "numpy", "django", "types-requests"]
+
+
+class IndexHandler(BaseHTTPRequestHandler):
+    """Listado raíz de un índice simple con soporte de ETag"""
+
+    etag = '"v1"'
+    requests_seen = []
+
+    def do_GET(self):
+        IndexHandler.requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if "json" in self.headers.get("Accept", ""):
+            body = json.dumps({"meta": {"api-version": "1.0"}, "projects": [{"name": n} for n in PROJECTS]}).encode()
+            content_type = "application/vnd.pypi.simple.v1+json"
+        else:
+            body = "".join(f'<a href="/simple/{n}/">{n}</a>\n' for n in PROJECTS).encode()
+            content_type = "text/html"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def index_server():
+    """Fixture que levanta un índice local"""
+    IndexHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), IndexHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/simple/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def temp_cache_dir():
+    """Fixture para crear un directorio temporal de caché"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestCatalogRefresh:
+    """Test de la actualización incremental del catálogo"""
+
+    def test_initial_download(self, index_server, temp_cache_dir):
+        """Test que la primera actualización descarga y normaliza los nombres"""
+        directory = get_catalog_dir(temp_cache_dir, index_server)
+        assert refresh_catalog(index_server, directory) == "updated"
+        names = (directory / "names.txt").read_text().split()
+        assert names == sorted(["requests", "requests-oauthlib", "flask", "flask-login", "numpy", "django", "types-requests"])
+
+    def test_fresh_catalog_skips_request(self, index_server, temp_cache_dir):
+        """Test que un catálogo reciente no consulta el índice"""
+        directory = get_catalog_dir(temp_cache_dir, index_server)
+        refresh_catalog(index_server, directory)
+        assert refresh_catalog(index_server, directory) == "fresh"
+        assert len(IndexHandler.requests_seen) == 1
+
+    def test_conditional_request(self, index_server, temp_cache_dir):
+        """Test que la revalidación usa If-None-Match y acepta 304"""
+        directory = get_catalog_dir(temp_cache_dir, index_server)
+        refresh_catalog(index_server, directory)
+        assert refresh_catalog(index_server, directory, force=True) == "not-modified"
+        assert IndexHandler.requests_seen[-1].get("If-None-Match") == '"v1"'
+        assert (directory / "names.txt").exists()
+
+    def test_unreachable_index_uses_existing_catalog(self, index_server, temp_cache_dir):
+        """Test que sin conexión se usa el catálogo guardado"""
+        refresh_catalog(index_server, get_catalog_dir(temp_cache_dir, index_server))
+        with patch('aetos.aetos_http.fetch', side_effect=OSError("sin red")):
+            catalog = open_catalog(index_server, temp_cache_dir, refresh=True)
+        assert "numpy" in catalog.names
+
+
+    def test_concurrent_refresh_writes_whole_files(self, index_server, temp_cache_dir):
+        """Test que varios refrescos a la vez no comparten temporal ni dejan restos"""
+        directory = get_catalog_dir(temp_cache_dir, index_server)
+        threads = [threading.Thread(target=refresh_catalog, args=(index_server, directory),
+                                    kwargs={"force": True}) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert (directory / "names.txt").read_text().split() == Catalog(directory).names
+        assert len(Catalog(directory).names) == len(PROJECTS)
+        assert not list(directory.glob("*.tmp"))
+
+    def test_failed_write_removes_temporary(self, temp_cache_dir):
+        """Test que si la escritura falla no queda el temporal"""
+        with patch('aetos.aetos_catalog.os.replace', side_effect=OSError("disco lleno")):
+            with pytest.raises(OSError):
+                _write_atomic(temp_cache_dir / "names.txt", b"numpy\n")
+        assert list(temp_cache_dir.iterdir()) == []
+
+    def test_malformed_json_listing(self, temp_cache_dir):
+        """Test que un listado JSON sin 'projects' o sin 'name' es un ValueError"""
+        for payload in ({"meta": {}}, {"projects": [{"nombre": "numpy"}]}, ["numpy"]):
+            response = aetos_http.Response(200, {"Content-Type": "application/vnd.pypi.simple.v1+json"},
+                                           json.dumps(payload).encode(), "https://indice.example/simple/")
+            with pytest.raises(ValueError):
+                parse_root_listing(response)
+
+
+class TestCatalogSearch:
+    """Test de búsqueda en el catálogo"""
+
+    @pytest.fixture
+    def catalog(self, index_server, temp_cache_dir):
+        return open_catalog(index_server, temp_cache_dir)
+
+    def test_exact_and_prefix_first(self, catalog):
+        """Test que el nombre exacto y los prefijos van antes que las subcadenas"""
+        assert catalog.search("requests") == ["requests", "requests-oauthlib", "types-requests"]
+
+    def test_normalized_term(self, catalog):
+        """Test que el término se normaliza según PEP 503"""
+        assert catalog.search("Flask_Login")[0] == "flask-login"
+
+    def test_fuzzy_match(self, catalog):
+        """Test que una errata encuentra el proyecto por trigramas"""
+        assert "requests" in catalog.search("reqeusts")
+
+    def test_limit(self, catalog):
+        """Test que respeta el límite de resultados"""
+        assert len(catalog.search("e", limit=2)) == 2
+
+
+class TestSearchCommand:
+    """Test del comando aetos search"""
+
+    @patch('builtins.print')
+    def test_search_without_term(self, mock_print):
+        """Test que search sin término muestra el uso"""
+        from aetos.aetos import main
+        with patch.object(sys, 'argv', ['aetos', 'search']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+
+    @patch('builtins.print')
+    def test_search_prints_results(self, mock_print, index_server, temp_cache_dir):
+        """Test que search muestra los proyectos encontrados"""
+        from aetos.aetos import main
+        with patch('aetos.aetos.get_index_url', return_value=index_server), \
+                patch('aetos.aetos.get_cache_dir', return_value=temp_cache_dir):
+            with patch.object(sys, 'argv', ['aetos', 'search', 'numpy']):
+                main()
+        print_calls = [str(call_args) for call_args in mock_print.call_args_list]
+        assert any('numpy' in msg for msg in print_calls)
+
+    @patch('builtins.print')
+    def test_search_invalid_limit(self, mock_print):
+        """Test que un --limit que no es un entero positivo termina con error"""
+        from aetos.aetos import main
+        with patch('aetos.aetos_catalog.open_catalog') as mock_open:
+            with patch.object(sys, 'argv', ['aetos', 'search', 'numpy', '--limit', 'diez']):
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+        assert exc_info.value.code == 1
+        mock_print.assert_called_once_with("❌ --limit espera un número entero mayor o igual que 1: diez")
+        mock_open.assert_not_called()
+
+    @patch('builtins.print')
+    def test_search_malformed_listing(self, mock_print, temp_cache_dir):
+        """Test que un listado JSON inválido se informa como error de descarga del catálogo"""
+        from aetos.aetos import main
+        response = aetos_http.Response(200, {"Content-Type": "application/vnd.pypi.simple.v1+json"},
+                                       b'{"meta": {}}', "https://indice.example/simple/")
+        with patch('aetos.aetos.get_index_url', return_value="https://indice.example/simple/"), \
+                patch('aetos.aetos.get_cache_dir', return_value=temp_cache_dir), \
+                patch('aetos.aetos_http.fetch', return_value=response):
+            with patch.object(sys, 'argv', ['aetos', 'search', 'numpy']):
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+        assert exc_info.value.code == 1
+        message = mock_print.call_args[0][0]
+        assert message.startswith("❌ No se pudo descargar el catálogo de https://indice.example/simple/:")
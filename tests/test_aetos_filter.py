@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch
+import sys
+import json
+import os
+import subprocess
+import urllib.request
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aetos.aetos
+from aetos.aetos import main
+from aetos.aetos_filter import (
+    FileFilter, FilteringProxy, KeepAllFilter, accepts_json, applies_to, json_to_html, parse_tee_path,
+    prune_html, prune_json, tee_link, upstream_url,
+)
+from aetos.aetos_hashes import HashMemo
+from benchmarks.mirror import StandInMirror, generate_packages, platform_variants
+
+TAGS = ["cp311-cp311-manylinux_2_17_x86_64", "cp311-abi3-manylinux_2_17_x86_64", "py3-none-any"]
+PAGE_URL = "https://indice.example/simple/demo/"
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def mirror(temp_root):
+    """Fixture con el mirror local y cien wheels de otras plataformas por proyecto"""
+    files_dir = temp_root / "files"
+    packages = generate_packages(files_dir, count=2, payload_size=1024)
+    versions = [f"0.{i}.0" for i in range(4)]
+    extra = {name: platform_variants(name, versions) for name in packages}
+    with StandInMirror(packages, files_dir, extra_files=extra) as mirror:
+        yield mirror, packages
+
+
+class TestFileFilter:
+    """Test de la decisión de compatibilidad"""
+
+    def test_tags_and_requires_python(self):
+        """Test que descarta por etiquetas y Requires-Python y conserva sdists"""
+        file_filter = FileFilter(TAGS, "3.11.4")
+        assert file_filter.compatible("demo-1.0-cp311-cp311-manylinux_2_17_x86_64.manylinux2014_x86_64.whl")
+        assert file_filter.compatible("demo-1.0-py2.py3-none-any.whl")
+        assert file_filter.compatible("demo-1.0-1build-cp311-abi3-manylinux_2_17_x86_64.whl")
+        assert not file_filter.compatible("demo-1.0-cp311-cp311-win_amd64.whl")
+        assert not file_filter.compatible("demo-1.0-cp310-cp310-manylinux_2_17_x86_64.whl")
+        assert not file_filter.compatible("demo-1.0-py3-none-any.whl", ">=3.12")
+        assert file_filter.compatible("demo-1.0.tar.gz", ">=3.8")
+        assert file_filter.compatible("demo-1.0.tar.gz", "esto no es un especificador")
+        assert file_filter.key != FileFilter(TAGS, "3.12.0").key
+
+    def test_foreign_targets_are_not_filtered(self):
+        """Test que con otra plataforma o índice no se poda"""
+        assert applies_to(["-r", "req.txt", "--target", "site"])
+        assert not applies_to(["--platform", "win_amd64", "demo"])
+        assert not applies_to(["--python-version=3.8", "demo"])
+
+
+class TestPrune:
+    """Test de la poda de páginas HTML y JSON"""
+
+    def test_prune_html(self):
+        """Test que quita los enlaces incompatibles y vuelve absolutos los que quedan"""
+        body = (
+            "<html><body>\n"
+            '<a href="../../files/demo-1.0-cp311-cp311-win_amd64.whl#sha256=aa">demo-1.0-cp311-cp311-win_amd64.whl</a><br/>\n'
+            '<a href="../../files/demo-1.0-py3-none-any.whl#sha256=bb" '
+            'data-requires-python="&gt;=3.8">demo-1.0-py3-none-any.whl</a><br/>\n'
+            '<a href="/files/demo-2.0.tar.gz" data-requires-python="&gt;=3.12">demo-2.0.tar.gz</a><br/>\n'
+            "</body></html>\n"
+        ).encode()
+        pruned, kept, total = prune_html(body, PAGE_URL, FileFilter(TAGS, "3.11.4"))
+        assert (kept, total) == (1, 3)
+        assert pruned.decode() == (
+            "<html><body>\n"
+            '<a href="https://indice.example/files/demo-1.0-py3-none-any.whl#sha256=bb" '
+            'data-requires-python="&gt;=3.8">demo-1.0-py3-none-any.whl</a><br/>\n'
+            "</body></html>\n"
+        )
+
+    def test_prune_json(self):
+        """Test que poda la lista de archivos de una página PEP 691"""
+        page = {"meta": {"api-version": "1.0"}, "name": "demo", "files": [
+            {"filename": "demo-1.0-cp311-cp311-win_amd64.whl", "url": "/files/a.whl"},
+            {"filename": "demo-1.0-py3-none-any.whl", "url": "/files/b.whl", "requires-python": ">=3.8"},
+        ]}
+        pruned, kept, total = prune_json(json.dumps(page).encode(), PAGE_URL, FileFilter(TAGS, "3.11.4"))
+        assert (kept, total) == (1, 2)
+        assert json.loads(pruned)["files"] == [{
+            "filename": "demo-1.0-py3-none-any.whl", "url": "https://indice.example/files/b.whl",
+            "requires-python": ">=3.8",
+        }]
+
+    def test_tee_links(self):
+        """Test que los enlaces al proxy conservan archivo y hash, y llevan a la URL del índice"""
+        body = b'<a href="../../files/demo-1.0-py3-none-any.whl#sha256=' + b"b" * 64 + b'">demo</a>\n'
+        pruned, _, _ = prune_html(body, PAGE_URL, KeepAllFilter(), rewrite=tee_link)
+        link = pruned.decode().split('"')[1]
+        assert link.startswith("/~files/" + "b" * 64 + "/")
+        assert link.endswith("/demo-1.0-py3-none-any.whl#sha256=" + "b" * 64)
+        url = "https://indice.example/files/demo-1.0-py3-none-any.whl"
+        assert parse_tee_path(link.split("#")[0]) == (url, "b" * 64, "demo-1.0-py3-none-any.whl")
+        assert parse_tee_path(link.split("#")[0] + ".metadata")[0] == url + ".metadata"
+        assert upstream_url("http://127.0.0.1:8080" + link) == url
+        assert upstream_url(url) == url
+
+    def test_tee_paths_only_reach_http_files(self):
+        """Test que el proxy no sirve rutas fuera de la caché ni URLs que no sean HTTP"""
+        for path in (
+            tee_link("file:///etc/passwd"),
+            tee_link("https://indice.example/files/%2E%2E%2Fescape.whl"),
+            "/~files/-/aHR0cHM6Ly9pbmRpY2UuZXhhbXBsZS8/../../x.whl",
+            "/~files/no-es-un-hash/aHR0cHM6Ly9pbmRpY2UuZXhhbXBsZS8/x.whl",
+        ):
+            with pytest.raises(ValueError):
+                parse_tee_path(path)
+
+    def test_json_to_html(self):
+        """Test que una página JSON podada se convierte a HTML para pip anterior a 22.2"""
+        page = {"meta": {"api-version": "1.0"}, "name": "demo", "files": [{
+            "filename": "demo-1.0-py3-none-any.whl", "url": "https://indice.example/files/b.whl",
+            "hashes": {"sha256": "bb"}, "requires-python": ">=3.8", "yanked": "roto",
+        }]}
+        body = json_to_html(json.dumps(page).encode()).decode()
+        assert ('<a href="https://indice.example/files/b.whl#sha256=bb" data-requires-python="&gt;=3.8" '
+                'data-yanked="roto">demo-1.0-py3-none-any.whl</a><br/>') in body
+        assert accepts_json("application/vnd.pypi.simple.v1+json, text/html; q=0.01")
+        assert accepts_json("")
+        assert not accepts_json("text/html")
+        assert not accepts_json("application/vnd.pypi.simple.v1+json; q=0, text/html")
+
+
+class TestFilteringProxy:
+    """Test del proxy local contra el mirror de los benchmarks"""
+
+    def test_pages_are_pruned_and_cached(self, mirror, temp_root):
+        """Test que sirve la página podada y la reutiliza de la caché"""
+        mirror, packages = mirror
+        package = packages["synth-000"]
+        with FilteringProxy(mirror.url, temp_root / "filtered") as proxy:
+            page = json.loads(urllib.request.urlopen(proxy.url + "synth-000/").read())
+            assert [entry["filename"] for entry in page["files"]] == [package.filename]
+            assert page["files"][0]["url"] == mirror.url.replace("/simple/", f"/files/{package.filename}")
+            assert proxy.stats == {"pages": 1, "files": 101, "kept": 1, "revalidated": 0, "saved": 0}
+
+            mirror.reset_stats()
+            urllib.request.urlopen(proxy.url + "synth-000/").read()
+            assert mirror.stats["pages"] == 0
+
+    def test_cached_pages_are_streamed(self, mirror, temp_root):
+        """Test que una página guardada se envía descomprimiendo por bloques, sin leerla entera"""
+        mirror, _ = mirror
+        with FilteringProxy(mirror.url, temp_root / "filtered") as proxy:
+            first = urllib.request.urlopen(proxy.url + "synth-000/").read()
+            with patch.object(proxy.cache, "read", side_effect=AssertionError("lectura completa")), \
+                    patch.object(proxy.cache, "iter_body", wraps=proxy.cache.iter_body) as iter_body:
+                with urllib.request.urlopen(proxy.url + "synth-000/") as resp:
+                    assert int(resp.headers["Content-Length"]) == len(first)
+                    assert resp.read() == first
+            assert iter_body.call_count == 1
+
+    def test_html_clients_get_html(self, mirror, temp_root):
+        """Test que a un cliente que solo acepta HTML no se le sirve JSON"""
+        mirror, packages = mirror
+        package = packages["synth-000"]
+        with FilteringProxy(mirror.url, temp_root / "filtered") as proxy:
+            request = urllib.request.Request(proxy.url + "synth-000/", headers={"Accept": "text/html"})
+            with urllib.request.urlopen(request) as resp:
+                assert resp.headers["Content-Type"].startswith("text/html")
+                body = resp.read().decode()
+        assert body.count("<a ") == 1 and f">{package.filename}</a>" in body
+
+    def test_stale_pages_are_revalidated(self, mirror, temp_root):
+        """Test que una página vencida se revalida y, si falla el índice, se sirve la copia"""
+        mirror, _ = mirror
+        with FilteringProxy(mirror.url, temp_root / "filtered", max_age=0) as proxy:
+            first, _ = proxy.project_page("synth-001")
+            mirror.stop()
+            again, _ = proxy.project_page("synth-001")
+        assert again == first and proxy.stats["pages"] == 1
+
+    def test_pip_resolves_through_proxy(self, mirror, temp_root):
+        """Test que pip descarga desde el índice leyendo las páginas del proxy"""
+        mirror, packages = mirror
+        env = dict(os.environ, PIP_CONFIG_FILE=os.devnull, PIP_NO_CACHE_DIR="1",
+                   PIP_DISABLE_PIP_VERSION_CHECK="1")
+        with FilteringProxy(mirror.url, temp_root / "filtered") as proxy:
+            proc = subprocess.run(
+                [sys.executable, "-m", "pip", "download", "--no-deps", "-q", "-d", str(temp_root / "dl"),
+                 "--index-url", proxy.url, "synth-001"],
+                capture_output=True, text=True, env=env,
+            )
+        assert proc.returncode == 0, proc.stderr
+        assert [p.name for p in (temp_root / "dl").iterdir()] == [packages["synth-001"].filename]
+        assert mirror.stats["files"] == 1
+
+    def test_pip_downloads_are_kept(self, mirror, temp_root):
+        """Test que lo que pip baja a través del proxy queda verificado en la caché de wheels"""
+        mirror, packages = mirror
+        package = packages["synth-001"]
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        env = dict(os.environ, PIP_CONFIG_FILE=os.devnull, PIP_NO_CACHE_DIR="1",
+                   PIP_DISABLE_PIP_VERSION_CHECK="1")
+        command = [sys.executable, "-m", "pip", "download", "--no-deps", "-q", "-d", str(temp_root / "dl"),
+                   "synth-001"]
+        with FilteringProxy(mirror.url, temp_root / "filtered", KeepAllFilter(), wheelhouse=wheelhouse) as proxy:
+            proc = subprocess.run(command + ["--index-url", proxy.url], capture_output=True, text=True, env=env)
+        assert proc.returncode == 0, proc.stderr
+        assert (wheelhouse / package.filename).read_bytes() == (temp_root / "dl" / package.filename).read_bytes()
+        assert HashMemo(wheelhouse).reference(package.filename) == package.sha256
+        assert proxy.stats["saved"] == 1 and mirror.stats["files"] == 1
+
+        # La siguiente vez el archivo sale de la caché, sin pedirlo al índice
+        shutil.rmtree(temp_root / "dl")
+        mirror.reset_stats()
+        with FilteringProxy(mirror.url, temp_root / "filtered", KeepAllFilter(), wheelhouse=wheelhouse) as proxy:
+            proc = subprocess.run(command + ["--index-url", proxy.url], capture_output=True, text=True, env=env)
+        assert proc.returncode == 0, proc.stderr
+        assert mirror.stats["files"] == 0
+
+
+class TestFilterCommand:
+    """Test de aetos install --filter-index"""
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_install_reads_index_through_proxy(self, mock_run, mock_print, mock_exit, temp_root):
+        """Test que pip recibe el proxy como índice y el host del índice como confiable"""
+        mock_run.return_value.returncode = 0
+        with patch('aetos.aetos.config_dir_path', return_value=str(temp_root)), \
+                patch.object(sys, 'argv', ['aetos', 'install', '--filter-index', 'requests']):
+            main()
+        call_args = mock_run.call_args[0][0]
+        index_url = call_args[call_args.index("--index-url") + 1]
+        assert index_url.startswith("http://127.0.0.1:")
+        assert "--filter-index" not in call_args and call_args[-1] == "requests"
+        assert aetos.aetos.get_trusted_host(aetos.aetos.get_index_url()) in call_args
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aetos.aetos
+from aetos.aetos import main
+from aetos.aetos_graph import load_graph, render_tree, requiring_roots, top_level
+
+
+def add_dist(site_packages: Path, name: str, version: str, requires=(), requested=False) -> None:
+    """Crea una distribución mínima (solo dist-info) en ``site_packages``"""
+    dist_info = site_packages / f"{name.replace('-', '_')}-{version}.dist-info"
+    dist_info.mkdir(parents=True)
+    lines = ["Metadata-Version: 2.1", f"Name: {name}", f"Version: {version}"]
+    lines += [f"Requires-Dist: {req}" for req in requires]
+    (dist_info / "METADATA").write_text("\n".join(lines) + "\n")
+    if requested:
+        (dist_info / "REQUESTED").write_text("")
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def site_packages(temp_root):
+    """Fixture con un entorno pequeño: app → web → (http, json-lib); cli → http; ciclos a ↔ b"""
+    path = temp_root / "site-packages"
+    add_dist(path, "app", "1.0", ["web>=2", "extra-only; extra == 'test'"], requested=True)
+    add_dist(path, "web", "2.1", ["http<3", "Json_Lib"])
+    add_dist(path, "http", "2.5")
+    add_dist(path, "json-lib", "0.9")
+    add_dist(path, "cli", "0.1", ["http", "falta>=1"])
+    add_dist(path, "ciclo-a", "1.0", ["ciclo-b"])
+    add_dist(path, "ciclo-b", "1.0", ["ciclo-a"])
+    return path
+
+
+class TestDependencyGraph:
+    """Test del grafo de dependencias del entorno y su caché"""
+
+    def test_forward_and_reverse_indexes(self, site_packages, temp_root):
+        """Test que arma los índices directo e inverso sin extras"""
+        graph, cached = load_graph(temp_root / "cache", [site_packages])
+        assert not cached
+        assert graph["forward"]["app"] == [["web", ">=2"]]
+        assert graph["forward"]["web"] == [["http", "<3"], ["json-lib", ""]]
+        assert graph["reverse"]["http"] == ["cli", "web"]
+        assert graph["reverse"]["falta"] == ["cli"]
+        assert top_level(graph) == ["app", "cli"]
+
+    def test_cache_follows_site_packages_state(self, site_packages, temp_root):
+        """Test que se reutiliza hasta que cambia el site-packages"""
+        load_graph(temp_root / "cache", [site_packages])
+        graph, cached = load_graph(temp_root / "cache", [site_packages])
+        assert cached and "falta" not in graph["nodes"]
+
+        add_dist(site_packages, "falta", "1.2")
+        graph, cached = load_graph(temp_root / "cache", [site_packages])
+        assert not cached and graph["nodes"]["falta"][1] == "1.2"
+
+        _, cached = load_graph(temp_root / "cache", [site_packages], refresh=True)
+        assert not cached
+
+    def test_render_tree(self, site_packages, temp_root):
+        """Test que despliega cada subárbol una vez y marca ciclos y faltantes"""
+        graph, _ = load_graph(temp_root / "cache", [site_packages])
+        assert render_tree(graph, ["app", "cli"]) == [
+            "app==1.0",
+            "  - web [requerido: >=2, instalado: 2.1]",
+            "    - http [requerido: <3, instalado: 2.5]",
+            "    - json-lib [requerido: cualquiera, instalado: 0.9]",
+            "cli==0.1",
+            "  - falta [requerido: >=1, instalado: no instalado]",
+            "  - http [requerido: cualquiera, instalado: 2.5]",
+        ]
+        assert render_tree(graph, ["ciclo-a"])[-1] == "    - ciclo-a [requerido: cualquiera, instalado: 1.0] (ciclo)"
+        assert render_tree(graph, ["app"], max_depth=1) == render_tree(graph, ["app"])[:2]
+
+    def test_why(self, site_packages, temp_root):
+        """Test que sube por el índice inverso hasta las raíces"""
+        graph, _ = load_graph(temp_root / "cache", [site_packages])
+        assert render_tree(graph, ["http"], reverse=True) == [
+            "http==2.5",
+            "  - cli==0.1 [requiere: cualquiera]",
+            "  - web==2.1 [requiere: <3]",
+            "    - app==1.0 [requiere: >=2]",
+        ]
+        assert requiring_roots(graph, "http") == ["app", "cli"]
+        assert requiring_roots(graph, "app") == []
+
+
+class TestGraphCommands:
+    """Test de los comandos aetos tree y aetos why"""
+
+    @pytest.fixture
+    def environment(self, site_packages, temp_root):
+        original = (aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR)
+        aetos.aetos.CONFIG_DIR = temp_root
+        aetos.aetos.CONFIG_FILE = temp_root / "config.json"
+        with patch('aetos.aetos_graph.environment_paths', return_value=[str(site_packages)]):
+            yield site_packages
+        aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR = original
+
+    @patch('builtins.print')
+    def test_tree_command(self, mock_print, environment):
+        """Test que aetos tree muestra el árbol del paquete pedido"""
+        with patch.object(sys, 'argv', ['aetos', 'tree', 'Web']):
+            main()
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        assert printed[-3:] == [
+            "web==2.1",
+            "  - http [requerido: <3, instalado: 2.5]",
+            "  - json-lib [requerido: cualquiera, instalado: 0.9]",
+        ]
+
+    @patch('builtins.print')
+    def test_why_command(self, mock_print, environment):
+        """Test que aetos why explica quién requiere el paquete"""
+        with patch.object(sys, 'argv', ['aetos', 'why', 'json_lib']):
+            main()
+        printed = [call.args[0] for call in mock_print.call_args_list]
+        assert "🔗 json-lib 0.9 es requerido por 1 distribuciones:" in printed
+        assert "🌳 Lo traen: app" in printed
+
+    @patch('builtins.print')
+    def test_why_unknown_package(self, mock_print, environment):
+        """Test que falla si el paquete no está instalado"""
+        with patch.object(sys, 'argv', ['aetos', 'why', 'nada']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+        mock_print.assert_called_with("❌ nada no está instalado")
+
+    @patch('builtins.print')
+    def test_tree_depth(self, mock_print, environment):
+        """Test que --depth 0 muestra solo la raíz y un --depth inválido termina con error"""
+        with patch.object(sys, 'argv', ['aetos', 'tree', 'web', '--depth', '0']):
+            main()
+        assert mock_print.call_args_list[-1].args == ("web==2.1",)
+
+        with patch.object(sys, 'argv', ['aetos', 'tree', '--depth', 'todo']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+        mock_print.assert_called_with("❌ --depth espera un número entero mayor o igual que 0: todo")
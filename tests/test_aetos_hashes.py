@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch
+import sys
+import hashlib
+import os
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aetos.aetos
+from aetos.aetos import main
+from aetos.aetos_hashes import HashMemo, mmap_sha256, verify_cache, verify_cached
+
+
+def corrupt_in_place(path: Path) -> None:
+    """Cambia un byte sin alterar tamaño ni mtime (como un fallo silencioso del disco)"""
+    stat = path.stat()
+    data = bytearray(path.read_bytes())
+    data[len(data) // 2] ^= 0xFF
+    with open(path, 'r+b') as f:
+        f.write(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+@pytest.fixture
+def wheelhouse():
+    """Fixture con una caché de tres artefactos (uno vacío) y un temporal que se ignora"""
+    temp_dir = Path(tempfile.mkdtemp())
+    for i in range(2):
+        (temp_dir / f"pkg{i}-1.0-py3-none-any.whl").write_bytes(os.urandom(256 * 1024))
+    (temp_dir / "vacio-1.0.tar.gz").write_bytes(b"")
+    (temp_dir / ".pkg0-1.0-py3-none-any.whl.1.2.part").write_bytes(b"a medias")
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestVerifyCache:
+    """Test de la verificación de integridad de la caché"""
+
+    def test_mmap_hash(self, wheelhouse):
+        """Test que el hash por mmap coincide con hashlib, también para archivos vacíos"""
+        for path in wheelhouse.iterdir():
+            assert mmap_sha256(path) == hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def test_fast_trusts_memo_and_full_catches_corruption(self, wheelhouse):
+        """Test que --fast no vuelve a hashear y la verificación completa detecta corrupción silenciosa"""
+        first = verify_cache(wheelhouse, jobs=2)
+        assert first.checked == 3 and len(first.new) == 3 and not first.corrupt
+        assert (wheelhouse / "hashes.json").exists()
+
+        target = wheelhouse / "pkg1-1.0-py3-none-any.whl"
+        corrupt_in_place(target)
+        fast = verify_cache(wheelhouse, fast=True)
+        assert fast.trusted == 3 and fast.hashed == 0 and not fast.corrupt
+
+        full = verify_cache(wheelhouse)
+        assert list(full.corrupt) == [target.name]
+        assert full.hashed == 3 and not full.new
+
+    def test_cache_hit_skips_hashing(self, wheelhouse):
+        """Test que un acierto de caché sin cambios no vuelve a leer el archivo"""
+        path = wheelhouse / "pkg0-1.0-py3-none-any.whl"
+        digest = mmap_sha256(path)
+        memo = HashMemo(wheelhouse)
+        assert verify_cached(memo, path, digest)
+        with patch("aetos.aetos_hashes.mmap_sha256", side_effect=AssertionError("hasheado")):
+            assert verify_cached(memo, path, digest)
+        assert not verify_cached(memo, path, "0" * 64)
+
+        # Si el archivo se reemplaza, se vuelve a comprobar
+        path.write_bytes(b"otro contenido")
+        assert not verify_cached(memo, path, digest)
+
+
+    def test_vanished_file_is_skipped(self, wheelhouse):
+        """Test que un artefacto borrado entre el listado y su hash se omite sin error"""
+        gone = wheelhouse / "pkg1-1.0-py3-none-any.whl"
+        real_hash = mmap_sha256
+
+        def hash_or_vanish(path):
+            if path == gone:
+                gone.unlink()
+            return real_hash(path)
+
+        with patch("aetos.aetos_hashes.mmap_sha256", side_effect=hash_or_vanish):
+            result = verify_cache(wheelhouse, jobs=2)
+        assert result.checked == 2 and gone.name not in result.new and not result.corrupt
+        assert gone.name not in HashMemo(wheelhouse).entries
+
+    def test_concurrent_saves_keep_both_entries(self, wheelhouse):
+        """Test que dos memorias guardadas a la vez no se pisan las entradas"""
+        first, second = HashMemo(wheelhouse), HashMemo(wheelhouse)
+        paths = sorted(wheelhouse.glob("pkg*.whl"))
+        first.record(paths[0], mmap_sha256(paths[0]))
+        second.record(paths[1], mmap_sha256(paths[1]))
+        first.save()
+        second.save()
+        saved = HashMemo(wheelhouse)
+        assert saved.reference(paths[0].name) and saved.reference(paths[1].name)
+        assert not list(wheelhouse.glob("hashes.json.*.tmp"))
+
+
+class TestCacheVerifyCommand:
+    """Test del comando aetos cache verify"""
+
+    @pytest.fixture
+    def temp_config(self, wheelhouse):
+        original = (aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR)
+        config_dir = wheelhouse / "config"
+        aetos.aetos.CONFIG_DIR = config_dir
+        aetos.aetos.CONFIG_FILE = config_dir / "config.json"
+        shutil.copytree(wheelhouse, config_dir / "cache" / "wheels", ignore=shutil.ignore_patterns("config"))
+        yield config_dir / "cache" / "wheels"
+        aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR = original
+
+    @patch('builtins.print')
+    def test_verify_deletes_corrupt(self, mock_print, temp_config):
+        """Test que informa de los corruptos, los borra con --delete y termina con código 1"""
+        verify_cache(temp_config)
+        corrupt_in_place(temp_config / "pkg0-1.0-py3-none-any.whl")
+        with patch.object(sys, 'argv', ['aetos', 'cache', 'verify', '--delete']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+        assert not (temp_config / "pkg0-1.0-py3-none-any.whl").exists()
+        print_calls = [str(c) for c in mock_print.call_args_list]
+        assert any('1 corruptos' in msg for msg in print_calls)
+
+    @patch('builtins.print')
+    @patch('aetos.aetos_hashes.verify_cache')
+    def test_verify_invalid_jobs(self, mock_verify, mock_print, temp_config):
+        """Test que un --jobs inválido termina con error sin recorrer la caché"""
+        with patch.object(sys, 'argv', ['aetos', 'cache', 'verify', '--jobs', '0']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+        mock_print.assert_called_once_with("❌ --jobs espera un número entero mayor o igual que 1: 0")
+        mock_verify.assert_not_called()
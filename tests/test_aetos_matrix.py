@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+import pytest
+import subprocess
+from unittest.mock import patch, MagicMock
+import sys
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aetos.aetos import main, DEFAULT_INDEX_URL
+from aetos.aetos_matrix import (
+    resolve_interpreter,
+    filter_download_args,
+    run_matrix,
+    InterpreterNotFound,
+)
+
+
+@pytest.fixture
+def temp_wheelhouse():
+    """Fixture para crear una caché de wheels temporal"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def completed(returncode=0):
+    return MagicMock(returncode=returncode, stdout="", stderr="error" if returncode else "")
+
+
+class TestInterpreterResolution:
+    """Test de resolución de intérpretes"""
+
+    def test_resolve_current_version(self):
+        """Test que la versión actual resuelve a sys.executable"""
+        version = "%d.%d" % sys.version_info[:2]
+        assert resolve_interpreter(version) == sys.executable
+
+    def test_resolve_path(self):
+        """Test que una ruta se usa tal cual"""
+        assert resolve_interpreter(sys.executable) == sys.executable
+
+    @patch('shutil.which', return_value=None)
+    def test_resolve_missing_version(self, mock_which):
+        """Test que una versión inexistente lanza InterpreterNotFound"""
+        with pytest.raises(InterpreterNotFound):
+            resolve_interpreter("2.1")
+
+
+class TestDownloadArgs:
+    """Test de filtrado de argumentos para pip download"""
+
+    def test_keeps_requirements(self):
+        """Test que conserva requisitos y archivos -r"""
+        args = ['-r', 'req.txt', 'requests', '--pre']
+        assert filter_download_args(args) == ['-r', 'req.txt', 'requests', '--pre']
+
+    def test_drops_install_only_options(self):
+        """Test que descarta opciones exclusivas de install con su valor"""
+        args = ['-U', '--target', '/tmp/x', 'flask', '--no-warn-script-location']
+        assert filter_download_args(args) == ['flask']
+
+    def test_network_options_keep_their_value(self):
+        """Test que reenvía las opciones de red y descarta el resto sin filtrar su valor"""
+        args = ['-r', 'req.txt', '--timeout', '60', '--trusted-host', 'h', '--proxy', 'http://p:3128',
+                '--report', 'out.json', '--log', 'pip.log', '--retries=3', 'flask']
+        assert filter_download_args(args) == [
+            '-r', 'req.txt', '--timeout', '60', '--trusted-host', 'h', '--proxy', 'http://p:3128',
+            '--retries=3', 'flask',
+        ]
+
+
+class TestRunMatrix:
+    """Test de la ejecución en varios intérpretes"""
+
+    @patch('subprocess.run')
+    def test_downloads_then_installs_offline(self, mock_run, temp_wheelhouse):
+        """Test que descarga en la caché compartida e instala sin red"""
+        mock_run.return_value = completed()
+        targets = [('3.10', 'python3.10'), ('3.11', 'python3.11')]
+        results = run_matrix(targets, ['-r', 'req.txt'], ['--index-url', DEFAULT_INDEX_URL], temp_wheelhouse)
+
+        commands = [c[0][0] for c in mock_run.call_args_list]
+        downloads = [c for c in commands if 'download' in c]
+        installs = [c for c in commands if 'install' in c]
+        assert len(downloads) == 2
+        assert len(installs) == 2
+        # El primer intérprete descarga directamente en la caché compartida
+        assert downloads[0][downloads[0].index('--dest') + 1] == str(temp_wheelhouse)
+        for cmd in installs:
+            assert '--no-index' in cmd
+            assert cmd[cmd.index('--find-links') + 1] == str(temp_wheelhouse)
+        assert [r.returncode for r in results] == [0, 0]
+
+    @patch('subprocess.run')
+    def test_sdists_are_built_before_offline_install(self, mock_run, temp_wheelhouse):
+        """Test que los sdists descargados se construyen como wheels con acceso al índice"""
+        sdist = str(temp_wheelhouse / "legacy-1.0.tar.gz")
+
+        def fake_run(cmd, **kwargs):
+            if 'download' in cmd:
+                return MagicMock(returncode=0, stdout=f"Saved {sdist}\nSaved {temp_wheelhouse}/six-1.16.0-py3-none-any.whl\n",
+                                 stderr="")
+            return completed()
+
+        mock_run.side_effect = fake_run
+        results = run_matrix([('3.11', 'python3.11')], ['legacy'], ['--index-url', DEFAULT_INDEX_URL], temp_wheelhouse)
+
+        commands = [c[0][0] for c in mock_run.call_args_list]
+        [build] = [c for c in commands if 'wheel' in c]
+        assert build[-1] == sdist and '--no-deps' in build
+        assert build[build.index('--wheel-dir') + 1] == str(temp_wheelhouse)
+        assert build[build.index('--index-url') + 1] == DEFAULT_INDEX_URL
+        assert commands.index(build) < commands.index(next(c for c in commands if 'install' in c))
+        assert results[0].returncode == 0
+
+    @patch('subprocess.run')
+    def test_failed_download_skips_install(self, mock_run, temp_wheelhouse):
+        """Test que un intérprete con descarga fallida no se instala"""
+        def fake_run(cmd, **kwargs):
+            return completed(1 if cmd[0] == 'python3.11' and 'download' in cmd else 0)
+
+        mock_run.side_effect = fake_run
+        targets = [('3.10', 'python3.10'), ('3.11', 'python3.11')]
+        results = run_matrix(targets, ['flask'], [], temp_wheelhouse)
+
+        assert results[0].returncode == 0
+        assert results[1].returncode == 1
+        assert results[1].stage == 'descarga'
+        installs = [c[0][0] for c in mock_run.call_args_list if 'install' in c[0][0]]
+        assert all(cmd[0] == 'python3.10' for cmd in installs)
+
+    @patch('subprocess.run')
+    def test_staging_files_are_merged(self, mock_run, temp_wheelhouse):
+        """Test que los archivos descargados por intérpretes secundarios pasan a la caché"""
+        def fake_run(cmd, **kwargs):
+            if 'download' in cmd:
+                dest = Path(cmd[cmd.index('--dest') + 1])
+                (dest / f"pkg-1.0-{cmd[0]}.whl").write_text("x")
+            return completed()
+
+        mock_run.side_effect = fake_run
+        run_matrix([('3.10', 'python3.10'), ('3.11', 'python3.11')], ['pkg'], [], temp_wheelhouse)
+
+        names = sorted(p.name for p in temp_wheelhouse.iterdir())
+        assert names == ['pkg-1.0-python3.10.whl', 'pkg-1.0-python3.11.whl']
+
+
+class TestMatrixCommand:
+    """Test del comando aetos install --python"""
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('aetos.aetos_matrix.run_matrix')
+    def test_python_list_triggers_matrix(self, mock_matrix, mock_print, mock_exit):
+        """Test que --python con varias versiones usa la instalación en matriz"""
+        version = "%d.%d" % sys.version_info[:2]
+        mock_matrix.return_value = []
+        with patch.object(sys, 'argv', ['aetos', 'install', '--python', f'{version},{version}', '-r', 'req.txt']):
+            main()
+        targets, args = mock_matrix.call_args[0][:2]
+        assert targets == [(version, sys.executable), (version, sys.executable)]
+        assert args == ['-r', 'req.txt']
+        mock_exit.assert_called_once_with(0)
+
+    @patch('builtins.print')
+    def test_missing_interpreter_exits(self, mock_print):
+        """Test que un intérprete inexistente termina con error"""
+        with patch('shutil.which', return_value=None):
+            with patch.object(sys, 'argv', ['aetos', 'install', '--python', '2.1,2.2', 'flask']):
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+        assert exc_info.value.code == 1
+        print_calls = [str(call_args) for call_args in mock_print.call_args_list]
+        assert any('No se encontró el intérprete' in msg for msg in print_calls)
+
+    @patch('builtins.print')
+    @patch('aetos.aetos_matrix.run_matrix')
+    def test_invalid_jobs_exits(self, mock_matrix, mock_print):
+        """Test que un --jobs que no es un entero positivo termina con error y sin traceback"""
+        for jobs in ('dos', '0'):
+            with patch.object(sys, 'argv', ['aetos', 'install', '--python', '3.11,3.12', '--jobs', jobs, 'flask']):
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+            assert exc_info.value.code == 1
+            mock_print.assert_called_with(f"❌ --jobs espera un número entero mayor o igual que 1: {jobs}")
+        mock_matrix.assert_not_called()
+
+    @patch('builtins.print')
+    @patch('aetos.aetos_matrix.run_matrix')
+    def test_shared_destination_rejected(self, mock_matrix, mock_print):
+        """Test que --target, --prefix o --root con varios intérpretes terminan con error"""
+        for option in (['--target', 'dir'], ['--prefix=/opt/app'], ['--root', '/']):
+            with patch.object(sys, 'argv', ['aetos', 'install', '--python', '3.11,3.12'] + option + ['flask']):
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+            assert exc_info.value.code == 1
+            assert "no se admite con varios intérpretes" in mock_print.call_args_list[-2].args[0]
+        mock_matrix.assert_not_called()
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    @patch('aetos.aetos_matrix.run_matrix')
+    def test_single_version_runs_pip_with_that_interpreter(self, mock_matrix, mock_run, mock_print, mock_exit):
+        """Test que una sola versión no usa la matriz: pip corre con ese intérprete y admite --target"""
+        mock_run.return_value.returncode = 0
+        with patch('shutil.which', return_value="/opt/py39/bin/python3.9"), \
+                patch.object(sys, 'argv', ['aetos', 'install', '--python', '3.9', '--jobs', '2',
+                                           '--target', 'dir', 'flask']):
+            main()
+        mock_matrix.assert_not_called()
+        call_args = mock_run.call_args[0][0]
+        assert call_args[:4] == ["/opt/py39/bin/python3.9", "-m", "pip", "install"]
+        assert call_args[-3:] == ["--target", "dir", "flask"]
+        assert "--python" not in call_args and "--jobs" not in call_args
+        mock_exit.assert_called_once_with(0)
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    @patch('aetos.aetos_matrix.run_matrix')
+    def test_single_current_version_is_a_plain_install(self, mock_matrix, mock_run, mock_print, mock_exit):
+        """Test que --python con la versión actual es una instalación normal"""
+        mock_run.return_value.returncode = 0
+        version = "%d.%d" % sys.version_info[:2]
+        with patch('aetos.aetos.load_config', return_value={"speculative_prefetch": False}), \
+                patch.object(sys, 'argv', ['aetos', 'install', '--python', version, 'flask']):
+            main()
+        mock_matrix.assert_not_called()
+        call_args = mock_run.call_args[0][0]
+        assert call_args[:4] == [sys.executable, "-m", "pip", "install"]
+        assert call_args[-1] == "flask" and "--python" not in call_args
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch
+import sys
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aetos.aetos import get_index_url, handle_config_command, handle_mirror_command, DEFAULT_INDEX_URL, CONFIG_FILE, CONFIG_DIR
+from aetos.aetos_mirrors import probe, update_state, watch, ProbeResult
+
+
+def make_handler(serial):
+    class MirrorHandler(BaseHTTPRequestHandler):
+        """Página de proyecto de un mirror con número de serie"""
+
+        def do_GET(self):
+            body = json.dumps({"meta": {"api-version": "1.0", "_last-serial": serial}, "files": []}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.pypi.simple.v1+json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return MirrorHandler
+
+
+@pytest.fixture
+def mirror_servers():
+    """Fixture que levanta dos mirrors locales, uno desactualizado"""
+    servers = []
+    for serial in (100, 90):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(serial))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    yield [f"http://127.0.0.1:{s.server_address[1]}/simple/" for s in servers]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def temp_config_dir():
+    """Fixture para crear un directorio temporal de configuración"""
+    temp_dir = Path(tempfile.mkdtemp())
+    import aetos.aetos
+    aetos.aetos.CONFIG_FILE = temp_dir / "config.json"
+    aetos.aetos.CONFIG_DIR = temp_dir
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    aetos.aetos.CONFIG_FILE = CONFIG_FILE
+    aetos.aetos.CONFIG_DIR = CONFIG_DIR
+
+
+class TestProbing:
+    """Test del sondeo de mirrors"""
+
+    def test_probe_reads_serial(self, mirror_servers):
+        """Test que el sondeo mide la latencia y lee el número de serie"""
+        result = probe(mirror_servers[0])
+        assert result.ok
+        assert result.freshness == 100
+        assert result.latency > 0
+
+    def test_probe_unreachable(self):
+        """Test que un mirror caído cuenta como error"""
+        result = probe("http://127.0.0.1:9/simple/", timeout=1)
+        assert not result.ok
+        assert result.error
+
+
+class TestRanking:
+    """Test del cálculo del ranking"""
+
+    def test_stale_mirror_ranks_lower(self):
+        """Test que un mirror desactualizado queda detrás aunque sea más rápido"""
+        urls = ["https://a/", "https://b/"]
+        results = [ProbeResult("https://a/", True, 0.20, 100, ""), ProbeResult("https://b/", True, 0.05, 90, "")]
+        state = update_state({}, urls, results, now=1.0)
+        assert state["ranking"] == ["https://a/", "https://b/"]
+        assert state["mirrors"]["https://b/"]["behind"] == 10
+
+    def test_serials_and_file_counts_are_not_mixed(self):
+        """Test que un índice sin serie no se compara con las series de otro"""
+        urls = ["https://pypi/", "https://nexus/", "https://nexus-viejo/"]
+        results = [
+            ProbeResult("https://pypi/", True, 0.20, 25000000, "", "serial"),
+            ProbeResult("https://nexus/", True, 0.05, 900, "", "files"),
+            ProbeResult("https://nexus-viejo/", True, 0.05, 850, "", "files"),
+        ]
+        state = update_state({}, urls, results, now=1.0)
+        assert state["mirrors"]["https://pypi/"]["behind"] == 0
+        assert state["mirrors"]["https://nexus/"]["behind"] == 0
+        assert state["mirrors"]["https://nexus-viejo/"]["behind"] == 50
+        assert state["best"] == "https://nexus/"
+
+    def test_error_rate_over_window(self):
+        """Test que la tasa de error se calcula sobre las muestras acumuladas"""
+        urls = ["https://a/", "https://b/"]
+        state = {}
+        for ok in (True, False, False, False):
+            results = [ProbeResult("https://a/", ok, 0.01, None, ""), ProbeResult("https://b/", True, 0.5, None, "")]
+            state = update_state(state, urls, results)
+        assert state["mirrors"]["https://a/"]["error_rate"] == 0.75
+        assert state["best"] == "https://b/"
+
+    def test_watch_once_persists_state(self, mirror_servers, temp_config_dir):
+        """Test que watch --once guarda el ranking"""
+        path = temp_config_dir / "mirrors.json"
+        watch(mirror_servers, path, interval=0, once=True)
+        state = json.loads(path.read_text())
+        assert state["best"] == mirror_servers[0]
+        assert state["candidates"] == mirror_servers
+
+
+def write_ranking(config_dir: Path, best: str, updated_at: float) -> None:
+    """Escribe un ranking sondeado con los candidatos de la configuración por defecto"""
+    state = {"best": best, "updated_at": updated_at, "candidates": [DEFAULT_INDEX_URL, "https://b/"]}
+    (config_dir / "mirrors.json").write_text(json.dumps(state))
+
+
+class TestRankedIndexSelection:
+    """Test del uso del ranking al elegir el índice"""
+
+    def test_uses_best_ranked_mirror(self, temp_config_dir):
+        """Test que get_index_url usa el mejor mirror del ranking"""
+        (temp_config_dir / "config.json").write_text(json.dumps({"index_url": DEFAULT_INDEX_URL, "mirrors": ["https://b/"]}))
+        write_ranking(temp_config_dir, "https://b/", time.time())
+        assert get_index_url() == "https://b/"
+
+    def test_ignores_old_ranking(self, temp_config_dir):
+        """Test que un ranking antiguo se ignora"""
+        (temp_config_dir / "config.json").write_text(json.dumps({"index_url": DEFAULT_INDEX_URL, "mirrors": ["https://b/"]}))
+        write_ranking(temp_config_dir, "https://b/", 0)
+        assert get_index_url() == DEFAULT_INDEX_URL
+
+    def test_ignores_unknown_mirror(self, temp_config_dir):
+        """Test que un mirror que ya no está configurado se ignora"""
+        (temp_config_dir / "config.json").write_text(json.dumps({"index_url": DEFAULT_INDEX_URL, "mirrors": ["https://b/"]}))
+        write_ranking(temp_config_dir, "https://c/", time.time())
+        assert get_index_url() == DEFAULT_INDEX_URL
+
+    def test_ignores_ranking_of_other_candidates(self, temp_config_dir):
+        """Test que un ranking sondeado con otro index_url se ignora"""
+        (temp_config_dir / "config.json").write_text(json.dumps({"index_url": "https://a/", "mirrors": ["https://b/"]}))
+        write_ranking(temp_config_dir, "https://b/", time.time())
+        assert get_index_url() == "https://a/"
+
+    @patch('builtins.print')
+    def test_config_set_discards_ranking(self, mock_print, temp_config_dir):
+        """Test que aetos config set descarta el ranking y se usa la URL nueva"""
+        (temp_config_dir / "config.json").write_text(json.dumps({"index_url": DEFAULT_INDEX_URL, "mirrors": ["https://b/"]}))
+        write_ranking(temp_config_dir, "https://b/", time.time())
+        assert get_index_url() == "https://b/"
+        handle_config_command(['set', 'https://nuevo.example/simple/'])
+        assert not (temp_config_dir / "mirrors.json").exists()
+        assert get_index_url() == "https://nuevo.example/simple/"
+
+    def test_project_and_environment_index_url_win(self, temp_config_dir, monkeypatch):
+        """Test que un index_url del proyecto o del entorno no lo pisa el ranking"""
+        (temp_config_dir / "config.json").write_text(json.dumps({"index_url": DEFAULT_INDEX_URL, "mirrors": ["https://b/"]}))
+        write_ranking(temp_config_dir, "https://b/", time.time())
+        project = temp_config_dir / "proyecto"
+        project.mkdir()
+        (project / ".aetos.toml").write_text('index_url = "https://proyecto.example/simple/"\n')
+        monkeypatch.chdir(project)
+        assert get_index_url() == "https://proyecto.example/simple/"
+        monkeypatch.setenv("AETOS_INDEX_URL", "https://entorno.example/simple/")
+        assert get_index_url() == "https://entorno.example/simple/"
+
+
+class TestMirrorCommands:
+    """Test de los comandos aetos mirror"""
+
+    @patch('builtins.print')
+    def test_add_and_remove(self, mock_print, temp_config_dir):
+        """Test que add y remove actualizan la configuración"""
+        handle_mirror_command(['add', 'https://mirror.example/simple/'])
+        config = json.loads((temp_config_dir / "config.json").read_text())
+        assert config["mirrors"] == ['https://mirror.example/simple/']
+
+        handle_mirror_command(['remove', 'https://mirror.example/simple/'])
+        config = json.loads((temp_config_dir / "config.json").read_text())
+        assert config["mirrors"] == []
+
+    @patch('builtins.print')
+    def test_add_invalid_url(self, mock_print, temp_config_dir):
+        """Test que add rechaza URLs inválidas"""
+        with pytest.raises(SystemExit) as exc_info:
+            handle_mirror_command(['add', 'invalid-url'])
+        assert exc_info.value.code == 1
+
+    @patch('builtins.print')
+    def test_unknown_subcommand(self, mock_print, temp_config_dir):
+        """Test subcomando de mirror desconocido"""
+        with pytest.raises(SystemExit) as exc_info:
+            handle_mirror_command(['unknown'])
+        assert exc_info.value.code == 1
+        print_calls = [str(call_args) for call_args in mock_print.call_args_list]
+        assert any('desconocido' in msg for msg in print_calls)
+
+    @patch('builtins.print')
+    @patch('aetos.aetos_mirrors.watch')
+    def test_watch_invalid_interval(self, mock_watch, mock_print, temp_config_dir):
+        """Test que un --interval que no es un número (o no es finito) termina con error"""
+        for interval in ('5m', 'inf'):
+            with pytest.raises(SystemExit) as exc_info:
+                handle_mirror_command(['watch', '--interval', interval])
+            assert exc_info.value.code == 1
+            mock_print.assert_called_with(f"❌ --interval espera un número mayor o igual que 1: {interval}")
+        mock_watch.assert_not_called()
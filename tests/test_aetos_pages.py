@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch
+import sys
+import gzip
+import random
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aetos.aetos_http import fetch, zstandard
+from aetos.aetos_pages import TRAIN_AFTER, PageCache, build_zdict, fetch_cached
+
+
+def project_page(name: str, releases: int = 30, seed: int = 0) -> bytes:
+    """Página PEP 503 con enlaces parecidos a los de PyPI"""
+    rng = random.Random(f"{name}-{seed}")
+    links = []
+    for i in range(releases):
+        digest = "%064x" % rng.getrandbits(256)
+        filename = f"{name}-1.{i}.0-py3-none-any.whl"
+        links.append(
+            f'<a href="https://files.pythonhosted.org/packages/{digest[:2]}/{digest[2:4]}/{digest[4:]}/'
+            f'{filename}#sha256={digest}" data-requires-python="&gt;=3.7">{filename}</a><br />\n'
+        )
+    return ("<!DOCTYPE html>\n<html>\n  <head>\n    <title>Links for " + name + "</title>\n  </head>\n"
+            "  <body>\n    <h1>Links for " + name + "</h1>\n" + "".join(links) + "  </body>\n</html>\n").encode()
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    """Índice que comprime con gzip o deflate y responde 304 a la ETag vigente"""
+
+    etag = '"v1"'
+    requests_seen = []
+
+    def do_GET(self):
+        PageHandler.requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        body = project_page(self.path.strip("/").split("/")[-1])
+        accepted = self.headers.get("Accept-Encoding", "")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("ETag", self.etag)
+        if "gzip" in accepted:
+            body = gzip.compress(body)
+            self.send_header("Content-Encoding", "gzip")
+        elif "deflate" in accepted:
+            body = zlib.compress(body)
+            self.send_header("Content-Encoding", "deflate")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def page_server():
+    """Fixture que levanta un índice local"""
+    PageHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/simple/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def temp_cache_dir():
+    """Fixture para crear un directorio temporal de caché"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestCompressedTransfer:
+    """Test de la negociación de compresión"""
+
+    def test_fetch_decodes_gzip(self, page_server):
+        """Test que pide compresión y entrega el cuerpo descomprimido"""
+        response = fetch(page_server + "boto3/")
+        assert "gzip" in PageHandler.requests_seen[0]["Accept-Encoding"]
+        assert response.body == project_page("boto3")
+        assert 0 < response.transferred < len(response.body)
+
+    def test_fetch_decodes_deflate(self, page_server):
+        """Test que también acepta deflate"""
+        response = fetch(page_server + "boto3/", {"Accept-Encoding": "deflate"})
+        assert response.body == project_page("boto3")
+
+
+class TestPageCache:
+    """Test de la caché comprimida de páginas"""
+
+    @pytest.mark.parametrize("codec", [
+        "zlib",
+        pytest.param("zstd", marks=pytest.mark.skipif(zstandard is None, reason="zstandard no instalado")),
+    ])
+    def test_round_trip_and_streaming(self, temp_cache_dir, codec):
+        """Test que guarda comprimido y lee por bloques lo mismo que se guardó"""
+        cache = PageCache(temp_cache_dir, codec=codec)
+        body = project_page("boto3", releases=2000)
+        cache.put("https://pypi.org/simple/boto3/", body, {"ETag": '"x"', "Server": "nginx"})
+
+        assert cache.read("https://pypi.org/simple/boto3/") == body
+        assert b"".join(cache.iter_body("https://pypi.org/simple/boto3/")) == body
+        assert len(list(cache.iter_body("https://pypi.org/simple/boto3/"))) > 1
+        assert cache.meta("https://pypi.org/simple/boto3/")["headers"] == {"ETag": '"x"'}
+        assert cache.read("https://pypi.org/simple/otro/") is None
+
+    def test_trained_dictionary_improves_ratio(self, temp_cache_dir):
+        """Test que el diccionario entrenado reduce el tamaño de páginas pequeñas"""
+        cache = PageCache(temp_cache_dir, codec="zlib")
+        names = [f"proyecto-{i}" for i in range(20)]
+        for name in names[:-1]:
+            cache.put(f"https://pypi.org/simple/{name}/", project_page(name, releases=3))
+        assert cache.dictionary()[1], "se entrena solo al llegar a TRAIN_AFTER páginas"
+
+        body = project_page(names[-1], releases=3)
+        cache.put("https://pypi.org/simple/nuevo/", body)
+        entry = cache.entry_path("https://pypi.org/simple/nuevo/").read_bytes()
+        with_dictionary = len(entry) - 12 - int.from_bytes(entry[8:12], "big")
+        without_dictionary = len(zlib.compress(body, 9))
+        assert with_dictionary < without_dictionary * 0.7
+        # Las páginas anteriores se recomprimieron con el diccionario y se siguen leyendo
+        assert cache.read(f"https://pypi.org/simple/{names[0]}/") == project_page(names[0], releases=3)
+
+    def test_failed_training_waits_for_growth(self, temp_cache_dir):
+        """Test que tras un entrenamiento fallido no se reintenta hasta que la caché se duplica"""
+        cache = PageCache(temp_cache_dir, codec="zlib")
+        with patch('aetos.aetos_pages.build_zdict', return_value=b"") as mock_build:
+            for i in range(TRAIN_AFTER * 2 - 1):
+                cache.put(f"https://pypi.org/simple/p{i}/", project_page(f"p{i}", releases=3))
+            assert mock_build.call_count == 1
+            assert PageCache(temp_cache_dir, codec="zlib").failed_training_entries() == TRAIN_AFTER
+
+            cache.put("https://pypi.org/simple/otro/", project_page("otro", releases=3))
+            assert mock_build.call_count == 2
+        assert cache.train() and not cache.failed_training_file.exists()
+
+    def test_build_zdict_prefers_repeated_markup(self):
+        """Test que el diccionario contiene el marcado común y no los hashes"""
+        samples = [project_page(f"p{i}", releases=5) for i in range(5)]
+        zdict = build_zdict(samples, size=4096)
+        assert len(zdict) <= 4096
+        assert b"files.pythonhosted.org/packages/" in zdict
+        assert b"%064x" % random.Random("p0-0").getrandbits(256) not in zdict
+
+    def test_fetch_cached_revalidates(self, page_server, temp_cache_dir):
+        """Test que la segunda petición es condicional y usa la copia guardada"""
+        cache = PageCache(temp_cache_dir)
+        first = fetch_cached(cache, page_server + "numpy/")
+        second = fetch_cached(cache, page_server + "numpy/")
+
+        assert first.status == 200
+        assert second.not_modified
+        assert second.body == first.body
+        assert second.headers["Content-Type"] == "text/html"
+        assert PageHandler.requests_seen[1]["If-None-Match"] == '"v1"'
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aetos.aetos
+from aetos.aetos import main
+from aetos.aetos_peers import PeerCacheServer, PeerSet
+from aetos.aetos_pipeline import Artifact, fetch_verified
+from benchmarks.mirror import StandInMirror, generate_packages
+
+# Puerto donde no escucha nadie: un vecino caído
+DEAD_PEER = "http://127.0.0.1:9/"
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def packages(temp_root):
+    """Fixture con dos wheels sintéticos generados en un directorio aparte"""
+    return generate_packages(temp_root / "files", count=2, payload_size=4096)
+
+
+def peer_with(directory: Path, files: dict) -> PeerCacheServer:
+    """Vecino local que sirve ``files`` (nombre → contenido)"""
+    directory.mkdir(parents=True)
+    for name, data in files.items():
+        (directory / name).write_bytes(data)
+    return PeerCacheServer(directory, "127.0.0.1", 0)
+
+
+def artifact_for(package, url: str) -> Artifact:
+    return Artifact(package.name, package.version, url, package.filename, package.sha256, True)
+
+
+class TestPeerCacheServer:
+    """Test del servidor de caché de solo lectura"""
+
+    def test_serves_artifacts_only(self, temp_root):
+        """Test que lista y entrega artefactos pero no temporales ni rutas fuera de la caché"""
+        (temp_root / "secret.txt").write_text("no")
+        files = {"demo-1.0-py3-none-any.whl": b"wheel", ".demo.part": b"partial"}
+        with peer_with(temp_root / "wheels", files) as server:
+            listing = urllib.request.urlopen(server.url + "wheels/").read().decode()
+            assert "demo-1.0-py3-none-any.whl" in listing and ".part" not in listing
+            data = urllib.request.urlopen(server.url + "wheels/demo-1.0-py3-none-any.whl").read()
+            assert data == b"wheel"
+            for path in ("wheels/.demo.part", "wheels/..%2Fsecret.txt", "../secret.txt"):
+                with pytest.raises(urllib.error.HTTPError) as exc_info:
+                    urllib.request.urlopen(server.url + path)
+                assert exc_info.value.code == 404
+
+
+class TestPeerLookup:
+    """Test de la consulta a vecinos antes del índice"""
+
+    def test_fetch_from_peer_without_upstream(self, packages, temp_root):
+        """Test que un acierto en un vecino no toca el índice"""
+        package = packages["synth-000"]
+        data = (temp_root / "files" / package.filename).read_bytes()
+        wheelhouse = temp_root / "cache"
+        wheelhouse.mkdir()
+        with peer_with(temp_root / "peer", {package.filename: data}) as server:
+            peers = PeerSet([DEAD_PEER, server.url])
+            artifact = artifact_for(package, DEAD_PEER + "files/" + package.filename)
+            path = fetch_verified(artifact, wheelhouse, peers=peers)
+        assert path.read_bytes() == data
+        assert peers.hits == 1
+        assert peers.available() == [server.url.rstrip("/")]
+
+    def test_corrupt_peer_falls_back_to_upstream(self, packages, temp_root):
+        """Test que un archivo con otro hash se descarta y se descarga del índice"""
+        package = packages["synth-001"]
+        wheelhouse = temp_root / "cache"
+        wheelhouse.mkdir()
+        with peer_with(temp_root / "peer", {package.filename: b"corrupto"}) as server, \
+                StandInMirror(packages, temp_root / "files") as mirror:
+            peers = PeerSet([server.url])
+            artifact = artifact_for(package, mirror.url.replace("/simple/", f"/files/{package.filename}"))
+            path = fetch_verified(artifact, wheelhouse, peers=peers)
+            assert mirror.stats["files"] == 1
+        assert path.read_bytes() == (temp_root / "files" / package.filename).read_bytes()
+        assert peers.hits == 0 and peers.available() == []
+        assert [p.name for p in wheelhouse.iterdir()] == [package.filename]
+
+
+class TestCacheCommand:
+    """Test del comando aetos cache"""
+
+    @pytest.fixture
+    def temp_config(self, temp_root):
+        original = (aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR)
+        aetos.aetos.CONFIG_DIR = temp_root
+        aetos.aetos.CONFIG_FILE = temp_root / "config.json"
+        yield temp_root
+        aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR = original
+
+    @patch('builtins.print')
+    def test_peers_add_and_remove(self, mock_print, temp_config):
+        """Test que guarda los vecinos en la configuración"""
+        with patch.object(sys, 'argv', ['aetos', 'cache', 'peers', 'add', 'http://nodo2:8470/']):
+            main()
+        assert aetos.aetos.load_config()["peers"] == ["http://nodo2:8470/"]
+        assert aetos.aetos.get_peer_set(aetos.aetos.load_config()).urls == ["http://nodo2:8470"]
+
+        with patch.object(sys, 'argv', ['aetos', 'cache', 'peers', 'remove', 'http://nodo2:8470/']):
+            main()
+        assert aetos.aetos.load_config()["peers"] == []
+        assert aetos.aetos.get_peer_set(aetos.aetos.load_config()) is None
+
+    @patch('builtins.print')
+    @patch('aetos.aetos_peers.PeerCacheServer')
+    def test_serve_invalid_port(self, mock_server, mock_print, temp_config):
+        """Test que un --port fuera de rango termina con error sin abrir el servidor"""
+        with patch.object(sys, 'argv', ['aetos', 'cache', 'serve', '--port', '70000']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+        mock_print.assert_called_once_with("❌ --port espera un número entero entre 0 y 65535: 70000")
+        mock_server.assert_not_called()
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_plain_install_says_peers_need_pipeline(self, mock_run, mock_print, mock_exit, temp_config):
+        """Test que con vecinos configurados, una instalación con pip avisa de que no los consulta"""
+        mock_run.return_value.returncode = 0
+        with patch.object(sys, 'argv', ['aetos', 'cache', 'peers', 'add', 'http://nodo2:8470/']):
+            main()
+        with patch.object(sys, 'argv', ['aetos', 'install', 'six']):
+            main()
+        printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+        assert printed.count(f"ℹ️  {aetos.aetos.PEERS_NOTE}") == 2
+        assert "--pipeline" in aetos.aetos.PEERS_NOTE
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import csv
+import io
+import json
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import tempfile
+import shutil
+import http.client
+import urllib.error
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aetos.aetos import main
+from aetos.aetos_hashes import HashMemo
+from aetos.aetos_uninstall import UninstallResult
+from aetos.aetos_pipeline import (
+    Artifact, HashMismatch, UnsupportedSource, fetch_verified, outdated_remover, parse_report,
+    run_pipeline, transient, unsupported_options,
+)
+from aetos.aetos_wheel import WheelError, get_scheme, install_wheel
+from benchmarks.mirror import StandInMirror, generate_packages
+
+
+def make_wheel(directory: Path, files: dict, entry_points: str = "") -> Path:
+    """Wheel mínimo de 'demo' con archivos adicionales y puntos de entrada"""
+    dist_info = "demo-1.0.dist-info"
+    contents = {
+        f"{dist_info}/METADATA": "Metadata-Version: 2.1\nName: demo\nVersion: 1.0\n",
+        f"{dist_info}/WHEEL": "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+        f"{dist_info}/RECORD": "",
+        **files,
+    }
+    if entry_points:
+        contents[f"{dist_info}/entry_points.txt"] = entry_points
+    path = directory / "demo-1.0-py3-none-any.whl"
+    with zipfile.ZipFile(path, "w") as wheel:
+        for name, data in contents.items():
+            wheel.writestr(name, data)
+    return path
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def mirror(temp_root):
+    """Fixture con el mirror local de los benchmarks y tres wheels sintéticos"""
+    files_dir = temp_root / "files"
+    packages = generate_packages(files_dir, count=3, payload_size=4096)
+    with StandInMirror(packages, files_dir) as mirror:
+        yield mirror, packages
+
+
+def install_old_version(site: Path, name: str, version: str = "0.9.0") -> Path:
+    """Instalación previa de ``name`` (módulo y .dist-info con RECORD) en ``site``"""
+    module = name.replace("-", "_")
+    dist_info = site / f"{module}-{version}.dist-info"
+    dist_info.mkdir(parents=True)
+    (site / module).mkdir(exist_ok=True)
+    (site / module / "__init__.py").write_text(f"__version__ = {version!r}\n")
+    (dist_info / "METADATA").write_text(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n")
+    (dist_info / "RECORD").write_text(
+        f"{module}/__init__.py,,\n{dist_info.name}/METADATA,,\n{dist_info.name}/RECORD,,\n")
+    return dist_info
+
+
+@pytest.fixture
+def truncating_server():
+    """Fixture con un servidor que anuncia 1000 bytes y corta la conexión a los 10"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "1000")
+            self.end_headers()
+            self.wfile.write(b"x" * 10)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def failing_once_server():
+    """Fixture con un servidor que responde 503 a la primera petición y luego sirve 10 bytes"""
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            if len(requests) == 1:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", "10")
+            self.end_headers()
+            self.wfile.write(b"x" * 10)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/", requests
+    server.shutdown()
+    server.server_close()
+
+
+def artifact_for(mirror, package, sha256=None) -> Artifact:
+    url = mirror.url.replace("/simple/", f"/files/{package.filename}")
+    return Artifact(package.name, package.version, url, package.filename,
+                    sha256 or package.sha256, package.name == "synth-000")
+
+
+class TestWheelInstall:
+    """Test de la instalación de wheels sin pip"""
+
+    def test_installs_files_scripts_and_record(self, temp_root):
+        """Test que instala módulos, datos y scripts y reescribe el RECORD"""
+        wheel = make_wheel(temp_root, {
+            "demo/__init__.py": "VALUE = 1\n",
+            "demo-1.0.data/scripts/demo-tool": "#!python\nprint('hola')\n",
+        }, entry_points="[console_scripts]\ndemo = demo:main\n")
+        target = temp_root / "site"
+        result = install_wheel(str(wheel), get_scheme(target=str(target)), requested=True)
+
+        assert (result.name, result.version) == ("demo", "1.0")
+        assert (target / "demo" / "__init__.py").read_text() == "VALUE = 1\n"
+        tool = (target / "bin" / "demo-tool").read_text()
+        assert tool.startswith(f"#!{sys.executable}\n")
+        launcher = (target / "bin" / "demo").read_text()
+        assert "from demo import main" in launcher
+        assert os.access(target / "bin" / "demo", os.X_OK)
+
+        dist_info = target / "demo-1.0.dist-info"
+        assert (dist_info / "INSTALLER").read_text() == "aetos\n"
+        assert (dist_info / "REQUESTED").exists()
+        records = {row[0]: row for row in csv.reader(io.StringIO((dist_info / "RECORD").read_text()))}
+        assert records["demo/__init__.py"][1].startswith("sha256=")
+        assert os.path.join("bin", "demo-tool") in records
+        assert any(path.endswith(".pyc") for path in records)
+
+    def test_shebang_rewrite(self, temp_root):
+        """Test que solo "#!python" y "#!pythonw" se reescriben, cada uno con su intérprete"""
+        wheel = make_wheel(temp_root, {
+            "demo-1.0.data/scripts/con-opciones": "#!python -u\nprint('hola')\n",
+            "demo-1.0.data/scripts/ventana": "#!pythonw\nprint('hola')\n",
+            "demo-1.0.data/scripts/python3": "#!python3\nprint('hola')\n",
+        })
+        target = temp_root / "site"
+        with patch('aetos.aetos_wheel.pythonw_executable', return_value="/opt/py/pythonw"):
+            install_wheel(str(wheel), get_scheme(target=str(target)))
+        bin_dir = target / "bin"
+        assert (bin_dir / "con-opciones").read_text() == f"#!{sys.executable} -u\nprint('hola')\n"
+        assert (bin_dir / "ventana").read_text() == "#!/opt/py/pythonw\nprint('hola')\n"
+        assert (bin_dir / "python3").read_text() == "#!python3\nprint('hola')\n"
+
+    def test_rejects_path_traversal(self, temp_root):
+        """Test que rechaza wheels con rutas fuera del destino"""
+        wheel = make_wheel(temp_root, {"../escape.py": "x = 1\n"})
+        with pytest.raises(WheelError):
+            install_wheel(str(wheel), get_scheme(target=str(temp_root / "site")))
+        assert not (temp_root / "escape.py").exists()
+
+
+class TestPipeline:
+    """Test de la tubería descarga → verificación → instalación"""
+
+    def test_parse_report(self):
+        """Test que lee nombre, URL y hash del informe de pip"""
+        report = {"install": [{
+            "download_info": {
+                "url": "https://files.example/packages/ab/six-1.16.0-py2.py3-none-any.whl",
+                "archive_info": {"hash": "sha256=abc", "hashes": {"sha256": "abc"}},
+            },
+            "requested": True,
+            "metadata": {"name": "six", "version": "1.16.0"},
+        }]}
+        [artifact] = parse_report(report)
+        assert artifact.filename == "six-1.16.0-py2.py3-none-any.whl"
+        assert artifact.sha256 == "abc" and artifact.requested and artifact.is_wheel
+
+    def test_vcs_and_directory_requirements_are_unsupported(self):
+        """Test que los requisitos de VCS o de directorios no se tratan como archivos"""
+        for info in ({"url": "https://github.com/psf/requests.git",
+                      "vcs_info": {"vcs": "git", "commit_id": "abc"}},
+                     {"url": "file:///srv/proyecto", "dir_info": {}}):
+            report = {"install": [{"download_info": info, "requested": True,
+                                   "metadata": {"name": "requests", "version": "2.31.0"}}]}
+            with pytest.raises(UnsupportedSource, match="requests"):
+                parse_report(report)
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_vcs_requirement_falls_back_to_pip(self, mock_run, mock_print, mock_exit):
+        """Test que si la resolución trae un requisito de VCS se instala con pip"""
+        with patch('aetos.aetos_pipeline.resolve', side_effect=UnsupportedSource("requests")):
+            mock_run.return_value = MagicMock(returncode=0)
+            with patch.object(sys, 'argv', ['aetos', 'install', '--pipeline', 'git+https://github.com/psf/requests.git']):
+                main()
+        call_args = mock_run.call_args[0][0]
+        assert call_args[2:4] == ["pip", "install"]
+        assert call_args[-1] == "git+https://github.com/psf/requests.git"
+        print_calls = [str(c) for c in mock_print.call_args_list]
+        assert any('se usa pip' in msg for msg in print_calls)
+
+    def test_fetch_verifies_hash(self, mirror, temp_root):
+        """Test que verifica el hash al descargar y no deja archivos si no coincide"""
+        server, packages = mirror
+        package = packages["synth-001"]
+        path = fetch_verified(artifact_for(server, package), temp_root)
+        assert path == temp_root / package.filename
+
+        other = temp_root / "other"
+        other.mkdir()
+        with pytest.raises(HashMismatch):
+            fetch_verified(artifact_for(server, package, sha256="0" * 64), other)
+        assert list(other.iterdir()) == []
+
+    @patch('aetos.aetos_pipeline.RETRY_BACKOFF', 0)
+    def test_truncated_download_is_not_cached(self, truncating_server, temp_root):
+        """Test que una descarga más corta que su Content-Length falla y no queda en la caché"""
+        artifact = Artifact("corto", "1.0", truncating_server + "corto-1.0-py3-none-any.whl",
+                            "corto-1.0-py3-none-any.whl", None, True)
+        with pytest.raises(http.client.IncompleteRead):
+            fetch_verified(artifact, temp_root, memo=HashMemo(temp_root))
+        assert list(temp_root.iterdir()) == []
+
+        result = run_pipeline([artifact], temp_root, get_scheme(target=str(temp_root / "site")))
+        assert result.installed == [] and "corto" in result.errors
+
+    @patch('aetos.aetos_pipeline.RETRY_BACKOFF', 0)
+    def test_transient_errors_are_retried(self, failing_once_server, temp_root):
+        """Test que un 503 pasajero se reintenta y uno definitivo (404) no"""
+        url, requests = failing_once_server
+        artifact = Artifact("pasajero", "1.0", url + "pasajero-1.0-py3-none-any.whl",
+                            "pasajero-1.0-py3-none-any.whl", None, True)
+        assert fetch_verified(artifact, temp_root).read_bytes() == b"x" * 10
+        assert len(requests) == 2
+        assert not transient(urllib.error.HTTPError(url, 404, "Not Found", {}, None))
+
+    def test_hashless_cache_hits_need_a_complete_download(self, mirror, temp_root):
+        """Test que sin hash publicado solo se reutiliza lo que se descargó completo"""
+        server, packages = mirror
+        package = packages["synth-001"]
+        artifact = artifact_for(server, package)._replace(sha256=None)
+        (temp_root / package.filename).write_bytes(b"truncado")
+        memo = HashMemo(temp_root)
+
+        path = fetch_verified(artifact, temp_root, memo=memo)
+        assert fetch_verified(artifact, temp_root, memo=memo) == path
+        assert server.stats["files"] == 1
+        assert memo.reference(package.filename) == package.sha256
+
+    def test_run_pipeline_installs_everything(self, mirror, temp_root):
+        """Test que descarga e instala todos los wheels en el destino"""
+        server, packages = mirror
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        target = temp_root / "site"
+        events = []
+        result = run_pipeline(
+            [artifact_for(server, p) for p in packages.values()],
+            wheelhouse,
+            get_scheme(target=str(target)),
+            on_event=lambda kind, artifact, detail: events.append((kind, artifact.name)),
+        )
+        assert sorted(result.installed) == sorted(packages)
+        assert not result.errors
+        memo = HashMemo(wheelhouse)
+        for name, package in packages.items():
+            assert (target / name.replace("-", "_") / "__init__.py").exists()
+            assert ("verified", name) in events and ("installed", name) in events
+            assert memo.reference(package.filename) == package.sha256
+
+    def test_outdated_versions_are_replaced_after_verification(self, mirror, temp_root):
+        """Test que la versión vieja solo se quita si el wheel nuevo se verificó"""
+        server, packages = mirror
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        target = temp_root / "site"
+        kept = install_old_version(target, "synth-001")
+        replaced = install_old_version(target, "synth-002")
+        artifacts = [artifact_for(server, packages["synth-001"], sha256="0" * 64),
+                     artifact_for(server, packages["synth-002"])]
+        result = run_pipeline(
+            artifacts, wheelhouse, get_scheme(target=str(target)),
+            before_install=outdated_remover(artifacts, ["--target", str(target)]),
+        )
+        assert result.installed == ["synth-002"] and list(result.errors) == ["synth-001"]
+        # La descarga fallida no toca la versión instalada
+        assert (kept / "METADATA").exists()
+        assert (target / "synth_001" / "__init__.py").read_text() == "__version__ = '0.9.0'\n"
+        # Con --target no queda el .dist-info viejo junto al nuevo
+        assert not replaced.exists()
+        assert (target / "synth_002-1.0.0.dist-info" / "METADATA").exists()
+
+    def test_failed_removal_skips_install(self, mirror, temp_root):
+        """Test que si la versión vieja no se pudo quitar, el wheel nuevo no se instala encima"""
+        server, packages = mirror
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        target = temp_root / "site"
+        old = install_old_version(target, "synth-001")
+        artifacts = [artifact_for(server, packages["synth-001"])]
+        failure = UninstallResult({str(old / "METADATA"): "Permission denied"}, None)
+        with patch('aetos.aetos_uninstall.remove', return_value=failure):
+            result = run_pipeline(
+                artifacts, wheelhouse, get_scheme(target=str(target)),
+                before_install=outdated_remover(artifacts, ["--target", str(target)]),
+            )
+        assert result.installed == []
+        assert "1 archivos sin borrar (Permission denied)" in result.errors["synth-001"]
+        assert not (target / "synth_001-1.0.0.dist-info").exists()
+
+    @patch('builtins.print')
+    def test_resolution_downloads_are_not_repeated(self, mock_print, mirror, temp_root, monkeypatch):
+        """Test que en frío cada archivo cruza la red una sola vez: lo que pip bajó al resolver se reutiliza"""
+        server, packages = mirror
+        (temp_root / "config.json").write_text(json.dumps({"index_url": server.url}))
+        for name, value in (("PIP_CONFIG_FILE", os.devnull), ("PIP_NO_CACHE_DIR", "1"),
+                            ("PIP_DISABLE_PIP_VERSION_CHECK", "1")):
+            monkeypatch.setenv(name, value)
+        target = temp_root / "site"
+        with patch('aetos.aetos.config_dir_path', return_value=str(temp_root)), \
+                patch('aetos.aetos.config_file_path', return_value=str(temp_root / "config.json")), \
+                patch.object(sys, 'argv', ['aetos', 'install', '--pipeline', '--target', str(target), 'synth-000']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 0
+        installed = sorted(p.name for p in target.glob("synth_*.dist-info"))
+        assert installed and server.stats["files"] == len(installed)
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_unsupported_options_fall_back_to_pip(self, mock_run, mock_print, mock_exit):
+        """Test que con opciones que el motor no reproduce se delega en pip"""
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.object(sys, 'argv', ['aetos', 'install', '--pipeline', '-e', '.']):
+            main()
+        call_args = mock_run.call_args[0][0]
+        assert call_args[2:4] == ["pip", "install"]
+        assert '--pipeline' not in call_args
+        print_calls = [str(c) for c in mock_print.call_args_list]
+        assert any('se usa pip' in msg for msg in print_calls)
+
+    def test_hash_pinned_requirements_are_unsupported(self, temp_root):
+        """Test que --hash en un archivo de requisitos (incluido con -r) se delega en pip"""
+        (temp_root / "base.txt").write_text("six==1.16.0 \\\n    --hash=sha256:" + "a" * 64 + "\n")
+        (temp_root / "req.txt").write_text("-r base.txt\n")
+        (temp_root / "libre.txt").write_text("six==1.16.0\n")
+        assert unsupported_options(["-r", str(temp_root / "req.txt")]) == ["--hash"]
+        assert unsupported_options([f"--requirement={temp_root / 'libre.txt'}"]) == []
+
+    def test_dry_run_and_report_are_unsupported(self):
+        """Test que --dry-run y --report se delegan en pip en vez de instalar"""
+        assert unsupported_options(['--dry-run', 'foo']) == ['--dry-run']
+        assert unsupported_options(['--report', 'out.json', 'foo', '--report=x.json']) == ['--report', '--report=x.json']
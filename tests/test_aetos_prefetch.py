@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+from pathlib import Path
+import tempfile
+import shutil
+import os
+import subprocess
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aetos.aetos
+from aetos.aetos import main
+from aetos.aetos_lock import FileLock, LockBusy
+from aetos.aetos_prefetch import NICE_INCREMENT, collect_specs, low_priority_command, run_prefetch, load_state
+
+
+def fake_download(failing=()):
+    """Sustituto de aetos_matrix.download que crea un wheel por requisito en ``dest``"""
+    calls = []
+
+    def download(python, args, index_args, dest, wheelhouse):
+        spec = args[-1]
+        calls.append(spec)
+        if spec in failing:
+            return MagicMock(returncode=1, stderr="ERROR: No matching distribution")
+        name, _, version = spec.partition("==")
+        (dest / f"{name}-{version or '1.0'}-py3-none-any.whl").write_bytes(b"wheel")
+        return MagicMock(returncode=0, stderr="")
+
+    download.calls = calls
+    return download
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestCollectSpecs:
+    """Test de la lectura de requisitos y archivos de bloqueo"""
+
+    def test_requirements_and_pylock(self, temp_root):
+        """Test que une requisitos y pylock.toml sin repetir"""
+        (temp_root / "req.txt").write_text("requests==2.31.0\nsix==1.16.0\n")
+        (temp_root / "pylock.toml").write_text(
+            'lock-version = "1.0"\n'
+            '[[packages]]\nname = "six"\nversion = "1.16.0"\n'
+            '[[packages]]\nname = "idna"\nversion = "3.6"\n'
+        )
+        specs = collect_specs([temp_root / "req.txt", temp_root / "pylock.toml"])
+        assert specs == ["requests==2.31.0", "six==1.16.0", "idna==3.6"]
+
+    def test_markers_are_evaluated(self, temp_root):
+        """Test que omite los requisitos cuyo marcador no aplica a este intérprete"""
+        (temp_root / "req.txt").write_text(
+            'pywin32==306; sys_platform == "nonexistent"\n'
+            'tomli==2.0.1; python_version >= "3"\n'
+        )
+        (temp_root / "pylock.toml").write_text(
+            'lock-version = "1.0"\n'
+            '[[packages]]\nname = "colorama"\nversion = "0.4.6"\nmarker = "os_name == \'nonexistent\'"\n'
+            '[[packages]]\nname = "idna"\nversion = "3.6"\nmarker = "python_version >= \'3\'"\n'
+        )
+        specs = collect_specs([temp_root / "req.txt", temp_root / "pylock.toml"])
+        assert specs == ["tomli==2.0.1", "idna==3.6"]
+
+
+    def test_direct_references_and_local_paths(self, temp_root):
+        """Test que conserva la URL de las referencias directas y las rutas locales"""
+        (temp_root / "mylib").mkdir()
+        (temp_root / "req.txt").write_text(
+            "foo @ https://files.example/foo-1.0-py3-none-any.whl\n"
+            "-e ./mylib\n"
+            "./vendor/bar-2.0.tar.gz\n"
+        )
+        specs = collect_specs([temp_root / "req.txt"])
+        assert specs == [
+            "foo @ https://files.example/foo-1.0-py3-none-any.whl",
+            str((temp_root / "mylib").resolve()),
+            str((temp_root / "vendor" / "bar-2.0.tar.gz").resolve()),
+        ]
+
+
+class TestRunPrefetch:
+    """Test de la descarga reanudable"""
+
+    def test_resumes_after_failure(self, temp_root):
+        """Test que guarda el progreso y la siguiente ejecución solo reintenta lo pendiente"""
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        state_file = temp_root / "state.json"
+        specs = ["a==1.0", "b==1.0", "c==1.0"]
+
+        download = fake_download(failing={"b==1.0"})
+        with patch("aetos.aetos_matrix.download", download):
+            first = run_prefetch(specs, [], wheelhouse, state_file, jobs=1)
+        assert first.fetched == ["a==1.0", "c==1.0"]
+        assert list(first.failed) == ["b==1.0"]
+        assert load_state(state_file)["done"] == ["a==1.0", "c==1.0"]
+
+        download = fake_download()
+        with patch("aetos.aetos_matrix.download", download):
+            second = run_prefetch(specs, [], wheelhouse, state_file, jobs=1)
+        assert download.calls == ["b==1.0"]
+        assert second.skipped == 2 and not second.failed
+        assert not state_file.exists()
+        assert sorted(p.name for p in wheelhouse.iterdir()) == [
+            "a-1.0-py3-none-any.whl", "b-1.0-py3-none-any.whl", "c-1.0-py3-none-any.whl"
+        ]
+
+    def test_no_deps_skips_cached_pins(self, temp_root):
+        """Test que con --no-deps no vuelve a pedir versiones exactas ya en caché"""
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        (wheelhouse / "a-1.0-py3-none-any.whl").write_bytes(b"wheel")
+        download = fake_download()
+        with patch("aetos.aetos_matrix.download", download):
+            result = run_prefetch(["a==1.0", "b==2.0"], [], wheelhouse, temp_root / "s.json", no_deps=True)
+        assert download.calls == ["b==2.0"]
+        assert result.skipped == 1
+
+    def test_max_time_leaves_work_pending(self, temp_root):
+        """Test que al agotar --max-time no empieza descargas y conserva el estado"""
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        download = fake_download()
+        with patch("aetos.aetos_matrix.download", download):
+            result = run_prefetch(["a==1.0"], [], wheelhouse, temp_root / "s.json", max_time=0)
+        assert result.interrupted
+        assert download.calls == []
+
+
+class TestPrefetchCommand:
+    """Test del comando aetos prefetch"""
+
+    @pytest.fixture
+    def temp_config(self, temp_root):
+        original = (aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR)
+        aetos.aetos.CONFIG_DIR = temp_root
+        aetos.aetos.CONFIG_FILE = temp_root / "config.json"
+        yield temp_root
+        aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR = original
+
+    def test_file_lock_is_exclusive(self, temp_root):
+        """Test que un segundo bloqueo sin espera falla mientras el primero sigue"""
+        with FileLock(temp_root / "x.lock"):
+            with pytest.raises(LockBusy):
+                FileLock(temp_root / "x.lock", timeout=0).acquire()
+        FileLock(temp_root / "x.lock", timeout=0).acquire().release()
+
+    @pytest.mark.skipif(not hasattr(os, "nice"), reason="os.nice solo existe en POSIX")
+    def test_low_priority_command_lowers_only_the_child(self):
+        """Test que el hijo corre con prioridad baja sin cambiar la de este proceso"""
+        before = os.nice(0)
+        output = subprocess.run(low_priority_command([sys.executable, "-c", "import os; print(os.nice(0))"]),
+                                capture_output=True, text=True, check=True).stdout
+        assert int(output) == min(before + NICE_INCREMENT, 19)
+        assert os.nice(0) == before
+
+    @patch('builtins.print')
+    @patch('aetos.aetos_prefetch.lower_priority')
+    def test_prefetch_command(self, mock_nice, mock_print, temp_config):
+        """Test que descarga a la caché con prioridad baja y resume el resultado"""
+        (temp_config / "req.txt").write_text("a==1.0\n")
+        download = fake_download()
+        with patch.object(sys, 'argv', ['aetos', 'prefetch', '-r', str(temp_config / "req.txt")]), \
+                patch("aetos.aetos_matrix.download", download):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 0
+        mock_nice.assert_called_once()
+        assert (temp_config / "cache" / "wheels" / "a-1.0-py3-none-any.whl").exists()
+        print_calls = [str(c) for c in mock_print.call_args_list]
+        assert any('1 descargados' in msg for msg in print_calls)
+
+    @patch('builtins.print')
+    @patch('aetos.aetos_prefetch.run_prefetch')
+    def test_prefetch_skips_when_locked(self, mock_run, mock_print, temp_config):
+        """Test que no hace nada si otro prefetch tiene el bloqueo"""
+        (temp_config / "req.txt").write_text("a==1.0\n")
+        with FileLock(temp_config / "cache" / "prefetch" / "prefetch.lock"), \
+                patch.object(sys, 'argv', ['aetos', 'prefetch', str(temp_config / "req.txt")]):
+            main()
+        mock_run.assert_not_called()
+        print_calls = [str(c) for c in mock_print.call_args_list]
+        assert any('en curso' in msg for msg in print_calls)
+
+    @patch('builtins.print')
+    @patch('aetos.aetos_prefetch.run_prefetch')
+    def test_prefetch_invalid_options(self, mock_run, mock_print, temp_config):
+        """Test que --jobs o --max-time inválidos terminan con error antes de descargar"""
+        for option, value, message in (
+                ('--jobs', 'x', "❌ --jobs espera un número entero mayor o igual que 1: x"),
+                ('--max-time', '-5', "❌ --max-time espera un número mayor o igual que 0: -5")):
+            with patch.object(sys, 'argv', ['aetos', 'prefetch', 'req.txt', option, value]):
+                with pytest.raises(SystemExit) as exc_info:
+                    main()
+            assert exc_info.value.code == 1
+            mock_print.assert_called_with(message)
+        mock_run.assert_not_called()
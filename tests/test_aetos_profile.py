@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import cProfile
+import pstats
+import subprocess
+import threading
+import time
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aetos.aetos
+from aetos.aetos import main
+from aetos.aetos_profile import ProfileSession, SamplingProfiler, folded_from_stats, top_functions
+
+
+def busy(seconds: float) -> int:
+    """Función que consume CPU durante ``seconds``"""
+    total = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        total += sum(range(100))
+    return total
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestProfilers:
+    """Test de los perfiladores y sus archivos"""
+
+    def test_sampling_sees_worker_threads(self, temp_root):
+        """Test que el muestreo ve otros hilos y produce pstats y pilas plegadas"""
+        profiler = SamplingProfiler(interval=0.002)
+        profiler.enable()
+        worker = threading.Thread(target=busy, args=(0.3,))
+        worker.start()
+        worker.join()
+        profiler.disable()
+
+        folded = profiler.folded()
+        assert any("busy (test_aetos_profile.py" in stack for stack in folded)
+        stats = profiler.stats()
+        busy_entry = next(entry for func, entry in stats.items() if func[2] == "busy")
+        assert busy_entry[3] > 0.1
+
+    def test_folded_from_cprofile(self):
+        """Test que las pilas derivadas de cProfile conservan el tiempo y el anidamiento"""
+        profile = cProfile.Profile()
+        profile.runcall(busy, 0.1)
+        profile.create_stats()
+        folded = folded_from_stats(profile.stats)
+        busy_stacks = [stack for stack in folded if stack.split(";")[0].startswith("busy")]
+        assert any(";" in stack for stack in busy_stacks)
+        assert sum(folded.values()) / 1e6 == pytest.approx(0.1, rel=0.5)
+
+    def test_child_interpreter_is_profiled(self, temp_root):
+        """Test que un pip hijo deja su propio perfil, legible con pstats"""
+        session = ProfileSession("cprofile", str(temp_root))
+        cmd = session.wrap([sys.executable, "-m", "pip", "--version"])
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        assert proc.returncode == 0 and "pip" in proc.stdout
+        assert pstats.Stats(str(temp_root / "pip.pstats")).total_calls > 0
+        assert (temp_root / "pip.folded").read_text().strip()
+        assert top_functions(str(temp_root / "pip.pstats"), 5)
+
+
+class TestProfileCommand:
+    """Test de aetos --profile"""
+
+    @pytest.fixture
+    def temp_config(self, temp_root):
+        original = (aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR)
+        aetos.aetos.CONFIG_DIR = temp_root
+        aetos.aetos.CONFIG_FILE = temp_root / "config.json"
+        yield temp_root
+        aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR = original
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_profile_wraps_pip_and_summarizes(self, mock_run, mock_print, mock_exit, temp_config):
+        """Test que perfila aetos, inyecta el perfilador en pip y muestra el resumen"""
+        mock_run.return_value = MagicMock(returncode=0)
+        with patch.object(sys, 'argv', ['aetos', '--profile=sampling', 'list']):
+            main()
+
+        call_args = mock_run.call_args[0][0]
+        assert call_args[1].endswith("aetos_profile.py") and call_args[2] == "sampling"
+        assert call_args[4:7] == ["-m", "pip", "list"]
+        [directory] = (temp_config / "profiles").iterdir()
+        assert (directory / "aetos.pstats").exists() and (directory / "aetos.folded").exists()
+        print_calls = [str(c) for c in mock_print.call_args_list]
+        assert any('Perfil (sampling)' in msg for msg in print_calls)
+        assert aetos.aetos.PROFILE_SESSION is None
+
+    @patch('builtins.print')
+    def test_unknown_mode(self, mock_print, temp_config):
+        """Test que rechaza un modo de perfilado desconocido"""
+        with patch.object(sys, 'argv', ['aetos', '--profile=dtrace', 'list']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
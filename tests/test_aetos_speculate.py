@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import json
+from pathlib import Path
+import tempfile
+import shutil
+import time
+import urllib.request
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aetos.aetos
+from aetos.aetos import main
+from aetos.aetos_env import distributions_by_name
+from aetos.aetos_speculate import (
+    requested_names,
+    target_paths,
+    learn,
+    predict,
+    settle_ledger,
+    load_graph,
+    get_graph_file,
+    SpeculativeFetcher,
+    finish,
+)
+
+
+def make_site(root: Path, packages: dict) -> Path:
+    """Crea un site-packages falso; packages = {nombre: (versión, [dependencias])}"""
+    site = root / "site"
+    site.mkdir()
+    for name, (version, dependencies) in packages.items():
+        dist_info = site / f"{name}-{version}.dist-info"
+        dist_info.mkdir()
+        requires = "".join(f"Requires-Dist: {dep}\n" for dep in dependencies)
+        (dist_info / "METADATA").write_text(
+            f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n{requires}"
+        )
+    return site
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestDependencyGraph:
+    """Test del grafo de dependencias aprendido"""
+
+    def test_requested_names(self, temp_root):
+        """Test que extrae los proyectos de la línea de comandos y de -r"""
+        (temp_root / "req.txt").write_text("Flask>=2\n")
+        args = ["-q", "--target", "out", "Requests[socks]==2.31", "-r", str(temp_root / "req.txt"), "./local"]
+        assert requested_names(args) == ["requests", "flask"]
+        assert target_paths(args) == [Path("out")]
+        assert target_paths(["-t=site", "demo"]) == [Path("site")]
+        assert target_paths(["demo"]) is None
+
+    def test_learn_follows_installed_edges(self, temp_root):
+        """Test que aprende las aristas alcanzables, sin extras ni marcadores ajenos"""
+        site = make_site(temp_root, {
+            "app": ("1.0", ["lib-a>=1", "lib-b; extra == 'dev'", "lib-c; python_version < '3'"]),
+            "lib-a": ("2.0", ["lib-d"]),
+            "lib-d": ("0.5", []),
+            "unrelated": ("1.0", []),
+        })
+        graph = {"edges": {}, "versions": {}}
+        visited = learn(graph, ["app"], distributions_by_name([site]))
+        assert visited == 3
+        assert graph["edges"] == {"app": ["lib-a"], "lib-a": ["lib-d"], "lib-d": []}
+        assert graph["versions"]["lib-a"] == "2.0"
+
+    def test_predict_skips_installed_and_cached(self):
+        """Test que predice en anchura y omite lo instalado y lo ya descargado"""
+        graph = {
+            "edges": {"app": ["a", "b"], "a": ["c"], "b": ["c", "d"]},
+            "versions": {"app": "1", "a": "1", "b": "2", "c": "3", "d": "4"},
+        }
+        predictions = predict(graph, ["app"], installed={"b": "2"}, cached={("d", "4")})
+        assert predictions == ["a==1", "c==3"]
+        assert predict(graph, ["app"], {}, set(), limit=2) == ["a==1", "b==2"]
+
+
+class TestSpeculativeBudget:
+    """Test del presupuesto de descargas especulativas"""
+
+    def test_settle_ledger(self, temp_root):
+        """Test que olvida lo usado y elimina lo más viejo por encima del presupuesto"""
+        ledger = {}
+        for i, name in enumerate(["a", "b", "c"]):
+            filename = f"{name}-1.0-py3-none-any.whl"
+            (temp_root / filename).write_bytes(b"x" * 100)
+            ledger[filename] = {"size": 100, "added": i}
+
+        evicted = settle_ledger(temp_root, ledger, {"c": "1.0"}, budget=100)
+        assert evicted == ["a-1.0-py3-none-any.whl"]
+        assert list(ledger) == ["b-1.0-py3-none-any.whl"]
+        assert not (temp_root / "a-1.0-py3-none-any.whl").exists()
+        assert (temp_root / "c-1.0-py3-none-any.whl").exists()
+
+
+class TestSpeculativeFetcher:
+    """Test de la descarga en segundo plano"""
+
+    def test_fetches_predictions_into_wheelhouse(self, temp_root):
+        """Test que descarga cada dependencia prevista y la mueve a la caché"""
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        graph = {"edges": {"app": ["a", "b"]}, "versions": {"a": "1.0", "b": "2.0"}}
+        specs = []
+
+        def fake_popen(cmd, **kwargs):
+            assert "preexec_fn" not in kwargs  # no es seguro desde hilos
+            dest = Path(cmd[cmd.index("--dest") + 1])
+            name, version = cmd[-1].split("==")
+            (dest / f"{name}-{version}-py3-none-any.whl").write_bytes(b"wheel")
+            specs.append(cmd[-1])
+            return MagicMock(wait=MagicMock(return_value=0))
+
+        with patch("aetos.aetos_speculate.subprocess.Popen", side_effect=fake_popen), \
+                patch("aetos.aetos_env.installed_distributions", return_value={}):
+            fetcher = SpeculativeFetcher(graph, ["app"], [], wheelhouse).start()
+            deadline = time.monotonic() + 10
+            while len(fetcher.fetched) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            fetcher.stop()
+
+        assert sorted(specs) == ["a==1.0", "b==2.0"]
+        assert sorted(fetcher.fetched) == ["a-1.0-py3-none-any.whl", "b-2.0-py3-none-any.whl"]
+        assert sorted(p.name for p in wheelhouse.iterdir()) == sorted(fetcher.fetched)
+
+    def test_find_links_lists_arrivals_during_resolution(self, temp_root):
+        """Test que pip ve en find_links lo que llega a la caché después de empezar"""
+        wheelhouse = temp_root / "wheels"
+        wheelhouse.mkdir()
+        with patch("aetos.aetos_env.installed_distributions", return_value={}):
+            fetcher = SpeculativeFetcher({"edges": {}, "versions": {}}, ["app"], [], wheelhouse).start()
+        try:
+            assert fetcher.find_links.startswith("http://127.0.0.1:")
+            with urllib.request.urlopen(fetcher.find_links) as response:
+                assert b"tardio" not in response.read()
+            (wheelhouse / "tardio-1.0-py3-none-any.whl").write_bytes(b"wheel")
+            with urllib.request.urlopen(fetcher.find_links) as response:
+                assert response.headers["Cache-Control"] == "no-store"
+                assert b"tardio-1.0-py3-none-any.whl" in response.read()
+        finally:
+            fetcher.stop()
+
+
+class TestInstallIntegration:
+    """Test de la precarga integrada en aetos install"""
+
+    @pytest.fixture
+    def temp_config(self, temp_root):
+        original = (aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR)
+        aetos.aetos.CONFIG_DIR = temp_root
+        aetos.aetos.CONFIG_FILE = temp_root / "config.json"
+        yield temp_root
+        aetos.aetos.CONFIG_FILE, aetos.aetos.CONFIG_DIR = original
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_install_learns_then_speculates(self, mock_run, mock_print, mock_exit, temp_config):
+        """Test que la primera instalación aprende y la siguiente usa la caché como find-links"""
+        (temp_config / "config.json").write_text(json.dumps({"speculative_prefetch": True}))
+        site = make_site(temp_config, {"app": ("1.0", ["lib-a"]), "lib-a": ("2.0", [])})
+        mock_run.return_value = MagicMock(returncode=0)
+
+        with patch.object(sys, 'argv', ['aetos', 'install', '--target', str(site), 'app']):
+            main()
+        assert '--find-links' not in mock_run.call_args[0][0]
+        mock_exit.assert_called_once_with(0)
+
+        graph_file = get_graph_file(temp_config / "cache", aetos.aetos.DEFAULT_INDEX_URL)
+        assert load_graph(graph_file)["edges"] == {"app": ["lib-a"], "lib-a": []}
+
+        with patch.object(sys, 'argv', ['aetos', 'install', '--target', str(temp_config / "new"), 'app']), \
+                patch("aetos.aetos_speculate.SpeculativeFetcher.start", lambda self: self):
+            main()
+        call_args = mock_run.call_args[0][0]
+        assert call_args[call_args.index('--find-links') + 1] == str(temp_config / "cache" / "wheels")
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_speculation_is_opt_in(self, mock_run, mock_print, mock_exit, temp_config):
+        """Test que sin speculative_prefetch (o con false) no se aprende, ni se precarga, ni se toca el registro"""
+        site = make_site(temp_config, {"app": ("1.0", ["lib-a"])})
+        mock_run.return_value = MagicMock(returncode=0)
+
+        for config in ({}, {"speculative_prefetch": False}):
+            (temp_config / "config.json").write_text(json.dumps(config))
+            with patch.object(sys, 'argv', ['aetos', 'install', '--target', str(site), 'app']), \
+                    patch('aetos.aetos_speculate.begin') as mock_begin:
+                main()
+            mock_begin.assert_not_called()
+            assert '--find-links' not in mock_run.call_args[0][0]
+        assert not (temp_config / "cache" / "depgraph").exists()
+        assert not (temp_config / "cache" / "wheels" / "speculative.lock").exists()
+
+    def test_finish_without_ledger_skips_lock(self, temp_root):
+        """Test que sin precarga ni registro, terminar no toma el bloqueo del registro"""
+        with patch('aetos.aetos_lock.FileLock', side_effect=AssertionError("bloqueo")):
+            finish(None, temp_root / "graph.json", ["app"], temp_root, success=False, budget=0)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+import pytest
+import subprocess
+import sys
+import os
+import json
+import marshal
+from pathlib import Path
+import tempfile
+import shutil
+import threading
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import aetos.aetos
+from aetos.aetos import load_config, load_user_config, read_json_snapshot, update_config, DEFAULT_INDEX_URL
+
+AETOS = str(Path(__file__).parent.parent / 'aetos.py')
+
+# Módulos que un comando rápido no debe importar
+HEAVY_MODULES = {'subprocess', 'json', 'pathlib', 're', 'urllib.request', 'importlib.metadata'}
+
+
+def imported_modules(args, home, cwd=None):
+    """Módulos importados por un proceso, según -X importtime"""
+    env = dict(os.environ, HOME=str(home))
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, capture_output=True, text=True,
+                            env=env, cwd=cwd)
+    return {line.split('|')[-1].strip() for line in result.stderr.splitlines() if line.startswith('import time:')}
+
+
+@pytest.fixture
+def temp_home():
+    """Fixture con un HOME temporal y configuración personalizada"""
+    temp_dir = Path(tempfile.mkdtemp())
+    (temp_dir / '.aetos').mkdir()
+    (temp_dir / '.aetos' / 'config.json').write_text(json.dumps({"index_url": "https://custom.mirror.com/simple/"}))
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def temp_config_dir():
+    """Fixture para crear un directorio temporal de configuración"""
+    temp_dir = Path(tempfile.mkdtemp())
+    original = (aetos.aetos.CONFIG_DIR, aetos.aetos.CONFIG_FILE)
+    aetos.aetos.CONFIG_DIR = temp_dir
+    aetos.aetos.CONFIG_FILE = temp_dir / "config.json"
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    aetos.aetos.CONFIG_DIR, aetos.aetos.CONFIG_FILE = original
+
+
+class TestStartupImports:
+    """Test de que los comandos rápidos no importan módulos pesados"""
+
+    @pytest.mark.parametrize('args', [[], ['config', 'show'], ['config']])
+    def test_fast_commands_stay_light(self, args, temp_home):
+        """Test que la ayuda y config show solo cargan lo mismo que un intérprete vacío"""
+        baseline = imported_modules(['-c', 'pass'], temp_home)
+        imported_modules([AETOS] + args, temp_home)  # primera ejecución: genera la instantánea
+        extra = imported_modules([AETOS] + args, temp_home) - baseline
+        assert not (extra & HEAVY_MODULES), f"importados al arrancar: {sorted(extra & HEAVY_MODULES)}"
+
+    def test_project_config_stays_light(self, temp_home):
+        """Test que con un .aetos.toml en el proyecto tampoco se analiza TOML en cada arranque"""
+        project = temp_home / "proyecto"
+        (project / "src").mkdir(parents=True)
+        (project / ".aetos.toml").write_text('index_url = "https://proyecto.example/simple/"\n')
+        baseline = imported_modules(['-c', 'pass'], temp_home)
+        imported_modules([AETOS, 'config', 'show'], temp_home, cwd=project / "src")
+        extra = imported_modules([AETOS, 'config', 'show'], temp_home, cwd=project / "src") - baseline
+        assert not (extra & (HEAVY_MODULES | {'tomllib'})), f"importados al arrancar: {sorted(extra)}"
+
+    def test_config_paths_are_lazy(self):
+        """Test que CONFIG_DIR y CONFIG_FILE siguen disponibles como Path"""
+        assert isinstance(aetos.aetos.CONFIG_FILE, Path)
+        assert aetos.aetos.CONFIG_FILE.parent == aetos.aetos.CONFIG_DIR
+
+
+class TestConfigSnapshot:
+    """Test de la instantánea precompilada de configuración"""
+
+    def test_snapshot_created_and_used(self, temp_config_dir):
+        """Test que la primera lectura crea la instantánea y las siguientes la usan"""
+        config_file = temp_config_dir / "config.json"
+        config_file.write_text(json.dumps({"index_url": "https://a.example/simple/"}))
+        assert load_config() == {"index_url": "https://a.example/simple/"}
+
+        snapshot = temp_config_dir / "config.json.snapshot"
+        assert snapshot.exists()
+
+        # Si la instantánea está al día se usa sin volver a leer el JSON
+        stat = config_file.stat()
+        snapshot.write_bytes(marshal.dumps((stat.st_mtime_ns, stat.st_size, {"index_url": "desde-instantanea"})))
+        assert load_config() == {"index_url": "desde-instantanea"}
+
+    def test_snapshot_invalidated_on_change(self, temp_config_dir):
+        """Test que un cambio en el JSON invalida la instantánea"""
+        config_file = temp_config_dir / "config.json"
+        config_file.write_text(json.dumps({"index_url": "https://a.example/simple/"}))
+        load_config()
+        config_file.write_text(json.dumps({"index_url": "https://otro.example/simple/"}))
+        os.utime(config_file, ns=(0, 10 ** 9))
+        assert load_config() == {"index_url": "https://otro.example/simple/"}
+
+    def test_corrupt_snapshot_ignored(self, temp_config_dir):
+        """Test que una instantánea corrupta se ignora"""
+        config_file = temp_config_dir / "config.json"
+        config_file.write_text(json.dumps({"index_url": "https://a.example/simple/"}))
+        (temp_config_dir / "config.json.snapshot").write_bytes(b"basura")
+        assert read_json_snapshot(str(config_file)) == {"index_url": "https://a.example/simple/"}
+
+    def test_missing_config_uses_default(self, temp_config_dir):
+        """Test que sin archivo se usa la configuración por defecto"""
+        assert load_config() == {"index_url": DEFAULT_INDEX_URL}
+
+
+class TestConfigLayers:
+    """Test de la configuración en capas: sistema, usuario, proyecto y entorno"""
+
+    @pytest.fixture
+    def layers(self, temp_config_dir, monkeypatch):
+        """Capas en un directorio temporal, sin variables AETOS_* del entorno real"""
+        for name in list(os.environ):
+            if name.startswith("AETOS_"):
+                monkeypatch.delenv(name)
+        system = temp_config_dir / "system.json"
+        monkeypatch.setattr(aetos.aetos, "SYSTEM_CONFIG_FILE", str(system))
+        project = temp_config_dir / "proyecto"
+        (project / "src").mkdir(parents=True)
+        monkeypatch.chdir(project / "src")
+        return system, temp_config_dir / "config.json", project / ".aetos.toml"
+
+    def test_precedence(self, layers, monkeypatch):
+        """Test que cada capa sobrescribe a las anteriores clave a clave"""
+        system, user, project = layers
+        system.write_text(json.dumps({"index_url": "https://sistema/", "peers": ["http://a/"], "peer_timeout": 2}))
+        user.write_text(json.dumps({"index_url": "https://usuario/", "mirrors": ["https://m/"]}))
+        project.write_text('index_url = "https://proyecto/"\ninstall_engine = "pipeline"\n')
+        monkeypatch.setenv("AETOS_PEERS", "http://b/, http://c/")
+        monkeypatch.setenv("AETOS_SPECULATIVE_PREFETCH", "false")
+
+        assert load_config() == {
+            "index_url": "https://proyecto/",
+            "peers": ["http://b/", "http://c/"],
+            "peer_timeout": 2,
+            "mirrors": ["https://m/"],
+            "install_engine": "pipeline",
+            "speculative_prefetch": False,
+        }
+        monkeypatch.setenv("AETOS_INDEX_URL", "https://entorno/")
+        assert aetos.aetos.get_index_url() == "https://entorno/"
+
+    def test_writes_only_user_layer(self, layers, monkeypatch):
+        """Test que config set no copia al archivo de usuario lo que viene de otras capas"""
+        system, user, project = layers
+        system.write_text(json.dumps({"peers": ["http://a/"]}))
+        monkeypatch.setenv("AETOS_INSTALL_ENGINE", "pipeline")
+        aetos.aetos.handle_config_command(["set", "https://nuevo/simple/"])
+        assert json.loads(user.read_text()) == {"index_url": "https://nuevo/simple/"}
+        assert load_config()["peers"] == ["http://a/"]
+
+    def test_missing_tomli_warns_once(self, layers, monkeypatch):
+        """Test que sin tomli (Python < 3.11) se avisa una vez de que se ignora .aetos.toml"""
+        _, _, project = layers
+        project.write_text('index_url = "https://proyecto/"\n')
+        monkeypatch.setattr(aetos.aetos, "TOML_WARNED", False)
+        monkeypatch.setattr(aetos.aetos, "parse_toml_file", MagicMock(side_effect=ImportError("tomli")))
+        with patch('builtins.print') as mock_print:
+            assert load_config() == {"index_url": DEFAULT_INDEX_URL}
+            load_config()
+        mock_print.assert_called_once_with(
+            f"⚠️  Se ignora {project}: en Python < 3.11 hace falta tomli (pip install tomli)")
+
+    def test_concurrent_updates_are_not_lost(self, layers):
+        """Test que escrituras simultáneas se serializan y ninguna pisa a otra"""
+        def add(url):
+            update_config(lambda config: config.setdefault("mirrors", []).append(url))
+
+        threads = [threading.Thread(target=add, args=(f"https://m{i}/",)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(load_user_config()["mirrors"]) == sorted(f"https://m{i}/" for i in range(16))
+        assert not [p.name for p in layers[1].parent.iterdir() if p.name.endswith(".tmp")]
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch, MagicMock
+import sys
+import json
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aetos.aetos import main
+from aetos.aetos_env import parse_requirements_file, installed_distributions, find_site_packages
+from aetos.aetos_sync import read_manifest, plan_sync, run_sync, SyncTarget
+
+
+def make_venv(root: Path, name: str, packages: dict, origins: dict = None) -> Path:
+    """Crea un entorno virtual falso con distribuciones instaladas
+
+    ``origins`` da el ``direct_url.json`` (PEP 610) de las que no vinieron del índice.
+    """
+    venv = root / name
+    site_packages = venv / "lib" / "python3.11" / "site-packages"
+    site_packages.mkdir(parents=True)
+    (venv / "pyvenv.cfg").write_text("home = /usr/bin\nversion = 3.11.7\n")
+    for package, version in packages.items():
+        dist_info = site_packages / f"{package}-{version}.dist-info"
+        dist_info.mkdir()
+        (dist_info / "METADATA").write_text(f"Metadata-Version: 2.1\nName: {package}\nVersion: {version}\n")
+        if package in (origins or {}):
+            (dist_info / "direct_url.json").write_text(json.dumps(origins[package]))
+    return venv
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestRequirementsParsing:
+    """Test de lectura de requisitos y entornos"""
+
+    def test_parse_requirements_with_includes(self, temp_root):
+        """Test que sigue -r, ignora comentarios, opciones y hashes"""
+        (temp_root / "base.txt").write_text("six==1.16.0\n")
+        (temp_root / "req.txt").write_text(
+            "# comentario\n"
+            "-r base.txt\n"
+            "--index-url https://example.com/simple/\n"
+            "requests==2.31.0 \\\n    --hash=sha256:abc\n"
+            "flask>=2  # inline\n"
+        )
+        names = [str(req) for req in parse_requirements_file(temp_root / "req.txt")]
+        assert names == ["six==1.16.0", "requests==2.31.0", "flask>=2"]
+
+    def test_installed_distributions(self, temp_root):
+        """Test que lee las distribuciones instaladas de un entorno"""
+        venv = make_venv(temp_root, "venv", {"Django": "4.2", "six": "1.16.0"})
+        installed = installed_distributions(find_site_packages(venv))
+        assert installed == {"django": "4.2", "six": "1.16.0"}
+
+
+class TestSyncPlanning:
+    """Test del cálculo de diferencias por entorno"""
+
+    def test_plan_install_and_uninstall(self, temp_root):
+        """Test que detecta paquetes faltantes, desactualizados y sobrantes"""
+        venv = make_venv(temp_root, "venv", {"six": "1.15.0", "requests": "2.31.0", "extra": "1.0", "pip": "23.0"})
+        req = temp_root / "req.txt"
+        req.write_text("six==1.16.0\nrequests==2.31.0\nflask==3.0.0\n")
+
+        plan = plan_sync(SyncTarget(venv, req))
+        assert sorted(plan.install) == ["flask==3.0.0", "six==1.16.0"]
+        assert plan.uninstall == ["extra"]
+        assert plan.version == "3.11"
+
+    def test_direct_references_keep_their_url(self, temp_root):
+        """Test que una referencia directa se instala desde su URL y se compara con la instalada"""
+        url = "https://files.example/foo-1.0-py3-none-any.whl"
+        venv = make_venv(temp_root, "venv", {"foo": "0.9", "bar": "1.0"},
+                         {"bar": {"url": "https://files.example/bar-1.0-py3-none-any.whl", "archive_info": {}}})
+        req = temp_root / "req.txt"
+        req.write_text(f"foo @ {url}\nbar @ https://files.example/bar-1.0-py3-none-any.whl\n")
+        plan = plan_sync(SyncTarget(venv, req))
+        assert plan.install == [f"foo @ {url}"]
+        assert plan.uninstall == []
+
+    def test_editable_and_local_installs_are_kept(self, temp_root):
+        """Test que las instalaciones editables o locales (líneas -e y de ruta) no se desinstalan"""
+        venv = make_venv(temp_root, "venv", {"mylib": "0.1", "tool": "2.0", "extra": "1.0"}, {
+            "mylib": {"url": "file:///home/dev/mylib", "dir_info": {"editable": True}},
+            "tool": {"url": "file:///home/dev/dist/tool-2.0-py3-none-any.whl", "archive_info": {}},
+        })
+        req = temp_root / "req.txt"
+        req.write_text("-e ./mylib\n./dist/tool-2.0-py3-none-any.whl\nsix==1.16.0\n")
+        plan = plan_sync(SyncTarget(venv, req))
+        assert plan.install == ["six==1.16.0"]
+        assert plan.uninstall == ["extra"]
+        assert plan.local == [f"-e {(temp_root / 'mylib').resolve()}",
+                              str((temp_root / "dist" / "tool-2.0-py3-none-any.whl").resolve())]
+
+    def test_ignored_options_are_reported(self, temp_root):
+        """Test que -c, las opciones de índice y los --hash que sync no aplica se avisan"""
+        venv = make_venv(temp_root, "venv", {})
+        req = temp_root / "req.txt"
+        req.write_text("-c constraints.txt\n--extra-index-url https://extra.example/simple\n"
+                       "six==1.16.0 --hash=sha256:aa --hash=sha256:bb\n")
+        plan = plan_sync(SyncTarget(venv, req))
+        assert plan.install == ["six==1.16.0"]
+        assert plan.ignored == ["-c constraints.txt", "--extra-index-url https://extra.example/simple", "--hash"]
+
+    def test_markers_use_venv_python_version(self, temp_root):
+        """Test que sin poder ejecutar el intérprete se usa la versión de pyvenv.cfg"""
+        venv = make_venv(temp_root, "venv", {})
+        (venv / "pyvenv.cfg").write_text("home = /usr/bin\nversion = 3.8.18\n")
+        req = temp_root / "req.txt"
+        req.write_text(
+            'six==1.16.0; python_full_version == "3.8.18"\n'
+            'tomli==2.0.1; python_version >= "3.11"\n'
+        )
+        plan = plan_sync(SyncTarget(venv, req))
+        assert plan.install == ["six==1.16.0"] and plan.version == "3.8"
+
+    def test_markers_query_each_interpreter_once(self, temp_root):
+        """Test que los entornos con el mismo ejecutable comparten una consulta al intérprete"""
+        interpreter = temp_root / "python-windows"
+        interpreter.write_text("")
+        req = temp_root / "req.txt"
+        req.write_text('pywin32==306; sys_platform == "win32"\nsix==1.16.0\n')
+        venvs = [make_venv(temp_root, name, {}) for name in ("a", "b")]
+        for venv in venvs:
+            (venv / "bin").mkdir()
+            (venv / "bin" / "python").symlink_to(interpreter)
+
+        environment = {"sys_platform": "win32", "python_version": "3.11", "python_full_version": "3.11.7"}
+        with patch('aetos.aetos_env.subprocess.run',
+                   return_value=MagicMock(returncode=0, stdout=json.dumps(environment))) as mock_run:
+            plans = [plan_sync(SyncTarget(venv, req)) for venv in venvs]
+        assert mock_run.call_count == 1
+        assert [plan.install for plan in plans] == [["pywin32==306", "six==1.16.0"]] * 2
+
+    def test_read_text_manifest(self, temp_root):
+        """Test que lee el manifiesto de texto con rutas relativas"""
+        manifest = temp_root / "envs.txt"
+        manifest.write_text("# entornos\nvenv-a req-a.txt\nvenv-b req-b.txt\n")
+        targets = read_manifest(manifest)
+        assert targets == [
+            SyncTarget(temp_root / "venv-a", temp_root / "req-a.txt"),
+            SyncTarget(temp_root / "venv-b", temp_root / "req-b.txt"),
+        ]
+
+    def test_read_json_manifest(self, temp_root):
+        """Test que lee el manifiesto JSON"""
+        manifest = temp_root / "envs.json"
+        manifest.write_text(json.dumps([{"venv": "v", "requirements": "r.txt"}]))
+        assert read_manifest(manifest) == [SyncTarget(temp_root / "v", temp_root / "r.txt")]
+
+    def test_invalid_manifest_line(self, temp_root):
+        """Test que una línea inválida produce error"""
+        manifest = temp_root / "envs.txt"
+        manifest.write_text("solo-un-campo\n")
+        with pytest.raises(ValueError):
+            read_manifest(manifest)
+
+
+class TestRunSync:
+    """Test de la aplicación en paralelo"""
+
+    @patch('subprocess.run')
+    def test_union_downloaded_once(self, mock_run, temp_root):
+        """Test que la unión de artefactos se descarga una vez y se aplica en cada entorno"""
+        mock_run.return_value = MagicMock(returncode=0, stdout="", stderr="")
+        req = temp_root / "req.txt"
+        req.write_text("six==1.16.0\n")
+        plans = [
+            plan_sync(SyncTarget(make_venv(temp_root, "a", {}), req)),
+            plan_sync(SyncTarget(make_venv(temp_root, "b", {"old": "1.0"}), req)),
+        ]
+
+        results = run_sync(plans, [], temp_root / "wheels", jobs=2)
+
+        commands = [c[0][0] for c in mock_run.call_args_list]
+        downloads = [cmd for cmd in commands if "download" in cmd]
+        assert len(downloads) == 1
+        assert downloads[0][-1] == "six==1.16.0"
+        installs = [cmd for cmd in commands if "install" in cmd]
+        assert len(installs) == 2
+        uninstalls = [cmd for cmd in commands if "uninstall" in cmd]
+        assert len(uninstalls) == 1 and uninstalls[0][-1] == "old"
+        assert [r.returncode for r in results] == [0, 0]
+
+    @patch('subprocess.run')
+    def test_local_lines_are_installed_every_run(self, mock_run, temp_root):
+        """Test que las líneas -e y de ruta se instalan aunque no falte nada más"""
+        mock_run.return_value = MagicMock(returncode=0, stdout="", stderr="")
+        req = temp_root / "req.txt"
+        req.write_text("-e ./mylib\n./dist/tool-2.0-py3-none-any.whl\n")
+        plan = plan_sync(SyncTarget(make_venv(temp_root, "a", {}), req))
+
+        [result] = run_sync([plan], ["--index-url", "https://pypi.example/simple/"], temp_root / "wheels")
+
+        assert result.returncode == 0
+        [cmd] = [c[0][0] for c in mock_run.call_args_list]
+        assert cmd[1:5] == ["-m", "pip", "install", "--no-deps"]
+        assert "--index-url" in cmd
+        assert cmd[-3:] == ["-e", str((temp_root / "mylib").resolve()),
+                            str((temp_root / "dist" / "tool-2.0-py3-none-any.whl").resolve())]
+
+
+class TestSyncCommand:
+    """Test del comando aetos sync"""
+
+    @patch('builtins.print')
+    def test_sync_without_manifest(self, mock_print):
+        """Test que sync sin manifiesto muestra el uso"""
+        with patch.object(sys, 'argv', ['aetos', 'sync']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+        print_calls = [str(call_args) for call_args in mock_print.call_args_list]
+        assert any('Uso:' in msg for msg in print_calls)
+
+    @patch('builtins.print')
+    def test_sync_invalid_jobs(self, mock_print):
+        """Test que un --jobs inválido termina con error antes de leer el manifiesto"""
+        with patch.object(sys, 'argv', ['aetos', 'sync', 'envs.txt', '--jobs', '-2']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+        mock_print.assert_called_once_with("❌ --jobs espera un número entero mayor o igual que 1: -2")
+
+    @patch('subprocess.run')
+    @patch('builtins.print')
+    def test_sync_dry_run(self, mock_print, mock_run, temp_root):
+        """Test que --dry-run muestra el plan sin ejecutar pip"""
+        make_venv(temp_root, "venv", {"old": "1.0"})
+        (temp_root / "req.txt").write_text("six==1.16.0\n")
+        manifest = temp_root / "envs.txt"
+        manifest.write_text("venv req.txt\n")
+
+        with patch.object(sys, 'argv', ['aetos', 'sync', str(manifest), '--dry-run']):
+            main()
+
+        mock_run.assert_not_called()
+        print_calls = [str(call_args) for call_args in mock_print.call_args_list]
+        assert any('+ six==1.16.0' in msg for msg in print_calls)
+        assert any('- old' in msg for msg in print_calls)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+import pytest
+from unittest.mock import patch
+import sys
+import os
+import zipfile
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aetos.aetos import main
+from aetos.aetos_uninstall import TRASH_PREFIX, UninstallResult, plan_uninstall, remove, remove_atomic
+from aetos.aetos_wheel import get_scheme, install_wheel
+
+NAME = "aetos-borrable"
+
+
+def make_wheel(directory: Path, modules: int = 20) -> Path:
+    """Wheel con un paquete de ``modules`` módulos, un módulo suelto y un script"""
+    dist_info = "aetos_borrable-1.0.dist-info"
+    contents = {
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: {NAME}\nVersion: 1.0\n",
+        f"{dist_info}/WHEEL": "Wheel-Version: 1.0\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+        f"{dist_info}/RECORD": "",
+        f"{dist_info}/entry_points.txt": "[console_scripts]\nborrable = borrable:main\n",
+        "borrable/__init__.py": "def main():\n    return 0\n",
+        "borrable_suelto.py": "X = 1\n",
+        **{f"borrable/sub/m{i}.py": f"N = {i}\n" for i in range(modules)},
+    }
+    path = directory / "aetos_borrable-1.0-py3-none-any.whl"
+    with zipfile.ZipFile(path, "w") as wheel:
+        for name, data in contents.items():
+            wheel.writestr(name, data)
+    return path
+
+
+@pytest.fixture
+def temp_root():
+    """Fixture para crear un directorio temporal de trabajo"""
+    temp_dir = Path(tempfile.mkdtemp())
+    yield temp_dir
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.fixture
+def target(temp_root):
+    """Fixture con el wheel instalado en un site-packages temporal"""
+    site_packages = temp_root / "site-packages"
+    install_wheel(str(make_wheel(temp_root)), get_scheme(str(site_packages)))
+    return site_packages
+
+
+def visible(site_packages: Path) -> list:
+    """Lo que queda en el site-packages, sin papeleras"""
+    return sorted(p.name for p in site_packages.iterdir() if not p.name.startswith(TRASH_PREFIX))
+
+
+class TestPlanUninstall:
+    """Test de la planificación desde el RECORD"""
+
+    def test_plan_lists_record_and_bytecode(self, target):
+        """Test que el plan incluye los archivos del RECORD y sus .pyc"""
+        plans, missing, unsupported = plan_uninstall([NAME, "no-existe"], paths=[target])
+        assert missing == ["no-existe"] and unsupported == []
+        plan = plans[0]
+        assert (plan.name, plan.version) == (NAME, "1.0")
+        assert str(target / "borrable" / "sub" / "m0.py") in plan.files
+        assert str(target / "bin" / "borrable") in plan.files
+        assert any(path.endswith(".pyc") for path in plan.files)
+        assert all(os.path.exists(path) for path in plan.files)
+
+    def test_paths_outside_environment_are_skipped(self, target, temp_root):
+        """Test que una entrada del RECORD fuera del entorno no se planifica"""
+        record = next(target.glob("*.dist-info")) / "RECORD"
+        outside = temp_root / "ajeno.txt"
+        outside.write_text("no tocar")
+        with open(record, "a") as f:
+            f.write(f"{os.path.relpath(outside, target)},,\n")
+        plan = plan_uninstall([NAME], paths=[target])[0][0]
+        assert plan.skipped == [str(outside)]
+        remove([plan])
+        assert outside.exists()
+
+    def test_egg_info_sources_are_not_trusted(self, temp_root):
+        """Test que un egg-info con solo SOURCES.txt (setup.py develop) se deja a pip"""
+        egg_info = temp_root / "src" / "mipaquete.egg-info"
+        egg_info.mkdir(parents=True)
+        (egg_info / "PKG-INFO").write_text("Metadata-Version: 2.1\nName: mipaquete\nVersion: 1.0\n")
+        (egg_info / "SOURCES.txt").write_text("setup.py\nsrc/mipaquete/__init__.py\n")
+        (temp_root / "setup.py").write_text("")
+        plans, missing, unsupported = plan_uninstall(["mipaquete"], paths=[temp_root / "src"])
+        assert plans == [] and missing == [] and unsupported == ["mipaquete"]
+        assert (temp_root / "setup.py").exists()
+
+    def test_egg_info_installed_files_are_trusted(self, temp_root):
+        """Test que un egg-info con installed-files.txt se planifica como un RECORD"""
+        egg_info = temp_root / "mipaquete-1.0.egg-info"
+        egg_info.mkdir()
+        (egg_info / "PKG-INFO").write_text("Metadata-Version: 2.1\nName: mipaquete\nVersion: 1.0\n")
+        (egg_info / "SOURCES.txt").write_text("setup.py\n")
+        (egg_info / "installed-files.txt").write_text("../mipaquete.py\nPKG-INFO\n")
+        (temp_root / "mipaquete.py").write_text("")
+        plan = plan_uninstall(["mipaquete"], paths=[temp_root])[0][0]
+        assert str(temp_root / "mipaquete.py") in plan.files
+        assert str(temp_root / "setup.py") not in plan.files
+
+    def test_current_directory_is_not_searched(self, temp_root, monkeypatch):
+        """Test que sin rutas explícitas no se buscan distribuciones en el directorio actual"""
+        egg_info = temp_root / "mipaquete-1.0.egg-info"
+        egg_info.mkdir()
+        (egg_info / "PKG-INFO").write_text("Metadata-Version: 2.1\nName: mipaquete\nVersion: 1.0\n")
+        (egg_info / "installed-files.txt").write_text("PKG-INFO\n")
+        monkeypatch.chdir(temp_root)
+        monkeypatch.syspath_prepend(str(temp_root))
+        assert plan_uninstall(["mipaquete"])[1] == ["mipaquete"]
+
+
+class TestRemove:
+    """Test del borrado en paralelo y del modo atómico"""
+
+    def test_parallel_remove(self, target):
+        """Test que borra todos los archivos y deja el site-packages vacío"""
+        plans, _, _ = plan_uninstall([NAME], paths=[target])
+        result = remove(plans, jobs=4)
+        assert result.errors == {} and result.trash is None
+        assert visible(target) == []
+        assert plan_uninstall([NAME], paths=[target])[1] == [NAME]
+
+    def test_foreign_files_are_kept(self, target):
+        """Test que los archivos ajenos al RECORD se conservan con su directorio"""
+        (target / "borrable" / "local.cfg").write_text("del usuario")
+        plans, _, _ = plan_uninstall([NAME], paths=[target])
+        remove(plans)
+        assert visible(target) == ["borrable"]
+        assert [p.name for p in (target / "borrable").iterdir()] == ["local.cfg"]
+
+    def test_atomic_remove_moves_to_trash(self, target):
+        """Test que en modo atómico el entorno queda limpio y el contenido en la papelera"""
+        plans, _, _ = plan_uninstall([NAME], paths=[target])
+        result = remove_atomic(plans)
+        assert result.errors == {}
+        assert visible(target) == []
+        trash = Path(result.trash)
+        assert trash.parent == target and trash.name.startswith(TRASH_PREFIX)
+        moved = [p for p in trash.iterdir() if p.is_dir()]
+        assert any((p / "sub" / "m0.py").exists() for p in moved)
+
+
+class TestUninstallCommand:
+    """Test de aetos uninstall --fast"""
+
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_fast_uninstall(self, mock_run, mock_print, target):
+        """Test que desinstala sin llamar a pip y avisa de lo que no está instalado"""
+        with patch.object(sys, 'path', [str(target)] + sys.path), \
+                patch.object(sys, 'argv', ['aetos', 'uninstall', '--fast', '-y', NAME, 'no-existe']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        mock_run.assert_not_called()
+        assert exc_info.value.code == 0
+        printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+        assert f"✅ {NAME} 1.0" in printed
+        assert any("no-existe no está instalado" in line for line in printed)
+        assert visible(target) == []
+
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_specifier_uninstalls_by_name(self, mock_run, mock_print, target):
+        """Test que un especificador (nombre==versión) desinstala el paquete, como pip"""
+        with patch.object(sys, 'path', [str(target)] + sys.path), \
+                patch.object(sys, 'argv', ['aetos', 'uninstall', '--fast', '-y', f"{NAME}==1.0"]):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        mock_run.assert_not_called()
+        assert exc_info.value.code == 0
+        assert visible(target) == []
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_invalid_requirement_falls_back_to_pip(self, mock_run, mock_print, mock_exit):
+        """Test que un argumento que no es un requisito válido se deja a pip"""
+        mock_run.return_value.returncode = 0
+        with patch.object(sys, 'argv', ['aetos', 'uninstall', '--fast', '-y', './proyecto']):
+            main()
+        assert mock_run.call_args[0][0][2:4] == ["pip", "uninstall"]
+
+    @patch('builtins.print')
+    @patch('builtins.input', side_effect=EOFError)
+    def test_closed_stdin_cancels(self, mock_input, mock_print, target):
+        """Test que sin -y y con stdin cerrado se cancela sin borrar nada"""
+        with patch.object(sys, 'path', [str(target)] + sys.path), \
+                patch.object(sys, 'argv', ['aetos', 'uninstall', '--fast', NAME]):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        assert exc_info.value.code == 1
+        mock_print.assert_called_with("👋 Cancelado")
+        assert "borrable" in visible(target)
+
+    @patch('builtins.print')
+    def test_each_package_reports_its_own_error(self, mock_print, target):
+        """Test que cada paquete muestra un error de sus propios archivos"""
+        other = target / "otro-2.0.dist-info"
+        other.mkdir()
+        (other / "METADATA").write_text("Metadata-Version: 2.1\nName: otro\nVersion: 2.0\n")
+        (other / "RECORD").write_text("otro-2.0.dist-info/METADATA,,\notro-2.0.dist-info/RECORD,,\n")
+        errors = {str(target / "borrable_suelto.py"): "error de borrable",
+                  str(other / "RECORD"): "error de otro"}
+        with patch.object(sys, 'path', [str(target)] + sys.path), \
+                patch('aetos.aetos_uninstall.remove', return_value=UninstallResult(errors, None)), \
+                patch.object(sys, 'argv', ['aetos', 'uninstall', '--fast', '-y', NAME, 'otro']):
+            with pytest.raises(SystemExit) as exc_info:
+                main()
+        printed = [call.args[0] for call in mock_print.call_args_list if call.args]
+        assert f"❌ {NAME} 1.0: 1 archivos sin borrar (error de borrable)" in printed
+        assert "❌ otro 2.0: 1 archivos sin borrar (error de otro)" in printed
+        assert exc_info.value.code == 1
+
+    @patch('sys.exit')
+    @patch('builtins.print')
+    @patch('subprocess.run')
+    def test_unsupported_options_fall_back_to_pip(self, mock_run, mock_print, mock_exit):
+        """Test que con opciones de pip que no se reproducen se delega en pip"""
+        mock_run.return_value.returncode = 0
+        with patch.object(sys, 'argv', ['aetos', 'uninstall', '--fast', '--root-user-action=ignore', NAME]):
+            main()
+        call_args = mock_run.call_args[0][0]
+        assert 'uninstall' in call_args and '--fast' not in call_args
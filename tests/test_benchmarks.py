@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import pytest
+import sys
+import json
+import zipfile
+import urllib.request
+import urllib.error
+from pathlib import Path
+import tempfile
+import shutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.mirror import NetworkConditions, StandInMirror, generate_packages
+from benchmarks.run import compare, relative_metrics
+
+
+@pytest.fixture
+def packages_dir():
+    """Fixture con un pequeño conjunto de wheels sintéticos"""
+    temp_dir = Path(tempfile.mkdtemp())
+    packages = generate_packages(temp_dir, count=3, payload_size=1024)
+    yield temp_dir, packages
+    shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+class TestSyntheticWheels:
+    """Test de los wheels sintéticos"""
+
+    def test_wheel_metadata(self, packages_dir):
+        """Test que los wheels son zips válidos con METADATA y dependencias"""
+        directory, packages = packages_dir
+        package = packages["synth-000"]
+        with zipfile.ZipFile(directory / package.filename) as wheel:
+            metadata = wheel.read("synth_000-1.0.0.dist-info/METADATA").decode()
+            assert "Name: synth-000" in metadata
+            for dependency in package.dependencies:
+                assert f"Requires-Dist: {dependency}" in metadata
+            assert "synth_000-1.0.0.dist-info/RECORD" in wheel.namelist()
+
+    def test_generation_is_reproducible(self, packages_dir):
+        """Test que la misma semilla produce los mismos archivos"""
+        directory, packages = packages_dir
+        other = Path(tempfile.mkdtemp())
+        try:
+            again = generate_packages(other, count=3, payload_size=1024)
+            assert {p.sha256 for p in again.values()} == {p.sha256 for p in packages.values()}
+        finally:
+            shutil.rmtree(other, ignore_errors=True)
+
+
+class TestStandInMirror:
+    """Test del mirror local simulado"""
+
+    def test_serves_html_and_json(self, packages_dir):
+        """Test que sirve el índice simple en HTML y JSON"""
+        directory, packages = packages_dir
+        with StandInMirror(packages, directory) as mirror:
+            html = urllib.request.urlopen(mirror.url + "synth-001/").read().decode()
+            assert packages["synth-001"].filename in html
+            request = urllib.request.Request(mirror.url, headers={"Accept": "application/vnd.pypi.simple.v1+json"})
+            projects = json.loads(urllib.request.urlopen(request).read())["projects"]
+            assert [p["name"] for p in projects] == sorted(packages)
+            assert mirror.stats["pages"] == 2
+
+    def test_failure_injection(self, packages_dir):
+        """Test que la tasa de fallos produce respuestas 503"""
+        directory, packages = packages_dir
+        with StandInMirror(packages, directory, NetworkConditions(failure_rate=1.0)) as mirror:
+            with pytest.raises(urllib.error.HTTPError) as exc_info:
+                urllib.request.urlopen(mirror.url)
+            assert exc_info.value.code == 503
+            assert mirror.stats["failures"] == 1
+
+
+class TestBaselineComparison:
+    """Test de la comparación con las líneas base"""
+
+    def test_detects_slower_times(self):
+        """Test que un tiempo mucho mayor que la línea base, respecto a su referencia, es una regresión"""
+        regressions = compare({"local": {"install_cold_x": 3.0}}, {"local": {"install_cold_x": 1.0}}, 0.3)
+        assert regressions == ["local.install_cold_x: 3.0 (línea base 1.0)"]
+
+    def test_tolerates_noise(self):
+        """Test que las variaciones dentro de la tolerancia no cuentan"""
+        assert compare({"startup": {"help_x": 1.4}}, {"startup": {"help_x": 1.1}}, 0.3) == []
+
+    def test_absolute_times_are_not_compared(self):
+        """Test que los tiempos absolutos dependen de la máquina: se muestran pero no se comparan"""
+        results = {"local": {"pip_cold_s": 9.0, "install_cold_s": 9.0, "install_cold_x": 1.0}}
+        baselines = {"local": {"install_cold_s": 1.0, "install_cold_x": 1.0}}
+        assert compare(results, baselines, 0.3) == []
+        assert relative_metrics(results) == {"local": {"install_cold_x": 1.0}}
+
+    def test_lower_hit_rate_is_regression(self):
+        """Test que una tasa de aciertos menor es una regresión"""
+        regressions = compare({"wan": {"cache_hit_rate": 0.2}}, {"wan": {"cache_hit_rate": 1.0}}, 0.3)
+        assert len(regressions) == 1